@@ -1,13 +1,37 @@
-from selenium import webdriver
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
+import asyncio
 import time
 import os
+import functools
 import json
 import re
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime
-from config import BURP_LOG_PATH, SELENIUM_PATH
+from mcp.server.fastmcp import Context, FastMCP
+from config import BURP_LOG_PATH, CAPTURE_BACKEND
+import sqlite3
+from MCPServer.body_store import DuplicateCounter
+from MCPServer.burp_log import is_blank_log
+from MCPServer.traffic_export import (FORMAT_LOG, LogExchangeWriter, export_path, is_export_file,
+                                      iter_exported_exchanges, open_exchange_writer)
+from MCPServer.burp_http import iter_exchanges
+from MCPServer.burp_index import BurpLogIndex
+from MCPServer.burp_parallel import iter_range_exchanges, map_log_ranges
+from MCPServer.burp_query import QuerySyntaxError, compile_query, split_queries
+from MCPServer.burp_tail import BurpLogTail, follow_exchanges
+from MCPServer.devtools_capture import DevToolsCapture
+from MCPServer.crawl import (DEFAULT_CRAWL_SESSIONS, DEFAULT_MAX_DEPTH, DEFAULT_MAX_PAGES, PAGE_IDLE_TIME,
+                             PAGE_WAIT_TIME, Crawler, build_crawl_report)
+from MCPServer.plugins import lazy_import
+from MCPServer.progress import push_progress
+from MCPServer.result_cache import RESULT_CACHE, cache_key, cached_note, file_fingerprint
+from MCPServer.results import bounded_result, page_hint, store_file_result
+from MCPServer.jobs import DEFAULT_JOB_TIMEOUT, JOB_MANAGER, JobLimitError
+from MCPServer.metrics import METRICS, timed_iter, to_thread
+from MCPServer.webdriver_pool import WebDriverPool, create_edge_driver, network_activity
+
+# selenium 导入较慢（注册工具时不需要），首次打开页面时才导入
+selenium_ui = lazy_import("selenium.webdriver.support.ui")
 
 # ===================== 全局配置（只改这里！）=====================
 # 本地Burp日志路径（确保日志文件在当前目录，或写绝对路径）
@@ -20,6 +44,42 @@ TARGET_URL = "https://dipp.sf-express.com/"
 BURP_PROXY = "127.0.0.1:8080"
 # 导出目录（默认当前目录）
 EXPORT_DIR = "./"
+# 实时跟踪结果中直接返回的摘要条数上限（完整流量见导出文件）
+TAIL_SUMMARY_LIMIT = 50
+# 页面加载超时（秒）
+PAGE_LOAD_TIMEOUT = 30
+# 网络空闲判定的静默窗口（秒）：Burp日志和浏览器都连续这么久没有新请求即结束捕获
+NETWORK_IDLE_TIME = 3
+# 抓包方式（取值见 config.CAPTURE_BACKEND）
+CAPTURE_BURP = "burp"
+CAPTURE_DEVTOOLS = "devtools"
+
+
+# ===================== 服务生命周期（浏览器会话池）=====================
+@dataclass
+class AppContext:
+    """FastMCP lifespan 上下文（工具中通过 ctx.request_context.lifespan_context 访问）"""
+    driver_pool: WebDriverPool
+
+
+@asynccontextmanager
+async def selenium_lifespan(server: FastMCP):
+    """
+    服务启动时后台预热浏览器会话池，关闭时退出所有浏览器
+    用法：mcp = FastMCP("SecurityAnalyzer", lifespan=selenium_lifespan)
+    """
+    pool = WebDriverPool(capture_proxy(), performance_log=capture_performance_log())
+    pool.start()
+    try:
+        yield AppContext(driver_pool=pool)
+    finally:
+        await pool.close()
+
+
+def get_driver_pool(ctx):
+    """取 lifespan 中的浏览器会话池（服务未配置 selenium_lifespan 时返回 None，每次调用单独启动浏览器）"""
+    return getattr(ctx.request_context.lifespan_context, "driver_pool", None)
+
 
 def register_selenium_tool(mcp):
     """
@@ -28,206 +88,546 @@ def register_selenium_tool(mcp):
     :return: 无
     """
     @mcp.tool()
-    def selenium_automation(target_url: str = TARGET_URL, wait_time: int = 15) -> str:
+    async def selenium_automation(ctx: Context, target_url: str = TARGET_URL, wait_time: int = 15,
+                                  idle_time: float = NETWORK_IDLE_TIME) -> str:
         """
         使用Selenium自动化访问目标URL并筛选Burp日志中的JSON响应
+        等待期间实时跟踪Burp日志，匹配的JSON响应一经捕获即推送给客户端
         :param target_url: 目标URL（默认：https://dipp.sf-express.com/）
-        :param wait_time: 手动操作等待时间（默认：15秒）
+        :param wait_time: 最长等待时间（默认：15秒）
+        :param idle_time: 网络空闲静默窗口（默认：3秒）：页面加载完成后，Burp日志和浏览器连续这么久没有新请求
+                          （且没有未完成的 XHR/fetch）即提前结束；设为0则固定等待 wait_time 秒（用于手动操作浏览器）
         :return: 操作结果和筛选到的JSON响应数量
         """
-        # 步骤1：启动浏览器+Burp代理
-        driver = selenium_burp_automation_edge(target_url, BURP_PROXY)
+        async def on_match(count, summary):
+            await push_progress(ctx, count, summary)
 
-        if not driver:
-            return "错误：浏览器启动失败"
+        return await run_selenium_automation(target_url, wait_time, on_match, get_driver_pool(ctx), idle_time)
 
-        # 步骤2：预留手动操作时间
-        time.sleep(wait_time)
+    @mcp.tool()
+    async def start_selenium_automation(ctx: Context, target_url: str = TARGET_URL, wait_time: int = 60,
+                                        timeout: int = DEFAULT_JOB_TIMEOUT, idle_time: float = 0) -> str:
+        """
+        以后台任务方式启动浏览器会话，立即返回任务ID
+        （会话期间捕获的JSON响应可通过 job_output 实时读取，用 job_cancel 提前结束并关闭浏览器）
+        :param target_url: 目标URL（默认：https://dipp.sf-express.com/）
+        :param wait_time: 浏览器会话时长（默认：60秒）
+        :param timeout: 任务超时时间（秒，默认600）
+        :param idle_time: 网络空闲静默窗口（秒，默认0：会话保持 wait_time 秒供手动操作；大于0时网络空闲即提前结束）
+        :return: 任务ID
+        """
+        driver_pool = get_driver_pool(ctx)
 
-        # 步骤3：执行日志筛选
-        try:
-            # 检查日志文件是否存在
-            if not os.path.exists(BURP_LOG_PATH):
-                driver.quit()
-                return f"错误：Burp日志文件不存在：{BURP_LOG_PATH}"
+        async def session(job):
+            async def on_match(count, summary):
+                job.write(summary + "\n")
 
-            # 读取日志内容
-            with open(BURP_LOG_PATH, "r", encoding="utf-8", errors="ignore") as f:
-                raw_log_content = f.read()
+            return await run_selenium_automation(target_url, wait_time, on_match, driver_pool, idle_time)
 
-            if not raw_log_content.strip():
-                driver.quit()
-                return "错误：Burp日志文件为空"
+        try:
+            job = JOB_MANAGER.submit("selenium_automation", target_url, session, timeout=timeout)
+        except JobLimitError as e:
+            return f"错误：{str(e)}"
+        return f"已启动后台浏览器任务（目标：{target_url}）\n任务ID：{job.id}"
 
-            # 执行筛选
-            filtered_log_content, valid_count = filter_burp_log_for_json(raw_log_content)
+    @mcp.tool()
+    async def selenium_crawl(ctx: Context, target_url: str = TARGET_URL, urls: list[str] | None = None,
+                             max_depth: int = DEFAULT_MAX_DEPTH, max_pages: int = DEFAULT_MAX_PAGES,
+                             sessions: int = DEFAULT_CRAWL_SESSIONS, follow_links: bool = True,
+                             page_wait: int = PAGE_WAIT_TIME, idle_time: float = PAGE_IDLE_TIME) -> str:
+        """
+        多浏览器会话并行爬取：从种子URL出发发现同源链接（或只访问给定的URL列表），捕获每个页面触发的JSON响应
+        每个页面完成时推送进度，流量按触发它的页面归类
+        :param target_url: 种子URL（默认：https://dipp.sf-express.com/；提供 urls 时忽略）
+        :param urls: URL列表（可选），作为种子一起访问
+        :param max_depth: 最大链接深度（默认：2，种子页为0）
+        :param max_pages: 页面总数上限（默认：50）
+        :param sessions: 并行的浏览器会话数（默认：3）
+        :param follow_links: 是否发现并访问同源链接（默认：是；否则只访问种子URL）
+        :param page_wait: 单个页面的最长停留时间（秒，默认：15）
+        :param idle_time: 网络空闲静默窗口（秒，默认：2），页面空闲即转到下一个页面
+        :return: JSON 报告（各页面的请求数、匹配的流量摘要）及导出文件路径；
+                 报告较大时返回汇总，完整报告通过 results://{result_id}/{cursor} 分页读取
+        """
+        seeds = urls or [target_url]
+        query = compile_query(default_query())
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_keyword = TARGET_URL_KEYWORD.replace('/', '_').replace(':', '')
+        export_filename = os.path.abspath(f"{EXPORT_DIR}crawl_json_valid_{safe_keyword}_{timestamp}.log")
 
-            # 生成带时间戳的导出文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_keyword = TARGET_URL_KEYWORD.replace('/', '_').replace(':', '')
-            export_filename = f"{EXPORT_DIR}burp_json_valid_{safe_keyword}_{timestamp}.log"
+        # 会话池不足或未开启性能日志（Burp 抓包方式）时单独建一个（爬取期间每个会话独占一个浏览器，用 DevTools 抓包）
+        driver_pool = get_driver_pool(ctx)
+        own_pool = driver_pool is None or driver_pool.size < sessions or not driver_pool.performance_log
+        if own_pool:
+            driver_pool = WebDriverPool(capture_proxy(), size=sessions, performance_log=True)
+            driver_pool.start()
 
-            # 写入筛选结果
-            with open(export_filename, "w", encoding="utf-8") as f:
-                f.write(filtered_log_content)
+        async def on_page(count, page):
+            await push_progress(ctx, count, f"[深度{page.depth}] {page.url}：请求 {page.captured} 个，"
+                                            f"匹配 {page.matched} 条" + (f"，错误：{page.error}" if page.error else ""))
 
-            # 关闭浏览器
-            driver.quit()
+        started_at = time.perf_counter()
+        try:
+            with LogExchangeWriter(export_filename, dedup=True) as writer:
+                async def on_match(page, exchange):
+                    writer.write_exchange(exchange)
 
-            return f"操作完成！\n导出文件：{os.path.abspath(export_filename)}\n筛选到 {valid_count} 条JSON响应"
+                crawler = Crawler(driver_pool, query, describe_exchange, on_page, on_match, sessions, max_depth,
+                                  max_pages, follow_links, page_wait, idle_time)
+                await crawler.run(seeds)
         except Exception as e:
-            driver.quit()
             return f"错误：{str(e)}"
+        finally:
+            if own_pool:
+                await driver_pool.close()
+        report = build_crawl_report(crawler, started_at, export_filename)
+        summary = (f"爬取完成：访问 {report['pages_visited']} 个页面（失败 {report['pages_failed']} 个），"
+                   f"匹配 {report['total_matched']} 条流量\n导出文件：{export_filename}")
+        return bounded_result("selenium_crawl", seeds[0], json.dumps(report, ensure_ascii=False, indent=2), summary)
 
     @mcp.tool()
-    def filter_burp_log(log_file: str = BURP_LOG_PATH) -> str:
+    async def filter_burp_log(log_file: str = BURP_LOG_PATH, use_index: bool = True, workers: int = 0,
+                              query: str = "", export_format: str = FORMAT_LOG, compression: str = "",
+                              dedup_bodies: bool = False, force_refresh: bool = False) -> str:
         """
-        筛选Burp日志中的JSON响应
+        筛选Burp日志中的JSON响应（日志未变化时重复相同的筛选直接返回上次的导出文件）
         :param log_file: Burp日志文件路径（默认：从配置文件读取）
-        :return: 筛选结果和导出文件路径
+        :param use_index: 是否使用旁路索引（默认：是，只解析新追加的日志并按偏移读取命中条目）
+        :param workers: 并行筛选的进程数（默认：0，不并行；大于1时按区间多进程全量筛选，结果与串行一致）
+        :param query: 筛选表达式（默认：URL含目标关键词 + GET/POST + JSON响应）。
+                      字段：host: url: path:(glob 或 ~正则) method: status:(200/2xx/200-299/>=400)
+                      type:(json 或 MIME) size:(>1k) body:(json 或文本) has:(JSON键路径，如 data.list)；
+                      空格为 AND，支持 OR、NOT/-、括号；多个查询用 ; 分隔，一次遍历分别导出
+                      示例：host:*.example.com status:2xx type:json has:data ; path:~^/admin method:POST
+        :param export_format: 导出格式（默认：log，与 Burp 日志相同的文本格式）；jsonl 每行一条结构化记录，
+                              parquet 为列式文件（需安装 pyarrow）；相同的响应正文只存一份。
+                              导出的 jsonl / parquet 文件可作为 log_file 再次筛选，无需重新解析文本
+        :param compression: jsonl / parquet 的压缩方式（gzip / zstd，默认不压缩；zstd 需安装 zstandard）
+        :param dedup_bodies: 是否进一步合并相同的响应正文（默认：否，导出文件自包含）：
+                             jsonl / parquet 的正文改存本地正文库（按 sha256，超出大小上限时淘汰最久未用的），
+                             导出文件只保留哈希；log 格式中重复的正文以哈希占位引用文件中首次出现的那份
+        :param force_refresh: 是否忽略缓存重新筛选（默认：否）
+        :return: 筛选结果和导出文件路径（log / 未压缩的 jsonl 导出文件可通过 results://{result_id}/{cursor} 分页读取）
         """
         try:
             # 检查日志文件是否存在
             if not os.path.exists(log_file):
                 return f"错误：Burp日志文件不存在：{log_file}"
 
-            # 读取日志内容
-            with open(log_file, "r", encoding="utf-8", errors="ignore") as f:
-                raw_log_content = f.read()
-
-            if not raw_log_content.strip():
+            if is_blank_log(log_file):
                 return "错误：Burp日志文件为空"
 
-            # 执行筛选
-            filtered_log_content, valid_count = filter_burp_log_for_json(raw_log_content)
+            # 日志指纹 + 查询 + 导出方式相同且导出文件仍在时直接返回（索引/并行方式不影响结果，不计入缓存键）
+            query_texts = split_queries(query) or [default_query()]
+            key = cache_key("filter_burp_log", {"queries": query_texts, "export_format": export_format,
+                                                "compression": compression, "dedup_bodies": dedup_bodies},
+                            [file_fingerprint(log_file)])
+            entry = None if force_refresh else RESULT_CACHE.get(key)
+            if entry is not None and all(os.path.exists(item[1]) for item in entry.value):
+                results = entry.value
+                lines = [cached_note(entry), "筛选完成！"]
+            else:
+                # 流式筛选并导出（不一次性读入整个日志）
+                results = await to_thread(export_filtered_traffic, log_file, query_texts, use_index, workers,
+                                          export_format, compression, dedup_bodies)
+                RESULT_CACHE.put(key, "filter_burp_log", results)
+                lines = ["筛选完成！"]
+            for query_text, export_filename, valid_count, duplicate_count in results:
+                lines.append(f"查询：{query_text}\n导出文件：{export_filename}\n筛选到 {valid_count} 条匹配流量")
+                if duplicate_count:
+                    lines.append(f"其中 {duplicate_count} 条响应正文与之前相同（已合并）")
+                stored = (store_file_result("filter_burp_log", export_filename)
+                          if export_filename.endswith((".log", ".jsonl")) else None)
+                if stored is not None:
+                    lines.append(page_hint(stored))
+            return "\n".join(lines)
+        except QuerySyntaxError as e:
+            return f"错误：查询表达式不合法：{str(e)}"
+        except Exception as e:
+            return f"错误：{str(e)}"
 
-            # 生成带时间戳的导出文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_keyword = TARGET_URL_KEYWORD.replace('/', '_').replace(':', '')
-            export_filename = f"{EXPORT_DIR}burp_json_valid_{safe_keyword}_{timestamp}.log"
 
-            # 写入筛选结果
-            with open(export_filename, "w", encoding="utf-8") as f:
-                f.write(filtered_log_content)
+    @mcp.tool()
+    async def tail_burp_log(ctx: Context, query: str = "", duration: int = 30, from_start: bool = False,
+                            log_file: str = BURP_LOG_PATH, idle_time: float = 0) -> str:
+        """
+        实时跟踪Burp日志：只解析新追加的流量，匹配的请求/响应一经捕获即通过进度通知推送给客户端
+        :param query: 筛选表达式（语法同 filter_burp_log，默认：URL含目标关键词 + GET/POST + JSON响应）
+        :param duration: 跟踪时长（秒，默认：30）
+        :param from_start: 是否先回放日志中已有的流量（默认：否，只跟踪之后新捕获的流量）
+        :param log_file: Burp日志文件路径（默认：从配置文件读取）
+        :param idle_time: 静默窗口（秒，默认0：跟踪满 duration 秒）；大于0时日志连续这么久没有新流量即提前结束
+        :return: 跟踪结果摘要和导出文件路径
+        """
+        try:
+            queries = [compile_query(text) for text in split_queries(query) or [default_query()]]
+        except QuerySyntaxError as e:
+            return f"错误：查询表达式不合法：{str(e)}"
+        if not os.path.exists(log_file):
+            return f"错误：Burp日志文件不存在：{log_file}"
 
-            return f"筛选完成！\n导出文件：{os.path.abspath(export_filename)}\n筛选到 {valid_count} 条JSON响应"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        export_filename = f"{EXPORT_DIR}burp_tail_{timestamp}.log"
+        counter = DuplicateCounter()
+        try:
+            with LogExchangeWriter(export_filename, dedup=True) as writer:
+                async for exchange in follow_exchanges(log_file, duration, from_start=from_start,
+                                                       idle_time=idle_time):
+                    if not any(query.match(exchange) for query in queries):
+                        continue
+                    writer.write_exchange(exchange)
+                    summary = describe_exchange(exchange)
+                    # 相同的响应（轮询等）只推送第一次
+                    if counter.add(exchange, summary):
+                        await push_progress(ctx, counter.unique, summary)
         except Exception as e:
             return f"错误：{str(e)}"
 
+        summaries = counter.lines(TAIL_SUMMARY_LIMIT)
+        result = (f"跟踪结束（最长{duration}秒）！\n导出文件：{os.path.abspath(export_filename)}\n"
+                  f"捕获到 {counter.total} 条匹配流量")
+        if counter.duplicates:
+            result += f"（其中 {counter.duplicates} 条相同响应已合并）"
+        if summaries:
+            result += "\n" + "\n".join(summaries)
+        if counter.unique > len(summaries):
+            result += f"\n……其余 {counter.unique - len(summaries)} 种响应见导出文件"
+        return result
 
-# ===================== Selenium部分（自动打开浏览器+Burp代理）=====================
-def selenium_burp_automation_edge(target_url, burp_proxy="127.0.0.1:8080"):
-    edge_options = Options()
-    edge_options.add_argument(f'--proxy-server=http://{burp_proxy}')
-    edge_options.add_argument('--ignore-certificate-errors')
-    edge_options.add_argument('--ignore-ssl-errors')
-    edge_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    edge_options.add_experimental_option('useAutomationExtension', False)
-    edge_options.add_argument('--disable-popup-blocking')
+
+async def run_selenium_automation(target_url, wait_time, on_match=None, driver_pool=None, idle_time=0):
+    """
+    启动浏览器访问目标URL，等待期间实时跟踪捕获的流量，结束后筛选导出JSON响应并关闭浏览器
+    :param target_url: 目标URL
+    :param wait_time: 最长等待时间（秒）
+    :param on_match: 异步回调 on_match(序号, 单行摘要)，每捕获一条匹配的JSON响应调用一次
+    :param driver_pool: 浏览器会话池（可选），提供时租用已预热的浏览器，结束后重置归还而不关闭
+    :param idle_time: 网络空闲静默窗口（秒，0 表示固定等待 wait_time 秒）
+    :return: 操作结果和筛选到的JSON响应数量
+    """
+    if driver_pool is not None:
+        try:
+            async with driver_pool.lease() as session:
+                return await browse_and_capture(session.driver, target_url, wait_time, on_match, idle_time)
+        except Exception as e:
+            return f"错误：{str(e)}"
+
+    # 步骤1：启动浏览器（WebDriver 为同步调用，放到线程中执行，不阻塞其他请求）
+    try:
+        driver = await asyncio.to_thread(create_edge_driver, capture_proxy(),
+                                         performance_log=capture_performance_log())
+    except Exception as e:
+        print(f"❌ 浏览器启动失败：{str(e)}")
+        return "错误：浏览器启动失败"
 
     try:
-        driver_path = SELENIUM_PATH
-        driver_service = Service(executable_path=driver_path) if os.path.exists(driver_path) else Service()
-    except Exception:
-        driver_service = Service()
+        return await browse_and_capture(driver, target_url, wait_time, on_match, idle_time)
+    finally:
+        # 关闭浏览器（任务被取消时同样会执行）
+        await asyncio.to_thread(driver.quit)
+
+
+def capture_proxy():
+    """浏览器使用的代理：Burp 抓包走 Burp 代理，DevTools 抓包直连"""
+    return BURP_PROXY if CAPTURE_BACKEND == CAPTURE_BURP else None
+
 
-    driver = webdriver.Edge(service=driver_service, options=edge_options)
-    driver.maximize_window()
+def capture_performance_log():
+    """浏览器是否开启性能日志：只有 DevTools 抓包读取它，Burp 抓包时不开启（否则事件在驱动中一直累积）"""
+    return CAPTURE_BACKEND == CAPTURE_DEVTOOLS
 
+
+async def browse_and_capture(driver, target_url, wait_time, on_match=None, idle_time=0):
+    """
+    打开目标页面，等待网络空闲（或固定等待 wait_time 秒）并实时推送新捕获的JSON响应，结束后筛选导出
+    :param driver: 已启动的 WebDriver
+    :return: 操作结果和筛选到的JSON响应数量
+    """
+    query = compile_query(default_query())
+    # 打开页面前记下起点，页面加载期间产生的流量也能被捕获
+    if CAPTURE_BACKEND == CAPTURE_DEVTOOLS:
+        source = await asyncio.to_thread(DevToolsCapture, driver, query.prematch)
+    else:
+        source = BurpLogTail(BURP_LOG_PATH)
+    if not await asyncio.to_thread(open_target_page, driver, target_url):
+        return "错误：页面加载失败"
+
+    try:
+        # 步骤2：等待页面请求结束（或预留手动操作时间），期间实时推送新捕获的JSON响应
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        exchanges = follow_exchanges(BURP_LOG_PATH, wait_time, tail=source, idle_time=idle_time,
+                                     activity=functools.partial(network_activity, driver))
+
+        if CAPTURE_BACKEND == CAPTURE_DEVTOOLS:
+            # DevTools 抓到的流量已是结构化记录，命中即写入导出文件，无需再读取日志
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            safe_keyword = TARGET_URL_KEYWORD.replace('/', '_').replace(':', '')
+            export_filename = os.path.abspath(f"{EXPORT_DIR}devtools_json_valid_{safe_keyword}_{timestamp}.log")
+            with LogExchangeWriter(export_filename, dedup=True) as writer:
+                counter = await collect_matches(exchanges, query, on_match, writer)
+            valid_count = counter.total
+        else:
+            counter = await collect_matches(exchanges, query, on_match)
+
+            # 步骤3：执行日志筛选
+            # 检查日志文件是否存在
+            if not os.path.exists(BURP_LOG_PATH):
+                return f"错误：Burp日志文件不存在：{BURP_LOG_PATH}"
+
+            if is_blank_log(BURP_LOG_PATH):
+                return "错误：Burp日志文件为空"
+
+            # 流式筛选并导出（不一次性读入整个日志）
+            export_filename, valid_count = await to_thread(export_json_traffic, BURP_LOG_PATH)
+
+        result = (f"操作完成！（捕获 {loop.time() - started_at:.1f} 秒）\n导出文件：{export_filename}\n"
+                  f"筛选到 {valid_count} 条JSON响应")
+        if counter.duplicates:
+            result += f"\n捕获期间 {counter.duplicates} 条相同响应已合并，只推送 {counter.unique} 条"
+        return result
+    except Exception as e:
+        return f"错误：{str(e)}"
+
+
+async def collect_matches(exchanges, query, on_match=None, writer=None):
+    """
+    消费实时流量：命中查询的推送摘要（相同的响应只推送第一次），并可同时写入导出文件
+    :param exchanges: follow_exchanges 产出的异步生成器
+    :param writer: LogExchangeWriter（可选）
+    :return: DuplicateCounter（total 为命中条数，duplicates 为合并掉的相同响应数）
+    """
+    counter = DuplicateCounter()
+    async for exchange in exchanges:
+        if not query.match(exchange):
+            continue
+        if writer is not None:
+            writer.write_exchange(exchange)
+        summary = describe_exchange(exchange)
+        if counter.add(exchange, summary) and on_match is not None:
+            await on_match(counter.unique, summary)
+    return counter
+
+
+# ===================== Selenium部分（自动打开浏览器+Burp代理）=====================
+def open_target_page(driver, target_url):
+    """
+    访问目标页面并等待加载完成
+    :return: 是否成功
+    """
     try:
         print(f"\n✅ 正在访问目标页面：{target_url}")
         driver.get(target_url)
         # 等待页面加载（放宽条件，无需等待title，只要页面不报错即可）
-        WebDriverWait(driver, 30).until(lambda d: d.execute_script("return document.readyState") == "complete")
-        print(f"✅ 页面加载完成，可手动操作浏览器（如登录、触发接口），15秒后自动筛选日志")
+        selenium_ui.WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(
+            lambda d: d.execute_script("return document.readyState") == "complete")
+        print(f"✅ 页面加载完成，可手动操作浏览器（如登录、触发接口），网络空闲或等待结束后自动筛选日志")
     except Exception as e:
         print(f"❌ 自动化操作失败：{str(e)}")
+        return False
+    return True
+
+
+def selenium_burp_automation_edge(target_url, burp_proxy="127.0.0.1:8080"):
+    driver = create_edge_driver(burp_proxy)
+    if not open_target_page(driver, target_url):
         driver.quit()
         return None
     return driver
 
 
 # ===================== 核心日志筛选（按需求优化）=====================
-def filter_burp_log_for_json(raw_log_content):
-    # 匹配日志的等号分隔符（使用正确的格式）
-    traffic_separator = "======================================================"
-    # 拆分流量条目，过滤空内容
-    traffic_entries = [entry.strip() for entry in raw_log_content.split(traffic_separator) if entry.strip()]
-    valid_entries = []
-
-    # 匹配响应头中的Content-Type: application/json（严格匹配）
-    content_type_json_pattern = re.compile(r'Content-Type:\s*application/json', re.IGNORECASE)
-
-    print(f"\n🔍 日志解析开始：共检测到 {len(traffic_entries)} 条日志条目")
-    print(f"📋 筛选规则：URL含[{TARGET_URL_KEYWORD}] + 响应头含[application/json]")
-
-    # 统计变量
-    url_match_count = 0
-    json_response_count = 0
-    final_valid_count = 0
-
-    current_request = None
-    for idx, entry in enumerate(traffic_entries, 1):
-        # 检查是否是目标URL的请求
-        if TARGET_URL_KEYWORD.lower() in entry.lower() and ('GET' in entry or 'POST' in entry):
-            current_request = entry
-            url_match_count += 1
-
-        # 检查是否是返回包且Content-Type为application/json
-        elif current_request and 'HTTP/' in entry:
-            # 严格检查Content-Type是否为application/json
-            if content_type_json_pattern.search(entry):
-                # 提取完整的返回包
-                response = entry
-                # 添加到结果中
-                valid_entries.append(current_request)
-                valid_entries.append(response)
-                json_response_count += 1
-                final_valid_count += 1
-                # 重置当前请求
-                current_request = None
-            else:
-                # 如果返回包不是JSON格式，重置当前请求
-                current_request = None
-
-    # 打印筛选统计
-    print(
-        f"📊 筛选结果：URL匹配[{url_match_count}]条 → JSON响应头匹配[{json_response_count}]条 → 最终有效[{final_valid_count}]条")
-    if final_valid_count == 0:
+def default_query():
+    """默认查询：URL含目标关键词 + GET/POST + 响应头声明为 application/json"""
+    return f'"{TARGET_URL_KEYWORD}" method:GET,POST type:json'
+
+
+def describe_exchange(exchange):
+    """单行摘要：方法 URL → 状态码 Content-Type（正文大小）"""
+    request, response = exchange.request, exchange.response
+    if response is None:
+        return f"{request.method} {request.url} → （无响应）"
+    body_size = len(response.raw) - response.body_start
+    return f"{request.method} {request.url} → {response.status} {response.content_type or '-'} ({body_size}B)"
+
+
+def print_filter_stats(exchange_count, queries, hit_counts):
+    """打印筛选统计"""
+    print(f"📊 共检测到 {exchange_count} 组请求/响应")
+    for query, hit_count in zip(queries, hit_counts):
+        print(f"📊 筛选结果：查询[{query.text}] → 最终有效[{hit_count}]条")
+    if not any(hit_counts):
         print("⚠️  无有效条目：可能未触发JSON接口，或日志中无相关流量")
 
-    # 用正确的分隔符重组日志
-    filtered_log = traffic_separator + "\n\n" + ("\n\n" + traffic_separator + "\n\n").join(valid_entries) + "\n\n" + traffic_separator
-    return filtered_log, final_valid_count
+
+def filter_burp_log_for_json(exchanges, queries):
+    """
+    一次遍历同时执行多个查询
+    :param exchanges: 配对后的 HttpExchange 可迭代对象（通常来自 iter_exchanges，惰性读取）
+    :param queries: 编译后的 Query 列表
+    :return: 生成器，按原始顺序产出 (命中的查询下标列表, HttpExchange)
+    """
+    exchange_count = 0
+    hit_counts = [0] * len(queries)
+    for exchange in exchanges:
+        exchange_count += 1
+        hits = [idx for idx, query in enumerate(queries) if query.match(exchange)]
+        if hits:
+            for idx in hits:
+                hit_counts[idx] += 1
+            yield hits, exchange
+    print_filter_stats(exchange_count, queries, hit_counts)
+
+
+def _filter_json_range(query_texts, log_file, start, end):
+    """
+    子进程入口：筛选日志中 [start, end) 区间内的请求/响应对
+    :return: (交互数, [(命中的查询下标列表, HttpExchange), ...])
+    """
+    queries = [compile_query(text) for text in query_texts]
+    exchange_count = 0
+    results = []
+    for exchange in iter_range_exchanges(log_file, start, end):
+        exchange_count += 1
+        hits = [idx for idx, query in enumerate(queries) if query.match(exchange)]
+        if hits:
+            results.append((hits, exchange))
+    return exchange_count, results
+
+
+def filter_burp_log_parallel(log_file, queries, workers):
+    """
+    多进程并行筛选：按分隔符把日志切成字节区间，各子进程自行读取区间，结果按原始顺序合并，与串行结果一致
+    :param log_file: Burp日志文件路径
+    :param queries: 编译后的 Query 列表（以表达式文本传给子进程重新编译）
+    :param workers: 进程数
+    :return: 生成器，按原始顺序产出 (命中的查询下标列表, HttpExchange)
+    """
+    print(f"\n🔍 日志解析开始（{workers} 进程并行）")
+    exchange_count = 0
+    hit_counts = [0] * len(queries)
+    range_func = functools.partial(_filter_json_range, [query.text for query in queries])
+    for range_count, results in map_log_ranges(log_file, range_func, workers):
+        exchange_count += range_count
+        for hits, exchange in results:
+            for idx in hits:
+                hit_counts[idx] += 1
+            yield hits, exchange
+    print_filter_stats(exchange_count, queries, hit_counts)
+
+
+def filter_burp_log_with_index(log_file, queries):
+    """
+    基于旁路索引筛选：先增量索引新追加的日志，用索引中的头部字段预判，只读取可能命中条目的字节区间
+    :param log_file: Burp日志文件路径
+    :param queries: 编译后的 Query 列表
+    :return: 生成器，按原始顺序产出 (命中的查询下标列表, HttpExchange)
+    """
+    with BurpLogIndex(log_file) as index:
+        new_count = index.update()
+        print(f"\n🔍 日志索引更新完成：新增 {new_count} 条日志条目（已索引至第 {index.indexed_offset} 字节）")
+
+        def prematch(exchange):
+            return any(query.prematch(exchange) for query in queries)
+
+        yield from filter_burp_log_for_json(index.iter_exchanges(prematch), queries)
 
 
 # ===================== 日志导出+主流程=====================
-def run_json_log_filter():
+def export_filtered_traffic(log_file, query_texts, use_index=True, workers=0, export_format=FORMAT_LOG,
+                            compression="", dedup_bodies=False):
+    """
+    流式读取日志 → 按查询筛选 → 边筛选边写入导出文件（每个查询一个文件，只遍历日志一次）
+    :param log_file: Burp日志文件路径（也可以是之前导出的 jsonl / parquet 文件）
+    :param query_texts: 查询表达式列表
+    :param use_index: 是否使用旁路索引（索引不可用时自动退回全量流式扫描）
+    :param workers: 并行筛选的进程数（大于1时跳过索引，按区间多进程全量筛选）
+    :param export_format: 导出格式（log / jsonl / parquet，见 traffic_export）
+    :param compression: jsonl / parquet 的压缩方式（gzip / zstd，默认不压缩）
+    :param dedup_bodies: log 格式中重复的正文以哈希占位；jsonl / parquet 的正文改存正文库（见 open_exchange_writer）
+    :return: [(查询表达式, 导出文件路径, 命中条数, 重复正文条数), ...]
+    :raises QuerySyntaxError: 查询表达式不合法
+    :raises ValueError: 导出格式或压缩方式不支持
+    """
+    queries = [compile_query(text) for text in query_texts]
+
+    # 生成带时间戳的导出文件名
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    export_filenames = []
+    for idx, query in enumerate(queries):
+        if query.text == default_query():
+            safe_keyword = TARGET_URL_KEYWORD.replace('/', '_').replace(':', '')
+        else:
+            safe_keyword = re.sub(r'[^\w.-]+', '_', query.text).strip('_')[:60] or "all"
+        suffix = f"_{idx + 1}" if len(queries) > 1 else ""
+        export_filenames.append(f"{EXPORT_DIR}burp_json_valid_{safe_keyword}_{timestamp}{suffix}")
+    # 先检查格式，避免筛选完才发现无法写入
+    export_path(export_filenames[0], export_format, compression)
+
+    def write_exports(results):
+        writers = [open_exchange_writer(filename, export_format, compression, dedup_bodies)
+                   for filename in export_filenames]
+        hit_counts = [0] * len(queries)
+        export_time = 0.0
+        try:
+            # 文本日志用正确的分隔符重组（每条有效记录含请求+响应两个条目），结构化格式每条一个记录
+            # 读取+解析+筛选与写出交替进行：前者记为 parse 阶段，写出记为 export 阶段
+            for hits, exchange in timed_iter(results, "parse"):
+                started_at = time.perf_counter()
+                for idx in hits:
+                    hit_counts[idx] += 1
+                    writers[idx].write_exchange(exchange)
+                export_time += time.perf_counter() - started_at
+        finally:
+            for writer in writers:
+                writer.close()
+            METRICS.observe_phase("export", export_time)
+        return [(query.text, os.path.abspath(writer.path), hit_count, writer.duplicate_bodies)
+                for query, writer, hit_count in zip(queries, writers, hit_counts)]
+
+    if is_export_file(log_file):
+        print(f"\n🔍 读取结构化导出文件：{log_file}")
+        return write_exports(filter_burp_log_for_json(iter_exported_exchanges(log_file), queries))
+
+    if workers > 1:
+        return write_exports(filter_burp_log_parallel(log_file, queries, workers))
+
+    if use_index:
+        try:
+            return write_exports(filter_burp_log_with_index(log_file, queries))
+        except sqlite3.Error as e:
+            print(f"⚠️  日志索引不可用（{str(e)}），退回全量扫描")
+
+    print(f"\n🔍 日志解析开始（流式读取）")
+    return write_exports(filter_burp_log_for_json(iter_exchanges(log_file), queries))
+
+
+def export_json_traffic(log_file, use_index=True, workers=0):
+    """
+    按默认规则（URL含目标关键词 + 响应头为 application/json）筛选并导出
+    :return: (导出文件路径, 有效JSON响应条数)
+    """
+    _, export_filename, valid_count, _ = export_filtered_traffic(log_file, [default_query()], use_index, workers)[0]
+    return export_filename, valid_count
+
+
+def run_json_log_filter(workers=0):
+    """
+    :param workers: 并行筛选的进程数（默认0：串行）
+    """
     try:
         # 检查日志文件是否存在
         if not os.path.exists(BURP_LOG_PATH):
             print(f"❌ 未找到Burp日志文件：{BURP_LOG_PATH}")
             return
-        # 读取日志内容（忽略编码错误，完整保留原始字符）
-        with open(BURP_LOG_PATH, "r", encoding="utf-8", errors="ignore") as f:
-            raw_log_content = f.read()
-        if not raw_log_content.strip():
+        if is_blank_log(BURP_LOG_PATH):
             print("❌ Burp日志文件为空")
             return
 
-        # 执行筛选
-        filtered_log_content, valid_count = filter_burp_log_for_json(raw_log_content)
-
-        # 生成带时间戳的导出文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_keyword = TARGET_URL_KEYWORD.replace('/', '_').replace(':', '')
-        export_filename = f"{EXPORT_DIR}burp_json_valid_{safe_keyword}_{timestamp}.log"
-
-        # 写入筛选结果
-        with open(export_filename, "w", encoding="utf-8") as f:
-            f.write(filtered_log_content)
+        # 执行筛选并导出
+        export_filename, valid_count = export_json_traffic(BURP_LOG_PATH, workers=workers)
 
-        print(f"\n✅ 筛选完成！导出文件：{os.path.abspath(export_filename)}")
+        print(f"\n✅ 筛选完成！导出文件：{export_filename}")
         print(f"📌 导出内容：{valid_count} 条完整流量（每条含请求头、请求体、响应头、JSON响应体）")
     except Exception as e:
         print(f"❌ 筛选异常：{str(e)}")
@@ -0,0 +1,164 @@
+# body_store.py
+# 响应正文去重：按 sha256 内容寻址，相同正文在本地正文库中只存一份（导出文件中以哈希引用），
+# 正文库超出大小上限时按最近使用时间淘汰；
+# 工具结果中相同的响应合并为一行“×N 条相同响应”，不再逐条重复推送
+import hashlib
+import os
+import tempfile
+from urllib.parse import urlsplit
+
+from config import BODY_STORE_DIR, BODY_STORE_MAX_BYTES
+
+
+def body_digest(body):
+    """正文的内容哈希（sha256 十六进制）"""
+    return hashlib.sha256(body).hexdigest()
+
+
+class BodyStore:
+    """
+    内容寻址的正文库：<根目录>/<哈希前两位>/<哈希>
+    文件修改时间即最近使用时间（读取或再次写入时更新），prune 按它淘汰最久未用的正文
+    用法：
+        store = BodyStore()
+        digest = store.put(body)
+        body = store.get(digest)
+        store.prune()               # 一批写入结束后调用
+    """
+
+    def __init__(self, root=BODY_STORE_DIR, max_bytes=BODY_STORE_MAX_BYTES):
+        """
+        :param root: 正文库目录
+        :param max_bytes: 总大小上限（字节，0 表示不限制）
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.written = 0            # 本次新写入的正文数
+        self.reused = 0             # 已存在、未重复写入的正文数
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, body):
+        """
+        保存正文（已存在则跳过）
+        :return: 正文哈希
+        """
+        digest = body_digest(body)
+        path = self.path(digest)
+        if self._touch(path):
+            self.reused += 1
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再改名，并发写入同一正文时不会读到半个文件
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(temp_path, path)
+        self.written += 1
+        return digest
+
+    def get(self, digest):
+        """
+        :return: 正文字节，不存在时返回 None
+        """
+        path = self.path(digest)
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return body
+
+    @staticmethod
+    def _touch(path):
+        """更新最近使用时间，文件不存在（或刚被淘汰）时返回 False"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def prune(self):
+        """
+        总大小超过上限时删除最久未用的正文，直到回到上限以内
+        :return: 删除的正文数
+        """
+        if not self.max_bytes or not os.path.isdir(self.root):
+            return 0
+        files = []
+        total = 0
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            for item in os.scandir(entry.path):
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+class DuplicateCounter:
+    """
+    按 方法 + 不含查询参数的URL + 状态码 + 正文哈希 合并相同的响应（轮询、配置接口等反复返回同样内容）
+    用法：
+        if counter.add(exchange, summary): push(summary)     # 只推送首次出现的响应
+        lines = counter.lines(limit)
+    """
+
+    def __init__(self):
+        self.total = 0
+        self._groups = {}           # 键 → [摘要, 次数]
+
+    @staticmethod
+    def key(exchange):
+        request, response = exchange.request, exchange.response
+        parts = urlsplit(request.url or "")
+        if response is None:
+            return request.method, parts.netloc, parts.path, None, None
+        return request.method, parts.netloc, parts.path, response.status, body_digest(response.body)
+
+    def add(self, exchange, summary):
+        """
+        :return: 是否首次出现
+        """
+        self.total += 1
+        key = self.key(exchange)
+        group = self._groups.get(key)
+        if group is not None:
+            group[1] += 1
+            return False
+        self._groups[key] = [summary, 1]
+        return True
+
+    @property
+    def unique(self):
+        return len(self._groups)
+
+    @property
+    def duplicates(self):
+        return self.total - len(self._groups)
+
+    def lines(self, limit=None):
+        """合并后的摘要行（重复的标注 ×N）"""
+        lines = []
+        for summary, count in list(self._groups.values())[:limit]:
+            lines.append(f"{summary}  ×{count} 条相同响应" if count > 1 else summary)
+        return lines
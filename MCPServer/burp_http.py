@@ -0,0 +1,228 @@
+# burp_http.py
+# Burp日志结构化解析：一次性解析请求行/状态行/头部字段为紧凑记录，并按位置配对请求与响应
+# 筛选时只需比较字段，不再对整条流量反复做 lower()/子串查找
+import re
+
+from MCPServer.burp_log import CHUNK_SIZE, decode_entry, iter_raw_traffic_entries
+
+# ===================== 首行匹配规则 =====================
+# 请求行：GET /path HTTP/1.1
+REQUEST_LINE_PATTERN = re.compile(r'^([A-Z]+) (\S+) HTTP/\d(?:\.\d)?$')
+# 状态行：HTTP/1.1 200 OK
+STATUS_LINE_PATTERN = re.compile(r'^HTTP/\d(?:\.\d)? (\d{3})')
+# Burp 条目元信息行：12:34:56  https://www.example.com:443  [1.2.3.4]
+META_LINE_PATTERN = re.compile(r'^\d{1,2}:\d{2}:\d{2}(?:\s+[AP]M)?\s+(https?)://([^\s/]+)')
+
+
+def split_head(raw):
+    """
+    找到头部与正文的分界（第一个空行）
+    :param raw: 条目原始字节（已去除前导空白）
+    :return: (头部字节, 正文起始下标)，无空行时整个条目视为头部
+    """
+    crlf = raw.find(b"\r\n\r\n")
+    lf = raw.find(b"\n\n")
+    if crlf >= 0 and (lf < 0 or crlf < lf):
+        return raw[:crlf], crlf + 4
+    if lf >= 0:
+        return raw[:lf], lf + 2
+    return raw, len(raw)
+
+
+# ===================== 结构化记录 =====================
+class HttpMessage:
+    """
+    单个 Burp 流量条目（请求 / 响应 / 元信息行）的解析结果
+    头部只解析一次，正文以原始字节切片的方式按需访问
+    """
+    __slots__ = ("kind", "method", "path", "host", "scheme", "status", "headers", "raw", "body_start", "offset",
+                 "size_hint")
+
+    def __init__(self, kind, raw, offset=None):
+        self.kind = kind            # request / response / meta / other
+        self.raw = raw              # 去除前导空白后的原始字节
+        self.offset = offset        # 在日志文件中的字节偏移（可选）
+        self.method = None
+        self.path = None
+        self.host = None
+        self.scheme = None
+        self.status = None
+        self.headers = {}           # 小写头部名 → 值（重复头部以 ", " 合并）
+        self.body_start = len(raw)
+        self.size_hint = None       # 只有头部字段、没有原始字节的记录（索引预判）由来源填写的正文字节数
+
+    @property
+    def content_type(self):
+        return self.headers.get("content-type")
+
+    @property
+    def body(self):
+        """正文原始字节"""
+        return self.raw[self.body_start:]
+
+    @property
+    def body_size(self):
+        """正文字节数（只有头部字段且来源未提供大小时为 None）"""
+        if self.raw:
+            return len(self.raw) - self.body_start
+        return self.size_hint
+
+    @property
+    def text(self):
+        """完整条目文本（已 strip，用于导出）"""
+        return decode_entry(self.raw).strip()
+
+    @property
+    def url(self):
+        """请求的完整 URL（协议来自 Burp 元信息行，Host 来自请求头）"""
+        if self.kind != "request":
+            return None
+        if self.host and self.path.startswith("/"):
+            return f"{self.scheme or 'http'}://{self.host}{self.path}"
+        return self.path
+
+    def is_json(self):
+        """Content-Type 是否声明为 JSON（application/json 或 application/xxx+json）"""
+        content_type = self.content_type
+        if not content_type:
+            return False
+        mime = content_type.split(";", 1)[0].strip().lower()
+        return mime == "application/json" or mime.endswith("+json")
+
+    def __repr__(self):
+        if self.kind == "request":
+            return f"<HttpMessage request {self.method} {self.url}>"
+        if self.kind == "response":
+            return f"<HttpMessage response {self.status} {self.content_type}>"
+        return f"<HttpMessage {self.kind}>"
+
+
+class HttpExchange:
+    """一次完整的请求/响应交互（响应可能缺失）"""
+    __slots__ = ("request", "response")
+
+    def __init__(self, request, response=None):
+        self.request = request
+        self.response = response
+
+    def __repr__(self):
+        return f"<HttpExchange {self.request!r} -> {self.response!r}>"
+
+
+def parse_message(raw, offset=None):
+    """
+    解析单个流量条目的首行和头部字段，不触碰正文
+    :param raw: 条目原始字节
+    :param offset: 条目在日志中的字节偏移（可选）
+    :return: HttpMessage
+    """
+    stripped = raw.lstrip()
+    if offset is not None:
+        offset += len(raw) - len(stripped)
+    head, body_start = split_head(stripped)
+    # 头部整体只解码一次，逐行按 ":" 切分
+    lines = head.decode("utf-8", errors="ignore").split("\n")
+    first = lines[0].rstrip("\r")
+
+    match = REQUEST_LINE_PATTERN.match(first)
+    if match:
+        message = HttpMessage("request", stripped, offset)
+        message.method, message.path = match.group(1), match.group(2)
+    else:
+        match = STATUS_LINE_PATTERN.match(first)
+        if match:
+            message = HttpMessage("response", stripped, offset)
+            message.status = int(match.group(1))
+        else:
+            match = META_LINE_PATTERN.match(first)
+            kind = "meta" if match else "other"
+            message = HttpMessage(kind, stripped, offset)
+            if match:
+                message.scheme, message.host = match.group(1), match.group(2)
+            return message
+
+    message.body_start = body_start
+    headers = message.headers
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if not sep:
+            continue
+        name = name.strip().lower()
+        value = value.strip()
+        headers[name] = f"{headers[name]}, {value}" if name in headers else value
+    message.host = headers.get("host")
+    return message
+
+
+def build_message(kind, first_line, headers, body=b""):
+    """
+    由已结构化的字段直接构造记录（DevTools 抓包、导出文件回读时使用，无需再解析文本）
+    :param kind: request / response
+    :param first_line: 请求行或状态行
+    :param headers: 小写头部名 → 值
+    :param body: 正文字节
+    :return: HttpMessage（method/path/status 等首行字段由调用方填写）
+    """
+    head = first_line + "\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    raw = head.encode("utf-8") + b"\r\n" + body
+    message = HttpMessage(kind, raw)
+    message.headers = headers
+    message.host = headers.get("host")
+    message.body_start = len(raw) - len(body)
+    return message
+
+
+# ===================== 请求/响应配对 =====================
+class ExchangePairer:
+    """
+    按位置配对：Burp 每次交互依次写入 元信息行 → 请求 → 响应，
+    响应归属于它之前最近的一条未配对请求；元信息行提供协议及 Host 兜底（如 HTTP/2 无 Host 头）
+    """
+
+    def __init__(self):
+        self.scheme = None
+        self.meta_host = None
+        self.pending = None
+
+    def feed(self, message):
+        """
+        输入一条解析后的条目
+        :return: 配对完成（或被下一条请求顶替）的 HttpExchange 列表
+        """
+        done = []
+        if message.kind == "meta":
+            self.scheme, self.meta_host = message.scheme, message.host
+        elif message.kind == "request":
+            message.scheme = self.scheme
+            if not message.host and self.meta_host:
+                message.host = self.meta_host.rsplit(":", 1)[0]
+            if self.pending:
+                done.append(HttpExchange(self.pending))
+            self.pending = message
+        elif message.kind == "response" and self.pending:
+            done.append(HttpExchange(self.pending, message))
+            self.pending = None
+        return done
+
+    def flush(self):
+        """输出最后一条未配对的请求"""
+        done = [HttpExchange(self.pending)] if self.pending else []
+        self.pending = None
+        return done
+
+
+def iter_exchanges(log_file, start=0, end=None, chunk_size=CHUNK_SIZE):
+    """
+    流式读取日志并产出配对后的请求/响应
+    :param log_file: Burp日志文件路径
+    :param start: 起始字节偏移（默认0）
+    :param end: 结束字节偏移（默认读到文件末尾）
+    :param chunk_size: 单次读取的块大小
+    :return: 生成器，按日志顺序产出 HttpExchange
+    """
+    pairer = ExchangePairer()
+    for offset, raw in iter_raw_traffic_entries(log_file, start, end, chunk_size):
+        if not raw.strip():
+            continue
+        yield from pairer.feed(parse_message(raw, offset))
+    yield from pairer.flush()
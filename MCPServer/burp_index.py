@@ -0,0 +1,224 @@
+# burp_index.py
+# Burp日志持久化索引：为每个流量条目记录字节偏移、长度及请求/响应关键字段
+# 索引以 SQLite 旁路文件保存（日志路径 + ".idx"），记住已索引到的偏移，
+# Burp 只会追加写日志，因此每次调用只需解析新增的字节
+import hashlib
+import os
+import sqlite3
+
+from MCPServer.burp_http import HttpExchange, HttpMessage, parse_message
+from MCPServer.burp_log import TRAFFIC_SEPARATOR_BYTES, iter_raw_entries
+
+# ===================== 全局配置 =====================
+# 索引文件后缀（与日志文件放在同一目录）
+INDEX_SUFFIX = ".idx"
+# 用于识别日志是否被清空/替换的文件头长度
+HEAD_SIGNATURE_SIZE = 4096
+# 索引格式版本，结构变化时自动重建
+INDEX_VERSION = "4"
+# 每解析这么多条目写入一次索引并提交（首次索引大日志时内存占用不随日志大小增长，中断后从最后一批继续）
+INDEX_BATCH_ROWS = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id           INTEGER PRIMARY KEY,
+    offset       INTEGER NOT NULL,
+    length       INTEGER NOT NULL,
+    kind         TEXT NOT NULL,
+    method       TEXT,
+    host         TEXT,
+    scheme       TEXT,
+    path         TEXT,
+    url          TEXT,
+    status       INTEGER,
+    content_type TEXT,
+    is_json      INTEGER NOT NULL DEFAULT 0,
+    request_id   INTEGER,
+    body_size    INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_entries_host ON entries(host);
+CREATE INDEX IF NOT EXISTS idx_entries_request ON entries(request_id);
+"""
+
+
+class BurpLogIndex:
+    """
+    Burp日志旁路索引
+    用法：
+        with BurpLogIndex(log_file) as index:
+            index.update()
+            for exchange in index.iter_exchanges(query.prematch):
+                ...
+    """
+
+    def __init__(self, log_file, index_file=None):
+        """
+        :param log_file: Burp日志文件路径
+        :param index_file: 索引文件路径（默认：日志路径 + ".idx"）
+        """
+        self.log_file = log_file
+        self.index_file = index_file or log_file + INDEX_SUFFIX
+        self.conn = sqlite3.connect(self.index_file)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- 元信息 ----------
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _head_signature(self, f, size):
+        f.seek(0)
+        return hashlib.sha1(f.read(size)).hexdigest()
+
+    def _reset(self):
+        # 直接删表重建，兼容索引结构升级
+        self.conn.executescript("DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS meta;" + SCHEMA)
+        self._set_meta("version", INDEX_VERSION)
+
+    @property
+    def indexed_offset(self):
+        """已完成索引的日志字节偏移"""
+        return int(self._get_meta("indexed_offset", 0))
+
+    # ---------- 增量构建 ----------
+    def update(self):
+        """
+        增量解析日志新追加的部分并写入索引
+        日志被清空、截断或替换（文件头签名变化）时自动重建
+        :return: 本次新增的条目数量
+        """
+        file_size = os.path.getsize(self.log_file)
+        with open(self.log_file, "rb") as f:
+            offset = self.indexed_offset
+            head_size = int(self._get_meta("head_size", 0))
+            if (self._get_meta("version") != INDEX_VERSION
+                    or file_size < offset
+                    or self._get_meta("head_signature") != self._head_signature(f, head_size)):
+                self._reset()
+                self.conn.commit()
+                offset = 0
+            if file_size == offset:
+                return 0
+            head_signature = None
+            if not offset:
+                head_size = min(HEAD_SIGNATURE_SIZE, file_size)
+                head_signature = self._head_signature(f, head_size)
+
+            # 恢复跨批次的配对状态：最近一条未配对的请求，以及最近一条元信息行的协议/Host
+            last = self.conn.execute(
+                "SELECT id, host, url FROM entries WHERE kind = 'request' ORDER BY id DESC LIMIT 1").fetchone()
+            paired = self.conn.execute(
+                "SELECT 1 FROM entries WHERE request_id = ? LIMIT 1", (last[0],)).fetchone() if last else True
+            current_request = None if paired else last
+            scheme = self._get_meta("scheme")
+            meta_host = self._get_meta("meta_host")
+
+            rows = []
+            added = 0
+            next_offset = offset
+            sep_len = len(TRAFFIC_SEPARATOR_BYTES)
+            next_id = (self.conn.execute("SELECT MAX(id) FROM entries").fetchone()[0] or 0) + 1
+
+            def flush():
+                # 条目与已索引偏移、配对状态在同一事务中提交，中断后下次从这里继续
+                nonlocal head_signature
+                with self.conn:
+                    self.conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    if head_signature is not None:
+                        self._set_meta("head_size", head_size)
+                        self._set_meta("head_signature", head_signature)
+                        head_signature = None
+                    self._set_meta("indexed_offset", next_offset)
+                    if scheme:
+                        self._set_meta("scheme", scheme)
+                        self._set_meta("meta_host", meta_host)
+                rows.clear()
+
+            # 最后一个分隔符之后的片段可能尚未写完，留到下次再索引
+            for entry_offset, raw in iter_raw_entries(f, start=offset, include_tail=False):
+                next_offset = entry_offset + len(raw) + sep_len
+                if not raw.strip():
+                    continue
+                message = parse_message(raw)
+                host, url, request_id = message.host, None, None
+                if message.kind == "meta":
+                    scheme, meta_host = message.scheme, message.host
+                elif message.kind == "request":
+                    message.scheme = scheme
+                    if not host and meta_host:
+                        host = message.host = meta_host.rsplit(":", 1)[0]
+                    url = message.url
+                    current_request = (next_id, host, url)
+                elif message.kind == "response" and current_request:
+                    # 按位置配对：响应归属于它之前最近的一条未配对请求
+                    request_id, host, url = current_request
+                    current_request = None
+                rows.append((next_id, entry_offset, len(raw), message.kind, message.method, host, message.scheme,
+                             message.path, url, message.status, message.content_type, message.is_json(), request_id,
+                             message.body_size))
+                next_id += 1
+                added += 1
+                if len(rows) >= INDEX_BATCH_ROWS:
+                    flush()
+
+            flush()
+            return added
+
+    # ---------- 查询 ----------
+    def iter_exchanges(self, prematch=None):
+        """
+        按日志顺序产出配对后的请求/响应，结果与全量流式配对（iter_exchanges）一致
+        :param prematch: 预判函数，接收只含头部字段的 HttpExchange（来自索引，不读日志），
+                         返回 False 的条目不会读取原始字节
+        :return: 生成器，产出完整解析的 HttpExchange
+        """
+        cursor = self.conn.execute(
+            """
+            SELECT req.offset, req.length, req.method, req.host, req.scheme, req.path,
+                   resp.offset, resp.length, resp.status, resp.content_type, resp.body_size
+            FROM entries AS req LEFT JOIN entries AS resp ON resp.request_id = req.id
+            WHERE req.kind = 'request'
+            ORDER BY req.id
+            """
+        )
+        with open(self.log_file, "rb") as f:
+            for (req_offset, req_length, method, host, scheme, path,
+                 resp_offset, resp_length, status, content_type, body_size) in cursor:
+                request = HttpMessage("request", b"", req_offset)
+                request.method, request.host, request.scheme, request.path = method, host, scheme, path
+                response = None
+                if resp_offset is not None:
+                    response = HttpMessage("response", b"", resp_offset)
+                    response.status = status
+                    response.size_hint = body_size
+                    if content_type is not None:
+                        response.headers["content-type"] = content_type
+                if prematch is not None and not prematch(HttpExchange(request, response)):
+                    continue
+
+                # 只读取可能命中的条目的字节区间
+                full_request = self._load(f, req_offset, req_length)
+                full_request.host, full_request.scheme = host, scheme
+                full_response = self._load(f, resp_offset, resp_length) if response is not None else None
+                yield HttpExchange(full_request, full_response)
+
+    @staticmethod
+    def _load(f, offset, length):
+        f.seek(offset)
+        return parse_message(f.read(length), offset)
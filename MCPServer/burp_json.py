@@ -0,0 +1,101 @@
+# burp_json.py
+# JSON 返回体检测：先按头部/正文分界取出正文，直接解析一次（安装了 orjson 时优先使用）；
+# 正文后有多余内容或被截断时，再用括号配平扫描器线性确定 JSON 值的范围，不再对整条流量做正则候选枚举
+import json
+import re
+
+try:
+    import orjson  # 可选依赖，解析速度更快
+except ImportError:
+    orjson = None
+
+# ===================== 全局配置 =====================
+# 扫描时只关心的结构记号：完整字符串（整体跳过）、未闭合的引号、括号
+TOKEN_PATTERN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|"|[{}\[\]]', re.DOTALL)
+# 正文前可能出现的 UTF-8 BOM 及常见的防 JSON 劫持前缀
+BODY_PREFIXES = (b"\xef\xbb\xbf", b")]}',", b")]}'", b"while(1);", b"for(;;);")
+# 闭合符 → 对应的开括号；开括号 → 补全用的闭合符
+OPENERS = {ord("}"): ord("{"), ord("]"): ord("[")}
+CLOSERS = {ord("{"): b"}", ord("["): b"]"}
+
+
+def strip_body(body):
+    """去除正文首尾空白、BOM 及防劫持前缀"""
+    body = body.strip()
+    for prefix in BODY_PREFIXES:
+        if body.startswith(prefix):
+            body = body[len(prefix):].lstrip()
+    return body
+
+
+def scan_json_extent(body):
+    """
+    括号配平扫描：从正文开头的 { 或 [ 出发，找到与之配平的结束位置
+    字符串整体由正则引擎在 C 层跳过，Python 只处理括号，整体为一次线性扫描
+    :param body: 已去除前导空白的正文字节
+    :return: (结束下标, 未闭合括号栈)
+             结束下标 >= 0 表示找到完整的 JSON 值；-1 表示正文被截断（栈中为尚未闭合的括号）；
+             None 表示括号不匹配或不是 JSON
+    """
+    if not body or body[0] not in b"{[":
+        return None, None
+    stack = []
+    for match in TOKEN_PATTERN.finditer(body):
+        char = body[match.start()]
+        if char == 0x22:  # 引号
+            if match.end() - match.start() == 1:
+                # 字符串未闭合（正文在字符串中间被截断），无法补全
+                return None, None
+            continue
+        if char in (0x7B, 0x5B):  # { [
+            stack.append(char)
+        else:  # } ]
+            if not stack or stack.pop() != OPENERS[char]:
+                return None, None
+            if not stack:
+                return match.end(), stack
+    return -1, stack
+
+
+def loads_json(data):
+    """解析 JSON 字节，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8", errors="strict"))
+
+
+def extract_json_body(body, min_length=0, allow_truncated=True):
+    """
+    从响应正文中提取合法的 JSON 值
+    :param body: 正文原始字节（HttpMessage.body）
+    :param min_length: 最小 JSON 长度，过滤无意义的短片段（如 {}）
+    :param allow_truncated: 是否按未闭合括号栈补全被截断的正文（如 Burp 截断的大响应）
+    :return: 合法 JSON 的字节串，不是合法 JSON 时返回 None
+    """
+    body = strip_body(body)
+    if not body or body[0] not in b"{[" or len(body) < min_length:
+        return None
+    # 快速路径：正文本身就是完整 JSON（绝大多数情况），一次解析即可
+    try:
+        loads_json(body)
+        return body
+    except ValueError:
+        pass
+    # 慢速路径：正文后有多余内容或被截断，先配平扫描确定 JSON 值的范围
+    end, stack = scan_json_extent(body)
+    if end is None:
+        return None
+    if end >= 0:
+        candidate = body[:end]
+    elif allow_truncated and stack:
+        # 截断的正文：去掉末尾悬空的逗号后按栈逆序补全闭合符
+        candidate = body.rstrip().rstrip(b",") + b"".join(CLOSERS[c] for c in reversed(stack))
+    else:
+        return None
+    if len(candidate) < min_length:
+        return None
+    try:
+        loads_json(candidate)
+    except ValueError:
+        return None
+    return candidate
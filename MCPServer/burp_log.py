@@ -0,0 +1,153 @@
+# burp_log.py
+# Burp日志流式解析：按固定大小分块读取，增量查找分隔符，逐条产出流量条目
+# 供 MCPServer/Selenium.py 与 utils/burp日志优化.py 共用，内存占用与日志总大小无关
+
+# ===================== 全局配置 =====================
+# Burp 日志默认分隔符（用于拆分单个流量条目）
+TRAFFIC_SEPARATOR = "======================================================"
+TRAFFIC_SEPARATOR_BYTES = TRAFFIC_SEPARATOR.encode("ascii")
+# 每次从磁盘读取的块大小（1MB），峰值内存约为 块大小 + 单条最大流量条目
+CHUNK_SIZE = 1024 * 1024
+
+
+# ===================== 底层：按字节分块切分 =====================
+def iter_raw_entries(f, start=0, end=None, chunk_size=CHUNK_SIZE, include_tail=True):
+    """
+    从二进制文件对象中逐条产出分隔符之间的原始字节块
+    切分语义与 content.split(TRAFFIC_SEPARATOR) 完全一致（含首尾的空片段）
+    :param f: 以 "rb" 方式打开的文件对象
+    :param start: 起始字节偏移（默认0）
+    :param end: 结束字节偏移（默认读到文件末尾）
+    :param chunk_size: 单次读取的块大小
+    :param include_tail: 是否产出最后一个分隔符之后的片段（增量读取时该片段可能尚未写完）
+    :return: 生成器，产出 (字节偏移, 原始字节)
+    """
+    sep = TRAFFIC_SEPARATOR_BYTES
+    sep_len = len(sep)
+    f.seek(start)
+    # 可变缓冲：追加新块和丢弃已产出的前缀都不复制整个缓冲（超过块大小的条目不会被反复拷贝）
+    buf = bytearray()
+    buf_offset = start  # buf[0] 对应的文件偏移
+    search_from = 0
+    remaining = None if end is None else end - start
+
+    while True:
+        if remaining is not None and remaining <= 0:
+            chunk = b""
+        else:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = f.read(size)
+            if remaining is not None:
+                remaining -= len(chunk)
+
+        if chunk:
+            buf += chunk
+
+        # 在已缓冲的数据中查找所有完整的分隔符
+        pos = 0
+        while True:
+            idx = buf.find(sep, max(pos, search_from))
+            if idx < 0:
+                break
+            yield buf_offset + pos, bytes(buf[pos:idx])
+            pos = idx + sep_len
+            search_from = pos
+
+        # 丢弃已产出的部分，只保留未结束的条目
+        if pos:
+            del buf[:pos]
+            buf_offset += pos
+            search_from = 0
+        # 下次只需从可能跨块的位置开始查找，避免重复扫描
+        search_from = max(search_from, len(buf) - sep_len + 1)
+
+        if not chunk:
+            break
+
+    if include_tail:
+        yield buf_offset, bytes(buf)
+
+
+def decode_entry(raw):
+    """
+    将原始字节解码为文本，行为与 open(..., "r", encoding="utf-8", errors="ignore") 保持一致
+    :param raw: 原始字节
+    :return: 统一换行符后的字符串
+    """
+    text = raw.decode("utf-8", errors="ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+# ===================== 对外接口：逐条产出流量条目 =====================
+def iter_traffic_entries(log_file, start=0, end=None, chunk_size=CHUNK_SIZE):
+    """
+    惰性遍历 Burp 日志中的流量条目（不一次性读入整个文件）
+    :param log_file: Burp日志文件路径
+    :param start: 起始字节偏移（默认0）
+    :param end: 结束字节偏移（默认读到文件末尾）
+    :param chunk_size: 单次读取的块大小
+    :return: 生成器，逐条产出原始流量条目字符串（未 strip，与 split 结果一致）
+    """
+    for _, raw in iter_raw_traffic_entries(log_file, start, end, chunk_size):
+        yield decode_entry(raw)
+
+
+def iter_raw_traffic_entries(log_file, start=0, end=None, chunk_size=CHUNK_SIZE, include_tail=True):
+    """
+    惰性遍历 Burp 日志中的流量条目，不做解码（供结构化解析使用）
+    :param log_file: Burp日志文件路径
+    :param start: 起始字节偏移（默认0）
+    :param end: 结束字节偏移（默认读到文件末尾）
+    :param chunk_size: 单次读取的块大小
+    :param include_tail: 是否产出最后一个分隔符之后的片段
+    :return: 生成器，产出 (字节偏移, 原始字节)
+    """
+    with open(log_file, "rb") as f:
+        yield from iter_raw_entries(f, start, end, chunk_size, include_tail)
+
+
+def is_blank_log(log_file):
+    """
+    判断日志文件是否为空（或只包含空白字符），只读取到第一个非空白字节为止
+    :param log_file: Burp日志文件路径
+    :return: True 表示文件为空
+    """
+    with open(log_file, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return True
+            if chunk.strip():
+                return False
+
+
+class TrafficLogWriter:
+    """
+    逐条写入筛选后的条目，格式与原先 "\n\n" + 分隔符 + "\n\n" 重组的日志一致
+    用法：with TrafficLogWriter(path) as writer: writer.write(entry)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.out = open(path, "w", encoding="utf-8")
+        self.out.write(TRAFFIC_SEPARATOR + "\n\n")
+
+    def write(self, entry):
+        if self.count:
+            self.out.write("\n\n" + TRAFFIC_SEPARATOR + "\n\n")
+        self.out.write(entry)
+        self.count += 1
+
+    def close(self):
+        if not self.out.closed:
+            self.out.write("\n\n" + TRAFFIC_SEPARATOR)
+            self.out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,127 @@
+# burp_parallel.py
+# Burp日志多进程并行筛选：按条目分隔符把日志切成若干字节区间，
+# 各子进程自行打开日志文件读取自己的区间（不传递大字符串），结果按原始顺序合并
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from MCPServer.burp_http import META_LINE_PATTERN, ExchangePairer, parse_message
+from MCPServer.burp_log import TRAFFIC_SEPARATOR_BYTES, iter_raw_traffic_entries
+
+# ===================== 全局配置 =====================
+# 每个子进程分到的区间数（区间多一些便于负载均衡）
+RANGES_PER_WORKER = 4
+# 小于该大小的日志不值得并行（进程启动开销更大）
+MIN_PARALLEL_SIZE = 8 * 1024 * 1024
+# 查找分隔符时的读取窗口
+SCAN_WINDOW = 64 * 1024
+
+
+def default_workers():
+    """默认进程数：CPU 核数"""
+    return os.cpu_count() or 1
+
+
+# ===================== 区间切分 =====================
+def _next_boundary(f, pos, limit):
+    """
+    从 pos 开始查找下一个分隔符，返回分隔符之后的偏移（即下一条目的起始位置）
+    :return: 偏移，limit 之前找不到时返回 None
+    """
+    sep = TRAFFIC_SEPARATOR_BYTES
+    sep_len = len(sep)
+    while pos < limit:
+        f.seek(pos)
+        # 窗口多读 sep_len + 1 字节，保证跨窗口的分隔符能被完整找到
+        window = f.read(SCAN_WINDOW + sep_len + 1)
+        if not window:
+            return None
+        idx = window.find(sep)
+        while 0 <= idx <= SCAN_WINDOW:
+            end = idx + sep_len
+            # 由连续等号组成的超长分隔行无法确定切分位置，跳过
+            if (idx == 0 or window[idx - 1] != 0x3D) and window[end:end + 1] != b"=":
+                boundary = pos + end
+                return boundary if boundary < limit else None
+            idx = window.find(sep, end)
+        pos += SCAN_WINDOW + 1
+    return None
+
+
+def _is_meta_entry(f, offset):
+    """判断 offset 处的条目是否以 Burp 元信息行开头（即一次完整交互的起点）"""
+    f.seek(offset)
+    head = f.read(256).lstrip()
+    first = head.split(b"\n", 1)[0].rstrip(b"\r").decode("utf-8", errors="ignore")
+    return bool(META_LINE_PATTERN.match(first))
+
+
+def split_log_ranges(log_file, parts, exchange_aligned=True):
+    """
+    把日志切成若干字节区间，切分点均落在分隔符之后
+    :param log_file: Burp日志文件路径
+    :param parts: 期望的区间数
+    :param exchange_aligned: 是否要求切分点落在元信息行之前（保证同一次交互不被切开）
+    :return: [(起始偏移, 结束偏移), ...]
+    """
+    size = os.path.getsize(log_file)
+    if parts <= 1 or size == 0:
+        return [(0, size)]
+    boundaries = [0]
+    with open(log_file, "rb") as f:
+        for k in range(1, parts):
+            target = max(size * k // parts, boundaries[-1] + 1)
+            limit = size * (k + 1) // parts if k + 1 < parts else size
+            boundary = _next_boundary(f, target, limit)
+            while exchange_aligned and boundary is not None and not _is_meta_entry(f, boundary):
+                boundary = _next_boundary(f, boundary, limit)
+            if boundary is not None and boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+# ===================== 区间内的请求/响应配对 =====================
+def iter_range_exchanges(log_file, start, end):
+    """
+    产出请求起始于 [start, end) 的所有交互，与全量串行配对的结果一致：
+    区间开头没有请求可配的响应由上一个区间负责；区间末尾的未配对请求会越过 end 继续读取它的响应
+    :param log_file: Burp日志文件路径
+    :param start: 区间起始偏移（须为条目起始位置）
+    :param end: 区间结束偏移
+    :return: 生成器，按日志顺序产出 HttpExchange
+    """
+    pairer = ExchangePairer()
+    for offset, raw in iter_raw_traffic_entries(log_file, start):
+        if not raw.strip():
+            continue
+        if offset >= end:
+            if pairer.pending is None:
+                break
+            message = parse_message(raw, offset)
+            if message.kind == "request":
+                break
+            if message.kind == "response":
+                yield from pairer.feed(message)
+                break
+            continue
+        yield from pairer.feed(parse_message(raw, offset))
+    yield from pairer.flush()
+
+
+# ===================== 调度 =====================
+def map_log_ranges(log_file, range_func, workers=None, exchange_aligned=True):
+    """
+    多进程处理日志的各个区间，按原始顺序产出每个区间的处理结果
+    :param log_file: Burp日志文件路径
+    :param range_func: 顶层函数 range_func(log_file, start, end)，须可被子进程导入
+    :param workers: 进程数（默认：CPU 核数）；日志较小或进程数 <= 1 时在当前进程串行执行
+    :param exchange_aligned: 切分点是否对齐到完整交互
+    :return: 生成器，按区间顺序产出 range_func 的返回值
+    """
+    workers = workers or default_workers()
+    if workers <= 1 or os.path.getsize(log_file) < MIN_PARALLEL_SIZE:
+        yield range_func(log_file, 0, os.path.getsize(log_file))
+        return
+    ranges = split_log_ranges(log_file, workers * RANGES_PER_WORKER, exchange_aligned)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(range_func, [log_file] * len(ranges), *zip(*ranges))
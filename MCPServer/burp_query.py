@@ -0,0 +1,395 @@
+# burp_query.py
+# Burp流量筛选查询语言：把查询表达式编译为一次性的判定函数，作用于配对后的 HttpExchange
+#
+# 语法（空格分隔的条件默认为 AND）：
+#   dipp.sf-express.com                 不带字段名：Host 或完整 URL 含该关键词（大小写不敏感）
+#   host:*.example.com                  Host（含通配符时按 glob 匹配，否则为子串匹配）
+#   url:/api/  path:/api/*  path:~^/v\d+/  完整 URL / 路径（子串、glob 或 ~正则）
+#   method:GET,POST                     请求方法
+#   status:200  status:2xx  status:200-299  status:>=400   响应状态码
+#   type:json  type:text/html           响应 Content-Type（json 表示声明为 JSON）
+#   size:>1k  size:100-5000             响应正文字节数（支持 k/m 后缀；旁路索引中记录了大小，无需读取正文）
+#   body:json  body:token               正文为合法 JSON / 正文含指定文本
+#   has:data.list  has:items.0.id       JSON 正文中存在指定键路径
+#   组合：OR / |、AND / &、NOT / - / !、括号；值含空格或括号时用双引号包裹，如 path:"/a (b)"
+#   未知的字段名（如拼错的 stauts:200）报错；含冒号的关键词（如 "localhost:8080"）用双引号包裹
+#
+# 编译时按开销排序：Host/方法/状态码等头部字段先判断，正文大小其次，正文解析放在最后
+import fnmatch
+import functools
+import re
+
+from MCPServer.burp_json import extract_json_body, loads_json
+
+# 词法：括号、双引号字符串、字段:值、普通单词
+TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|("(?:[^"\\]|\\.)*"|[^\s()"]+(?:"(?:[^"\\]|\\.)*")?))')
+# 数值范围：200 / 2xx / 200-299 / >=400 / <1k
+RANGE_PATTERN = re.compile(r'^(>=|<=|>|<)?(\d+(?:\.\d+)?)([km]?)(?:-(\d+(?:\.\d+)?)([km]?))?$', re.IGNORECASE)
+UNITS = {"": 1, "k": 1024, "m": 1024 * 1024}
+
+# 条件开销：HEAD 只需头部字段，SIZE 需要正文大小（旁路索引中也有，无需读取正文），BODY 需要读取并解析正文
+HEAD = 0
+SIZE = 1
+BODY = 2
+# 字段名的形式（不符合的如 https://、example.com:8080 视为普通关键词）
+FIELD_PATTERN = re.compile(r"^[a-z_]+$")
+
+
+class QuerySyntaxError(ValueError):
+    """查询表达式语法错误"""
+
+
+# ===================== 语法树节点 =====================
+class Term:
+    """单个条件"""
+    __slots__ = ("text", "cost", "func")
+
+    def __init__(self, text, cost, func):
+        self.text = text
+        self.cost = cost
+        self.func = func
+
+    def evaluate(self, exchange, cache, head_only):
+        # 只有头部信息时，正文条件无法判断，返回 None（未知）；正文大小由条件函数自行判断是否已知
+        if head_only and self.cost == BODY:
+            return None
+        return self.func(exchange, cache)
+
+
+class Not:
+    __slots__ = ("child", "cost")
+
+    def __init__(self, child):
+        self.child = child
+        self.cost = child.cost
+
+    def evaluate(self, exchange, cache, head_only):
+        result = self.child.evaluate(exchange, cache, head_only)
+        return None if result is None else not result
+
+
+class And:
+    __slots__ = ("children", "cost")
+
+    def __init__(self, children):
+        # 便宜的条件排在前面，尽早短路
+        self.children = sorted(children, key=lambda c: c.cost)
+        self.cost = max(c.cost for c in children)
+
+    def evaluate(self, exchange, cache, head_only):
+        unknown = False
+        for child in self.children:
+            result = child.evaluate(exchange, cache, head_only)
+            if result is False:
+                return False
+            if result is None:
+                unknown = True
+        return None if unknown else True
+
+
+class Or:
+    __slots__ = ("children", "cost")
+
+    def __init__(self, children):
+        self.children = sorted(children, key=lambda c: c.cost)
+        self.cost = max(c.cost for c in children)
+
+    def evaluate(self, exchange, cache, head_only):
+        unknown = False
+        for child in self.children:
+            result = child.evaluate(exchange, cache, head_only)
+            if result is True:
+                return True
+            if result is None:
+                unknown = True
+        return None if unknown else False
+
+
+class Query:
+    """编译后的查询"""
+
+    def __init__(self, text, root):
+        self.text = text
+        self.root = root
+
+    @property
+    def needs_body(self):
+        """是否包含需要读取正文的条件"""
+        return self.root is not None and self.root.cost == BODY
+
+    def match(self, exchange):
+        """完整判断一组请求/响应是否命中"""
+        if self.root is None:
+            return True
+        return self.root.evaluate(exchange, {}, False) is True
+
+    def prematch(self, exchange):
+        """
+        只用头部字段预判（正文条件视为未知），返回 False 表示一定不命中
+        供旁路索引在读取正文之前剔除不可能命中的条目
+        """
+        if self.root is None:
+            return True
+        return self.root.evaluate(exchange, {}, True) is not False
+
+    def __repr__(self):
+        return f"<Query {self.text!r}>"
+
+
+# ===================== 条件编译 =====================
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+def _text_matcher(pattern):
+    """含通配符时按 glob 匹配，否则为子串匹配（均不区分大小写）"""
+    pattern = pattern.lower()
+    if any(c in pattern for c in "*?["):
+        return lambda value: value is not None and fnmatch.fnmatchcase(value.lower(), pattern)
+    return lambda value: value is not None and pattern in value.lower()
+
+
+def _range_matcher(spec, field):
+    """解析逗号分隔的数值范围，如 200,3xx,>=500,1k-10k"""
+    checks = []
+    for part in spec.split(","):
+        part = part.strip()
+        if re.fullmatch(r'\dxx', part, re.IGNORECASE):
+            low = int(part[0]) * 100
+            checks.append(lambda n, low=low: low <= n < low + 100)
+            continue
+        match = RANGE_PATTERN.match(part)
+        if not match:
+            raise QuerySyntaxError(f"{field} 的取值不合法：{part}")
+        op, low, low_unit, high, high_unit = match.groups()
+        low = float(low) * UNITS[low_unit.lower()]
+        if high is not None:
+            high = float(high) * UNITS[high_unit.lower()]
+            checks.append(lambda n, low=low, high=high: low <= n <= high)
+        elif op == ">=":
+            checks.append(lambda n, low=low: n >= low)
+        elif op == "<=":
+            checks.append(lambda n, low=low: n <= low)
+        elif op == ">":
+            checks.append(lambda n, low=low: n > low)
+        elif op == "<":
+            checks.append(lambda n, low=low: n < low)
+        else:
+            checks.append(lambda n, low=low: n == low)
+    return lambda n: n is not None and any(check(n) for check in checks)
+
+
+def _json_body(exchange, cache):
+    """
+    解析响应正文中的 JSON（同一次判断内只解析一次）
+    :return: (是否为合法 JSON, 解析结果)
+    """
+    if "json" not in cache:
+        cache["json"] = (False, None)
+        if exchange.response is not None:
+            body = extract_json_body(exchange.response.body)
+            if body is not None:
+                cache["json"] = (True, loads_json(body))
+    return cache["json"]
+
+
+def _has_key(data, path):
+    for key in path:
+        if isinstance(data, dict) and key in data:
+            data = data[key]
+        elif isinstance(data, list) and key.isdigit() and int(key) < len(data):
+            data = data[int(key)]
+        else:
+            return False
+    return True
+
+
+def _compile_term(token):
+    field, sep, value = token.partition(":")
+    field = field.lower()
+    if sep and field not in FIELDS and FIELD_PATTERN.match(field) and not value.startswith("//"):
+        raise QuerySyntaxError(f"未知字段：{field}（可用字段：{', '.join(FIELDS)}；"
+                               f"含冒号的关键词请用双引号包裹）")
+    if not sep or field not in FIELDS:
+        # 不带字段名：Host 或完整 URL 含关键词
+        matches = _text_matcher(_unquote(token))
+        return Term(token, HEAD, lambda ex, _: matches(ex.request.host) or matches(ex.request.url))
+    value = _unquote(value)
+    if not value:
+        raise QuerySyntaxError(f"条件缺少取值：{token}")
+    return Term(token, *FIELDS[field](value))
+
+
+def _host_term(value):
+    matches = _text_matcher(value)
+    return HEAD, lambda ex, _: matches(ex.request.host)
+
+
+def _url_term(value):
+    matches = _text_matcher(value)
+    return HEAD, lambda ex, _: matches(ex.request.url)
+
+
+def _path_term(value):
+    if value.startswith("~"):
+        # path:~正则
+        try:
+            pattern = re.compile(value[1:])
+        except re.error as e:
+            raise QuerySyntaxError(f"path 正则不合法：{value}（{e}）")
+        return HEAD, lambda ex, _: ex.request.path is not None and pattern.search(ex.request.path) is not None
+    if any(c in value for c in "*?["):
+        return HEAD, lambda ex, _: ex.request.path is not None and fnmatch.fnmatchcase(ex.request.path, value)
+    return HEAD, lambda ex, _: ex.request.path is not None and value in ex.request.path
+
+
+def _method_term(value):
+    methods = {m.strip().upper() for m in value.split(",") if m.strip()}
+    return HEAD, lambda ex, _: ex.request.method in methods
+
+
+def _status_term(value):
+    matches = _range_matcher(value, "status")
+    return HEAD, lambda ex, _: ex.response is not None and matches(ex.response.status)
+
+
+def _type_term(value):
+    if value.lower() == "json":
+        return HEAD, lambda ex, _: ex.response is not None and ex.response.is_json()
+    matches = _text_matcher(value if any(c in value for c in "*?[") else value + "*")
+    return HEAD, lambda ex, _: ex.response is not None and matches(ex.response.content_type)
+
+
+def _size_term(value):
+    matches = _range_matcher(value, "size")
+
+    def size(ex, _):
+        if ex.response is None:
+            return False
+        body_size = ex.response.body_size
+        # 只有头部且大小未知（如 DevTools 尚未取正文）时无法判断
+        return None if body_size is None else matches(body_size)
+    return SIZE, size
+
+
+def _body_term(value):
+    if value.lower() == "json":
+        return BODY, lambda ex, cache: _json_body(ex, cache)[0]
+    needle = value.encode("utf-8")
+    return BODY, lambda ex, _: ex.response is not None and needle in ex.response.body
+
+
+def _has_term(value):
+    path = [key for key in value.split(".") if key]
+
+    def has(ex, cache):
+        valid, data = _json_body(ex, cache)
+        return valid and _has_key(data, path)
+    return BODY, has
+
+
+FIELDS = {
+    "host": _host_term,
+    "url": _url_term,
+    "path": _path_term,
+    "method": _method_term,
+    "status": _status_term,
+    "type": _type_term,
+    "size": _size_term,
+    "body": _body_term,
+    "has": _has_term,
+}
+
+
+# ===================== 语法分析（递归下降）=====================
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN_PATTERN.match(text, pos)
+        if not match or match.end() == pos:
+            raise QuerySyntaxError(f"无法解析的查询：{text[pos:]}")
+        pos = match.end()
+        tokens.append(match.group(1) or match.group(2) or match.group(3))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QuerySyntaxError(f"多余的内容：{self.peek()}")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() in ("OR", "|"):
+            self.next()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() not in (None, ")", "OR", "|"):
+            if self.peek() in ("AND", "&"):
+                self.next()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_not(self):
+        token = self.peek()
+        if token in ("NOT", "-", "!"):
+            self.next()
+            return Not(self.parse_not())
+        if token and len(token) > 1 and token[0] in "-!" and token[1] != '"':
+            # -host:xxx / !type:json 形式的取反
+            self.tokens[self.pos] = token[1:]
+            return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        token = self.next()
+        if token is None:
+            raise QuerySyntaxError("查询表达式不完整")
+        if token == "(":
+            node = self.parse_or()
+            if self.next() != ")":
+                raise QuerySyntaxError("缺少右括号")
+            return node
+        if token in (")", "OR", "|", "AND", "&"):
+            raise QuerySyntaxError(f"意外的符号：{token}")
+        return _compile_term(token)
+
+
+@functools.lru_cache(maxsize=128)
+def compile_query(text):
+    """
+    编译查询表达式（相同表达式只编译一次）
+    :param text: 查询表达式，空字符串表示不过滤
+    :return: Query
+    :raises QuerySyntaxError: 表达式不合法
+    """
+    tokens = _tokenize(text or "")
+    root = _Parser(tokens).parse() if tokens else None
+    return Query(text, root)
+
+
+def split_queries(text):
+    """把以分号分隔的多个查询拆开（引号内的分号不拆）"""
+    parts = re.findall(r'(?:"(?:[^"\\]|\\.)*"|[^;"])+', text or "")
+    return [part.strip() for part in parts if part.strip()]
@@ -0,0 +1,111 @@
+# burp_tail.py
+# Burp日志实时跟踪：记住已读取的偏移，轮询日志新追加的字节，只解析新增条目并产出配对后的请求/响应；
+# 可在流量静默一段时间后提前结束（网络空闲等待）
+import asyncio
+import os
+
+from MCPServer.burp_http import ExchangePairer, parse_message
+from MCPServer.burp_log import TRAFFIC_SEPARATOR_BYTES, iter_raw_entries
+
+# ===================== 全局配置 =====================
+# 默认轮询间隔（秒）
+POLL_INTERVAL = 0.5
+
+
+class BurpLogTail:
+    """
+    Burp日志增量读取器
+    用法：
+        tail = BurpLogTail(log_file)
+        while ...:
+            for exchange in tail.poll():
+                ...
+        exchanges = tail.flush()
+    """
+
+    def __init__(self, log_file, from_start=False):
+        """
+        :param log_file: Burp日志文件路径
+        :param from_start: 是否从文件开头读取（默认只读取之后新追加的流量）
+        """
+        self.log_file = log_file
+        self.offset = 0
+        if not from_start and os.path.exists(log_file):
+            self.offset = os.path.getsize(log_file)
+        self.pairer = ExchangePairer()
+
+    def poll(self):
+        """
+        读取自上次调用以来新追加的完整条目（最后一个分隔符之后尚未写完的片段留到下次）
+        日志被清空或截断时从头开始
+        :return: 新配对完成的 HttpExchange 列表
+        """
+        if not os.path.exists(self.log_file):
+            return []
+        size = os.path.getsize(self.log_file)
+        if size < self.offset:
+            self.offset = 0
+            self.pairer = ExchangePairer()
+        if size == self.offset:
+            return []
+
+        exchanges = []
+        sep_len = len(TRAFFIC_SEPARATOR_BYTES)
+        with open(self.log_file, "rb") as f:
+            for offset, raw in iter_raw_entries(f, self.offset, size, include_tail=False):
+                self.offset = offset + len(raw) + sep_len
+                if raw.strip():
+                    exchanges.extend(self.pairer.feed(parse_message(raw, offset)))
+        return exchanges
+
+    def flush(self):
+        """结束跟踪：输出最后一条尚未等到响应的请求"""
+        return self.pairer.flush()
+
+
+def sample_activity(activity):
+    """调用活动采样函数，出错（如浏览器已关闭）时视为无额外活动"""
+    try:
+        return activity()
+    except Exception:
+        return None, False
+
+
+async def follow_exchanges(log_file, duration, interval=POLL_INTERVAL, from_start=False, tail=None,
+                           idle_time=0, activity=None):
+    """
+    在 duration 秒内持续跟踪日志，新流量一经写入即产出
+    :param log_file: Burp日志文件路径
+    :param duration: 跟踪时长（秒）；设置 idle_time 时为最长跟踪时间
+    :param interval: 轮询间隔（秒）
+    :param from_start: 是否先回放已有日志
+    :param tail: 复用已有的 BurpLogTail（如需在跟踪开始前记录起始偏移）
+    :param idle_time: 静默窗口（秒，默认0：跟踪满 duration 秒）；大于0时日志连续 idle_time 秒
+                      没有新流量、且 activity 报告的网络活动也没有变化时提前结束
+    :param activity: 同步函数，返回 (活动标记, 是否有进行中的请求)，如浏览器已完成的请求数和未完成的 XHR/fetch 数；
+                     标记变化或有进行中的请求时重新计算静默时间
+    :return: 异步生成器，按日志顺序产出 HttpExchange
+    """
+    tail = tail or BurpLogTail(log_file, from_start)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    last_state = None
+    quiet_since = loop.time()
+    while True:
+        # 读文件放到线程中执行，避免阻塞事件循环
+        for exchange in await asyncio.to_thread(tail.poll):
+            yield exchange
+        now = loop.time()
+        if now >= deadline:
+            break
+        if idle_time > 0:
+            marker, busy = await asyncio.to_thread(sample_activity, activity) if activity else (None, False)
+            state = (tail.offset, marker)
+            if busy or state != last_state:
+                last_state = state
+                quiet_since = now
+            elif now - quiet_since >= idle_time:
+                break
+        await asyncio.sleep(interval)
+    for exchange in tail.flush():
+        yield exchange
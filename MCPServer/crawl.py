@@ -0,0 +1,221 @@
+# crawl.py
+# 多页面并行爬取：从种子URL出发按广度优先发现同源链接（或只访问给定的URL列表），
+# 多个浏览器会话并行访问页面，每个会话独立用 DevTools 抓包，捕获的流量标记为触发它的页面
+import asyncio
+import functools
+import re
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from MCPServer.body_store import DuplicateCounter
+from MCPServer.burp_tail import follow_exchanges
+from MCPServer.devtools_capture import DevToolsCapture
+from MCPServer.webdriver_pool import network_activity
+
+# ===================== 全局配置 =====================
+# 默认并行的浏览器会话数
+DEFAULT_CRAWL_SESSIONS = 3
+# 默认最大链接深度（种子页为 0）及页面总数上限
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_PAGES = 50
+# 单个页面的最长停留时间及网络空闲静默窗口（秒）
+PAGE_WAIT_TIME = 15
+PAGE_IDLE_TIME = 2
+# 不访问的链接（避免爬取过程中退出登录）
+EXCLUDE_LINK_PATTERN = re.compile(r'log-?out|sign-?out|exit', re.IGNORECASE)
+# 每个页面在报告中保留的匹配摘要条数上限
+MAX_PAGE_MATCHES = 20
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# 收集页面中的链接（href 属性经浏览器解析后已是绝对地址）
+LINKS_SCRIPT = """
+return Array.from(document.querySelectorAll('a[href], area[href], iframe[src], frame[src]'),
+                  el => el.href || el.src);
+"""
+
+
+def normalize_url(url):
+    """
+    规范化URL用于去重：协议/主机小写，去掉默认端口和锚点，查询参数排序，空路径补 /
+    :return: 规范化后的URL；非 http/https 地址返回 None
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    netloc = parts.hostname.lower()
+    if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+        netloc += f":{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def url_origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class CrawlPage:
+    """单个页面的爬取结果"""
+    __slots__ = ("url", "depth", "parent", "captured", "matched", "duplicates", "matches", "links", "elapsed",
+                 "error")
+
+    def __init__(self, url, depth, parent=None):
+        self.url = url
+        self.depth = depth
+        self.parent = parent        # 发现该页面的上级页面
+        self.captured = 0           # 页面触发的请求数
+        self.matched = 0            # 命中查询的流量数
+        self.duplicates = 0         # 其中与之前（本页或其他页面）完全相同的响应数
+        self.matches = []           # 首次出现的命中流量摘要（最多 MAX_PAGE_MATCHES 条）
+        self.links = 0              # 新加入队列的链接数
+        self.elapsed = 0.0
+        self.error = None
+
+    def to_dict(self):
+        return {"url": self.url, "depth": self.depth, "parent": self.parent, "captured": self.captured,
+                "matched": self.matched, "duplicates": self.duplicates, "matches": self.matches, "new_links": self.links,
+                "elapsed": round(self.elapsed, 2), "error": self.error}
+
+
+class Crawler:
+    """
+    多会话并行爬取
+    用法：
+        crawler = Crawler(driver_pool, query, describe)
+        pages = await crawler.run([seed_url])
+    """
+
+    def __init__(self, driver_pool, query, describe, on_page=None, on_match=None, sessions=DEFAULT_CRAWL_SESSIONS,
+                 max_depth=DEFAULT_MAX_DEPTH, max_pages=DEFAULT_MAX_PAGES, follow_links=True,
+                 page_wait=PAGE_WAIT_TIME, idle_time=PAGE_IDLE_TIME):
+        """
+        :param driver_pool: WebDriverPool，每个会话在整个爬取期间租用一个浏览器（页面之间保留登录状态）
+        :param query: 编译后的 Query，命中的流量计入页面的匹配结果
+        :param describe: 生成单行摘要的函数 describe(HttpExchange)
+        :param on_page: 异步回调 on_page(已完成页面数, CrawlPage)
+        :param on_match: 异步回调 on_match(CrawlPage, HttpExchange)，每条命中的流量调用一次（如写入导出文件）
+        :param sessions: 并行的浏览器会话数
+        :param max_depth: 最大链接深度
+        :param max_pages: 页面总数上限
+        :param follow_links: 是否发现并访问同源链接（否则只访问种子URL）
+        :param page_wait: 单个页面的最长停留时间（秒）
+        :param idle_time: 网络空闲静默窗口（秒）
+        """
+        self.driver_pool = driver_pool
+        self.query = query
+        self.describe = describe
+        self.on_page = on_page
+        self.on_match = on_match
+        self.sessions = sessions
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.follow_links = follow_links
+        self.page_wait = page_wait
+        self.idle_time = idle_time
+        self.pages = []
+        self.errors = []            # 浏览器会话启动失败等与页面无关的错误
+        self.counter = DuplicateCounter()   # 各页面共用：每个页面都会请求的配置接口等只报告一次
+        self._visited = set()
+        self._origins = set()
+        self._queue = asyncio.Queue()
+
+    def enqueue(self, url, depth, parent=None):
+        """规范化去重后加入队列（超出页面上限或非同源时丢弃）"""
+        normalized = normalize_url(url)
+        if normalized is None or normalized in self._visited or len(self._visited) >= self.max_pages:
+            return False
+        if parent is not None and (url_origin(normalized) not in self._origins
+                                   or EXCLUDE_LINK_PATTERN.search(urlsplit(normalized).path)):
+            return False
+        self._visited.add(normalized)
+        self._queue.put_nowait(CrawlPage(normalized, depth, parent))
+        return True
+
+    async def run(self, seeds):
+        """
+        :param seeds: 种子URL列表
+        :return: CrawlPage 列表（按完成顺序）
+        """
+        for url in seeds:
+            normalized = normalize_url(url)
+            if normalized:
+                self._origins.add(url_origin(normalized))
+                self.enqueue(normalized, 0)
+        if self._queue.empty():
+            return self.pages
+
+        # 不发现链接时页面数已知，多余的会话不必启动
+        count = self.sessions if self.follow_links else min(self.sessions, self._queue.qsize())
+        workers = {asyncio.create_task(self._worker()) for _ in range(count)}
+        join = asyncio.create_task(self._queue.join())
+        pending = workers | {join}
+        try:
+            # 队列处理完毕即结束；所有会话都启动失败时也要退出，避免一直等待
+            while join in pending and pending - {join}:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return self.pages
+
+    async def _worker(self):
+        try:
+            async with self.driver_pool.lease() as session:
+                while True:
+                    page = await self._queue.get()
+                    try:
+                        await self._visit(session.driver, page)
+                    finally:
+                        self._queue.task_done()
+                    self.pages.append(page)
+                    if self.on_page is not None:
+                        await self.on_page(len(self.pages), page)
+        except Exception as e:
+            self.errors.append(f"浏览器会话异常：{type(e).__name__} {e}")
+
+    async def _visit(self, driver, page):
+        started_at = time.perf_counter()
+        try:
+            # 每个页面单独抓包：会话之间互不干扰，流量可准确归属到页面
+            capture = await asyncio.to_thread(DevToolsCapture, driver, self.query.prematch)
+            await asyncio.to_thread(driver.get, page.url)
+            async for exchange in follow_exchanges(None, self.page_wait, tail=capture, idle_time=self.idle_time,
+                                                   activity=functools.partial(network_activity, driver)):
+                page.captured += 1
+                if self.query.match(exchange):
+                    page.matched += 1
+                    summary = self.describe(exchange)
+                    if not self.counter.add(exchange, summary):
+                        page.duplicates += 1
+                    elif len(page.matches) < MAX_PAGE_MATCHES:
+                        page.matches.append(summary)
+                    if self.on_match is not None:
+                        await self.on_match(page, exchange)
+            if self.follow_links and page.depth < self.max_depth:
+                for link in await asyncio.to_thread(driver.execute_script, LINKS_SCRIPT) or []:
+                    if isinstance(link, str) and self.enqueue(link, page.depth + 1, page.url):
+                        page.links += 1
+        except Exception as e:
+            page.error = f"{type(e).__name__} {e}"
+        page.elapsed = time.perf_counter() - started_at
+
+
+def build_crawl_report(crawler, started_at, export_filename):
+    """汇总爬取结果"""
+    elapsed = time.perf_counter() - started_at
+    pages = crawler.pages
+    return {
+        "pages_visited": len(pages),
+        "pages_failed": sum(1 for page in pages if page.error),
+        "total_captured": sum(page.captured for page in pages),
+        "total_matched": sum(page.matched for page in pages),
+        "total_duplicates": sum(page.duplicates for page in pages),
+        "sessions": crawler.sessions,
+        "elapsed": round(elapsed, 2),
+        "pages_per_minute": round(len(pages) * 60 / elapsed, 1) if elapsed > 0 else 0.0,
+        "export_file": export_filename,
+        "errors": crawler.errors,
+        "pages": [page.to_dict() for page in pages],
+    }
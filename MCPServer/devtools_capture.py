@@ -0,0 +1,154 @@
+# devtools_capture.py
+# 浏览器 DevTools 抓包：读取 WebDriver 性能日志中的 Network 事件，按 requestId 组装请求/响应，
+# 通过 Network.getResponseBody 取正文，直接在内存中产出 HttpExchange 交给筛选流程，
+# 不经过 Burp 写日志文件、再整体读取解析的过程（也可在未安装 Burp 的环境中使用）
+import base64
+import json
+from urllib.parse import urlsplit
+
+from MCPServer.burp_http import HttpExchange, HttpMessage, build_message
+
+# ===================== 全局配置 =====================
+# 不抓取的地址协议（浏览器内部资源）
+SKIP_SCHEMES = ("data:", "blob:", "chrome-extension:", "about:")
+
+
+def build_request(request):
+    """
+    由 Network.requestWillBeSent 的 request 字段构造请求记录（与 Burp 日志解析结果结构相同）
+    :return: HttpMessage
+    """
+    parts = urlsplit(request["url"])
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    headers = {name.lower(): value for name, value in request.get("headers", {}).items()}
+    # HTTP/2 请求的头部中没有 Host，按地址补上
+    headers.setdefault("host", parts.netloc)
+    body = (request.get("postData") or "").encode("utf-8")
+    message = build_message("request", f"{request['method']} {path} HTTP/1.1", headers, body)
+    message.method = request["method"]
+    message.path = path
+    message.scheme = parts.scheme
+    return message
+
+
+def build_response(response, body=b""):
+    """
+    由 Network.responseReceived 的 response 字段及正文构造响应记录
+    :param body: 正文字节（None 表示尚未获取：只构造头部字段，正文大小未知，供查询预判）
+    :return: HttpMessage
+    """
+    # 同名头部在 DevTools 中以换行分隔，合并方式与 Burp 日志解析一致
+    headers = {name.lower(): ", ".join(value.split("\n")) for name, value in response.get("headers", {}).items()}
+    if body is None:
+        message = HttpMessage("response", b"")
+        message.headers = headers
+        message.status = response["status"]
+        return message
+    message = build_message("response", f"HTTP/1.1 {response['status']} {response.get('statusText', '')}".rstrip(),
+                            headers, body)
+    message.status = response["status"]
+    return message
+
+
+class DevToolsCapture:
+    """
+    基于 WebDriver 性能日志的抓包器（接口与 BurpLogTail 一致：poll / flush / offset，可直接交给 follow_exchanges）
+    浏览器需开启性能日志（见 webdriver_pool.create_edge_driver 的 performance_log 参数）
+    用法：
+        capture = DevToolsCapture(driver)       # 创建时丢弃此前积压的事件
+        driver.get(target_url)
+        for exchange in capture.poll(): ...
+        exchanges = capture.flush()
+    """
+
+    def __init__(self, driver, want_body=None):
+        """
+        :param driver: WebDriver
+        :param want_body: 判断函数 want_body(HttpExchange)，只用请求和响应头判断是否需要取正文（默认全部获取）；
+                          不需要的响应（如图片、脚本）跳过 Network.getResponseBody
+        """
+        self.driver = driver
+        self.want_body = want_body
+        self.offset = 0             # 已处理的事件数（供 follow_exchanges 判断是否有新流量）
+        self._requests = {}         # requestId → 请求记录
+        self._responses = {}        # requestId → responseReceived 的 response 字段
+        self.drain()
+
+    def drain(self):
+        """丢弃尚未读取的性能日志（读取即清空）"""
+        self.driver.get_log("performance")
+
+    def poll(self):
+        """
+        读取新的 Network 事件
+        :return: 新完成的 HttpExchange 列表（按完成顺序）
+        """
+        exchanges = []
+        for entry in self.driver.get_log("performance"):
+            event = json.loads(entry["message"])["message"]
+            method = event.get("method", "")
+            if not method.startswith("Network."):
+                continue
+            self.offset += 1
+            exchange = self._handle(method, event.get("params", {}))
+            if exchange is not None:
+                exchanges.append(exchange)
+        return exchanges
+
+    def _handle(self, method, params):
+        request_id = params.get("requestId")
+        if method == "Network.requestWillBeSent":
+            request = params["request"]
+            if request["url"].startswith(SKIP_SCHEMES):
+                return None
+            done = None
+            # 同一 requestId 再次发出表示跳转：上一跳以 redirectResponse 作为响应结束
+            if "redirectResponse" in params and request_id in self._requests:
+                done = HttpExchange(self._requests.pop(request_id), build_response(params["redirectResponse"]))
+                self._responses.pop(request_id, None)
+            self._requests[request_id] = build_request(request)
+            return done
+        if request_id not in self._requests:
+            return None
+        if method == "Network.responseReceived":
+            self._responses[request_id] = params["response"]
+        elif method == "Network.loadingFinished":
+            return self._finish(request_id)
+        elif method == "Network.loadingFailed":
+            self._responses.pop(request_id, None)
+            return HttpExchange(self._requests.pop(request_id))
+        return None
+
+    def _finish(self, request_id):
+        request = self._requests.pop(request_id)
+        response = self._responses.pop(request_id, None)
+        if response is None:
+            return HttpExchange(request)
+        exchange = HttpExchange(request, build_response(response, None))
+        if self.want_body is None or self.want_body(exchange):
+            exchange.response = build_response(response, self._fetch_body(request_id))
+        else:
+            exchange.response = build_response(response)
+        return exchange
+
+    def _fetch_body(self, request_id):
+        try:
+            result = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            # 正文已被浏览器释放（如页面已跳转）或响应没有正文
+            return b""
+        if result.get("base64Encoded"):
+            return base64.b64decode(result["body"])
+        return result["body"].encode("utf-8")
+
+    def flush(self):
+        """结束抓包：输出尚未完成的请求（已收到响应头的不含正文）"""
+        exchanges = []
+        for request_id, request in self._requests.items():
+            response = self._responses.get(request_id)
+            exchanges.append(HttpExchange(request, build_response(response) if response else None))
+        self._requests.clear()
+        self._responses.clear()
+        return exchanges
@@ -0,0 +1,166 @@
+# dir_batch.py
+# 多目标批量目录扫描：所有目标共用一个全局并发上限（同时在途的请求数），每个主机单独一个令牌桶限速，
+# 多个目标在同一事件循环中并行扫描，结果汇总为一份结构化报告
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from config import DIRSEARCH_EXTENSIONS
+from MCPServer.dir_brute import DEFAULT_INCLUDE_STATUS, DirBruteForcer, completed_stats, load_wordlist
+from MCPServer.scan_checkpoint import open_checkpoint_store
+from MCPServer.soft404 import host_key
+
+# ===================== 全局配置 =====================
+# 全局同时在途的请求数上限
+DEFAULT_MAX_INFLIGHT = 200
+# 单个主机的请求速率上限（次/秒）及突发量
+DEFAULT_HOST_RATE = 50
+DEFAULT_HOST_BURST = 10
+# 单个目标的 worker 数
+DEFAULT_HOST_CONCURRENCY = 10
+# 同时扫描的目标数
+DEFAULT_PARALLEL_TARGETS = 20
+
+
+class TokenBucket:
+    """令牌桶限速：平均 rate 次/秒，最多允许 burst 次突发"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # 排队取令牌，保证同一主机的等待者按先后顺序放行
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def normalize_target(target):
+    """
+    规范化目标：去空白，缺少协议时补 http://
+    :return: 目标URL，空行或注释返回 None
+    """
+    target = target.strip()
+    if not target or target.startswith("#"):
+        return None
+    if not target.startswith(("http://", "https://")):
+        target = "http://" + target
+    return target
+
+
+def load_targets(targets=(), targets_file=""):
+    """
+    合并目标列表和目标文件（每行一个），按出现顺序去重
+    :return: 目标URL列表
+    """
+    lines = list(targets or [])
+    if targets_file:
+        with open(targets_file, "r", encoding="utf-8", errors="ignore") as f:
+            lines.extend(f)
+    seen = {}
+    for line in lines:
+        target = normalize_target(line)
+        if target and urlsplit(target).netloc:
+            seen.setdefault(target, None)
+    return list(seen)
+
+
+def build_report(results, started_at):
+    """
+    汇总各目标结果
+    :param results: [(目标URL, BruteStats 或异常)]
+    :return: 报告字典
+    """
+    report = {"targets": [], "total_requests": 0, "total_findings": 0, "total_filtered": 0, "failed_targets": 0}
+    for target_url, stats in results:
+        if isinstance(stats, BaseException):
+            report["failed_targets"] += 1
+            report["targets"].append({"target": target_url, "error": f"{type(stats).__name__} {stats}"})
+            continue
+        report["total_requests"] += stats.requests
+        report["total_findings"] += len(stats.findings)
+        report["total_filtered"] += stats.filtered
+        if stats.aborted:
+            report["failed_targets"] += 1
+        entry = {
+            "target": target_url,
+            "skipped": stats.skipped,
+            "resumed_from": stats.resumed_from,
+            "requests": stats.requests,
+            "errors": stats.errors,
+            "filtered": stats.filtered,
+            "elapsed": round(stats.elapsed, 2),
+            "findings": [finding.to_dict() for finding in stats.findings],
+        }
+        if stats.aborted:
+            entry["error"] = stats.messages[-1]
+        report["targets"].append(entry)
+    elapsed = time.perf_counter() - started_at
+    report["elapsed"] = round(elapsed, 2)
+    report["requests_per_second"] = round(report["total_requests"] / elapsed, 1) if elapsed > 0 else 0.0
+    return report
+
+
+async def run_batch_scan(targets, wordlist_path, on_finding=None, max_inflight=DEFAULT_MAX_INFLIGHT,
+                         host_rate=DEFAULT_HOST_RATE, host_burst=DEFAULT_HOST_BURST,
+                         host_concurrency=DEFAULT_HOST_CONCURRENCY, parallel_targets=DEFAULT_PARALLEL_TARGETS,
+                         include_status=DEFAULT_INCLUDE_STATUS, calibrate=True, resume=False,
+                         extensions=DIRSEARCH_EXTENSIONS):
+    """
+    批量扫描多个目标
+    :param targets: 目标URL列表
+    :param wordlist_path: 字典路径（所有目标共用同一份内存映射）
+    :param on_finding: 异步回调 on_finding(目标URL, 序号, DirFinding)
+    :param max_inflight: 全局同时在途的请求数上限
+    :param host_rate: 单个主机的请求速率上限（次/秒，0 表示不限速）
+    :param host_burst: 单个主机的突发请求数
+    :param host_concurrency: 单个目标的 worker 数
+    :param parallel_targets: 同时扫描的目标数
+    :param include_status: 保留的状态码
+    :param calibrate: 是否过滤泛解析/兜底页
+    :param resume: 是否从断点继续（已完成的目标直接沿用断点中的结果；断点数据库不可用时照常扫描、不记录断点）
+    :param extensions: 展开字典中 %EXT% 占位符的扩展名
+    :return: 报告字典（见 build_report）
+    """
+    started_at = time.perf_counter()
+    wordlist = await asyncio.to_thread(load_wordlist, wordlist_path)
+    inflight = asyncio.Semaphore(max_inflight)
+    target_slots = asyncio.Semaphore(parallel_targets)
+    # 同一主机的多个目标（如不同路径）共用一个令牌桶
+    buckets = {}
+
+    async def scan_target(target_url, store):
+        checkpoint = None
+        if store is not None:
+            # 与单目标 dir_scan 的 native 引擎使用相同的断点键
+            checkpoint = store.open(target_url, wordlist_path, "native", include_status, calibrate,
+                                    ",".join(extensions), resume=resume)
+        if checkpoint is not None and checkpoint.completed:
+            return completed_stats(checkpoint)
+        async with target_slots:
+            key = host_key(target_url)
+            if host_rate and key not in buckets:
+                buckets[key] = TokenBucket(host_rate, host_burst)
+            engine = DirBruteForcer(host_concurrency, include_status=include_status, semaphore=inflight,
+                                    rate_limiter=buckets.get(key))
+
+            async def report_finding(count, finding):
+                if on_finding is not None:
+                    await on_finding(target_url, count, finding)
+
+            return await engine.scan(target_url, wordlist.words(extensions), report_finding, calibrate=calibrate,
+                                     checkpoint=checkpoint)
+
+    with open_checkpoint_store() as store:
+        outcomes = await asyncio.gather(*(scan_target(target, store) for target in targets), return_exceptions=True)
+    return build_report(list(zip(targets, outcomes)), started_at)
@@ -0,0 +1,339 @@
+# dir_brute.py
+# 内置异步目录爆破引擎：进程内用 httpx 异步客户端复用连接（keep-alive），信号量控制并发，
+# 字典以内存映射方式加载并缓存，免去每次扫描启动 Python 解释器、加载字典和重新握手的开销
+# 产出与 dirsearch 输出解析一致的 DirFinding 记录
+import asyncio
+import itertools
+import logging
+import mmap
+import os
+import sys
+import time
+
+import httpx
+
+from config import DIRSEARCH_EXTENSIONS
+from MCPServer.dirsearch_output import DirFinding, join_url
+from MCPServer.metrics import phase
+from MCPServer.soft404 import calibrate_host
+
+# ===================== 全局配置 =====================
+# 默认并发请求数
+DEFAULT_CONCURRENCY = 50
+# 单个请求超时（秒）
+REQUEST_TIMEOUT = 10
+# 默认只保留的状态码（与 dirsearch 调用参数 -i 200 一致）
+DEFAULT_INCLUDE_STATUS = "200"
+# 字典中的扩展名占位符（dirsearch 字典格式）
+EXT_PLACEHOLDER = "%EXT%"
+# 请求头
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+# 保留的错误信息条数上限
+MAX_ERROR_MESSAGES = 20
+# 连续请求失败达到该次数时中止扫描（目标不可达时不再空跑整个字典）
+MAX_CONSECUTIVE_ERRORS = 50
+# 每个客户端的连接池大小：httpcore 每次分配连接都要遍历整个连接池，
+# 并发较高时拆成多个小连接池（各 worker 固定使用其中一个）吞吐更高
+POOL_SHARD_SIZE = 4
+
+
+# httpx 默认逐个请求输出 INFO 日志，爆破时会刷屏
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+# ===================== 字典 =====================
+class Wordlist:
+    """
+    内存映射的字典文件：不整体读入内存，逐行产出路径
+    同一文件在进程内只映射一次（见 load_wordlist），后续扫描直接复用
+    """
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.signature = (stat.st_size, stat.st_mtime_ns)
+        with open(path, "rb") as f:
+            # 空文件无法映射
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+        self.size = sum(1 for _ in self._iter_lines())
+
+    def _iter_lines(self):
+        data = self._map
+        pos, end = 0, len(data)
+        while pos < end:
+            newline = data.find(b"\n", pos)
+            if newline < 0:
+                newline = end
+            line = data[pos:newline].strip()
+            pos = newline + 1
+            # 跳过空行和注释
+            if line and not line.startswith(b"#"):
+                yield line.decode("utf-8", errors="ignore")
+
+    def words(self, extensions=DIRSEARCH_EXTENSIONS):
+        """
+        产出路径（去掉开头的 /）
+        :param extensions: 扩展名列表，用于展开 %EXT% 占位符（默认与 dirsearch 相同）；为空时跳过含占位符的条目
+        """
+        for line in self._iter_lines():
+            line = line.lstrip("/")
+            if EXT_PLACEHOLDER in line:
+                for extension in extensions:
+                    yield line.replace(EXT_PLACEHOLDER, extension)
+            else:
+                yield line
+
+    def __len__(self):
+        return self.size
+
+
+_WORDLIST_CACHE = {}
+
+
+def load_wordlist(path):
+    """加载字典（按文件大小和修改时间缓存，文件变化时重新映射）"""
+    stat = os.stat(path)
+    wordlist = _WORDLIST_CACHE.get(path)
+    if wordlist is None or wordlist.signature != (stat.st_size, stat.st_mtime_ns):
+        wordlist = _WORDLIST_CACHE[path] = Wordlist(path)
+    return wordlist
+
+
+def parse_status_filter(text):
+    """
+    解析状态码过滤条件
+    :param text: 如 "200" / "200,301-399"，为空时不过滤
+    :return: 状态码集合，不过滤时返回 None
+    """
+    if not text or not text.strip():
+        return None
+    statuses = set()
+    for part in text.split(","):
+        low, _, high = part.strip().partition("-")
+        statuses.update(range(int(low), int(high or low) + 1))
+    return statuses
+
+
+# ===================== 扫描 =====================
+class BruteStats:
+    """一次扫描的统计结果（requests / elapsed 可用于和 dirsearch 子进程方式对比吞吐）"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.findings = []
+        self.filtered = 0           # 与泛解析/兜底页指纹相符而被丢弃的响应数
+        self.messages = []          # 部分请求错误信息
+        self.consecutive_errors = 0
+        self.aborted = False        # 连续失败过多而中止
+        self.resumed_from = 0       # 续扫时跳过的字典条目数
+        self.skipped = False        # 断点显示已扫描完成，本次未发送请求
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def rate(self):
+        """吞吐（请求数/秒）"""
+        return self.requests / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        if self.skipped:
+            return "该目标与字典此前已扫描完成，直接返回断点中的结果"
+        line = f"请求 {self.requests} 次，错误 {self.errors} 次，耗时 {self.elapsed:.2f} 秒，{self.rate:.1f} req/s"
+        if self.resumed_from:
+            line += f"，从断点第 {self.resumed_from} 条继续"
+        if self.filtered:
+            line += f"，已过滤 {self.filtered} 条泛解析响应"
+        if self.aborted:
+            line += "，连续失败过多已中止"
+        return line
+
+
+def create_client(pool_size=POOL_SHARD_SIZE, timeout=REQUEST_TIMEOUT):
+    """创建保持长连接的异步客户端（不跟随跳转、不校验证书、不读取环境代理）"""
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, verify=False, follow_redirects=False,
+                             trust_env=False, headers={"User-Agent": USER_AGENT})
+
+
+class DirBruteForcer:
+    """
+    异步目录爆破引擎
+    用法：
+        engine = DirBruteForcer(concurrency=50)
+        stats = await engine.scan(target_url, load_wordlist(path).words(DIRSEARCH_EXTENSIONS))
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, timeout=REQUEST_TIMEOUT,
+                 include_status=DEFAULT_INCLUDE_STATUS, semaphore=None, rate_limiter=None):
+        """
+        :param concurrency: 并发请求数
+        :param timeout: 单个请求超时（秒）
+        :param include_status: 保留的状态码（如 "200,301-399"，为空时全部保留）
+        :param semaphore: 共享的并发信号量（多个扫描共用一个全局并发上限时传入）
+        :param rate_limiter: 限速器（提供 async acquire()，如按主机的令牌桶），每个请求前等待
+        """
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.include_status = parse_status_filter(include_status)
+        self.semaphore = semaphore or asyncio.Semaphore(concurrency)
+        self.rate_limiter = rate_limiter
+
+    async def fetch(self, client, url):
+        """
+        请求单个URL
+        :return: (状态码, 正文, 跳转地址)
+        """
+        # 先等限速再占并发名额，等待令牌时不占用全局并发
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        async with self.semaphore:
+            response = await client.get(url)
+        return response.status_code, response.content, response.headers.get("location")
+
+    async def scan(self, target_url, words, on_finding=None, clients=None, calibrate=True, checkpoint=None):
+        """
+        扫描目标URL下的所有路径
+        :param target_url: 目标URL
+        :param words: 路径可迭代对象（如 Wordlist.words()）
+        :param on_finding: 异步回调 on_finding(序号, DirFinding)，每发现一个路径立即调用
+        :param clients: 复用的 httpx.AsyncClient 列表（默认为本次扫描按 POOL_SHARD_SIZE 新建）
+        :param calibrate: 是否先探测随机路径生成兜底页指纹，并丢弃与之相符的响应
+        :param checkpoint: ScanCheckpoint，提供时跳过已完成的字典条目、沿用已有发现和指纹，并定期写入进度
+        :return: BruteStats
+        """
+        stats = BruteStats()
+        start = 0
+        # 断点中已有的发现：断点位置之后的请求可能在中断前已完成并记录，续扫时重新请求到它们不再重复记录和推送
+        known_urls = set()
+        if checkpoint is not None:
+            start = stats.resumed_from = checkpoint.position
+            stats.findings = list(checkpoint.findings)
+            known_urls = {finding.url for finding in stats.findings}
+        words = enumerate(itertools.islice(words, start, None), start)
+        # 已取出但尚未完成的字典序号：断点位置取其中最小值，保证断点之前的条目全部完成
+        in_flight = set()
+        next_index = start
+
+        def position():
+            return min(in_flight) if in_flight else next_index
+
+        own_clients = not clients
+        if own_clients:
+            shards = -(-self.concurrency // POOL_SHARD_SIZE)
+            clients = [create_client(POOL_SHARD_SIZE, self.timeout) for _ in range(shards)]
+
+        detector = None
+
+        async def check(client, word):
+            url = join_url(target_url, word)
+            try:
+                status, body, redirect = await self.fetch(client, url)
+            except httpx.HTTPError as e:
+                stats.errors += 1
+                stats.consecutive_errors += 1
+                if len(stats.messages) < MAX_ERROR_MESSAGES:
+                    stats.messages.append(f"{url}：{type(e).__name__} {e}")
+                if stats.consecutive_errors >= MAX_CONSECUTIVE_ERRORS and not stats.aborted:
+                    stats.aborted = True
+                    stats.messages.append(f"连续 {stats.consecutive_errors} 次请求失败，已中止扫描")
+                return
+            finally:
+                stats.requests += 1
+            stats.consecutive_errors = 0
+            if self.include_status is not None and status not in self.include_status:
+                return
+            if detector is not None and detector.is_soft404(status, body, redirect, word):
+                stats.filtered += 1
+                return
+            if url in known_urls:
+                return
+            finding = DirFinding(status, len(body), word, url, redirect)
+            stats.findings.append(finding)
+            if on_finding is not None:
+                await on_finding(len(stats.findings), finding)
+
+        async def worker(client):
+            nonlocal next_index
+            # 各 worker 共享同一个迭代器，事件循环单线程，取下一个路径无需加锁
+            for index, word in words:
+                if stats.aborted:
+                    return
+                in_flight.add(index)
+                next_index = index + 1
+                await check(client, word)
+                # 只在请求完成后移出；被取消的请求留在集合中，断点不会越过它
+                in_flight.discard(index)
+                if checkpoint is not None and checkpoint.due():
+                    checkpoint.save(position(), stats.findings)
+
+        finished = False
+        try:
+            if checkpoint is not None and checkpoint.calibration is not None:
+                # 续扫沿用断点中的指纹，保证前后过滤标准一致
+                detector = checkpoint.calibration
+            elif calibrate:
+                with phase("calibrate"):
+                    detector = await calibrate_host(clients[0], target_url)
+                if checkpoint is not None:
+                    checkpoint.calibration = detector
+            await asyncio.gather(*(worker(clients[i % len(clients)]) for i in range(self.concurrency)))
+            finished = not stats.aborted
+        finally:
+            stats.finished_at = time.perf_counter()
+            if own_clients:
+                for client in clients:
+                    await client.aclose()
+            # 超时、取消或中止时同样写入断点，下次可从这里继续
+            if checkpoint is not None:
+                checkpoint.save(position(), stats.findings, completed=finished)
+        return stats
+
+
+def completed_stats(checkpoint):
+    """已完成的 目标+字典：不再发送请求，直接用断点中的发现构造结果"""
+    stats = BruteStats()
+    stats.findings = list(checkpoint.findings)
+    stats.resumed_from = checkpoint.position
+    stats.skipped = True
+    stats.finished_at = stats.started_at
+    return stats
+
+
+async def run_native_scan(target_url, wordlist_path, on_finding=None, concurrency=DEFAULT_CONCURRENCY,
+                          extensions=DIRSEARCH_EXTENSIONS, include_status=DEFAULT_INCLUDE_STATUS, timeout=REQUEST_TIMEOUT,
+                          calibrate=True, checkpoint=None):
+    """
+    使用内置引擎扫描（dir_scan 的 native 引擎入口）
+    :param extensions: 展开 %EXT% 占位符的扩展名（默认与 dirsearch 的 -e 相同，两种引擎请求的路径一致）
+    :param checkpoint: ScanCheckpoint（可选），用于断点续扫
+    :return: BruteStats
+    """
+    if checkpoint is not None and checkpoint.completed:
+        return completed_stats(checkpoint)
+    wordlist = await asyncio.to_thread(load_wordlist, wordlist_path)
+    engine = DirBruteForcer(concurrency, timeout, include_status)
+    return await engine.scan(target_url, wordlist.words(extensions), on_finding, calibrate=calibrate,
+                             checkpoint=checkpoint)
+
+
+# ===================== 程序入口（对本地或测试服务器测量吞吐）=====================
+if __name__ == "__main__":
+    # 用法：python -m MCPServer.dir_brute <目标URL> <字典路径> [并发数]
+    if len(sys.argv) < 3:
+        print("用法：python -m MCPServer.dir_brute <目标URL> <字典路径> [并发数]")
+        sys.exit(1)
+
+    async def main():
+        async def show(count, finding):
+            print(finding)
+
+        stats = await run_native_scan(sys.argv[1], sys.argv[2], show,
+                                      int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_CONCURRENCY)
+        print(stats.summary())
+
+    asyncio.run(main())
@@ -1,9 +1,188 @@
 # dir_scan_tool.py
 # 单独存放目录扫描工具，解耦核心业务代码
+import asyncio
+import codecs
+import json
 import subprocess
 import os
+import time
 # 从配置文件导入路径信息
-from config import PYTHON_EXECUTABLE_PATH, DIRSEARCH_PATH
+from config import PYTHON_EXECUTABLE_PATH, DIRSEARCH_PATH, DIRSEARCH_WORDLIST_PATH, DIRSEARCH_EXTENSIONS
+from mcp.server.fastmcp import Context
+from MCPServer.dir_batch import (DEFAULT_HOST_CONCURRENCY, DEFAULT_HOST_RATE, DEFAULT_MAX_INFLIGHT,
+                                 load_targets, run_batch_scan)
+from MCPServer.dir_brute import DEFAULT_CONCURRENCY, DEFAULT_INCLUDE_STATUS, create_client, run_native_scan
+from MCPServer.dirsearch_output import DirsearchOutputParser, size_tolerance
+from MCPServer.jobs import DEFAULT_JOB_TIMEOUT, JOB_MANAGER, JobLimitError
+from MCPServer.metrics import METRICS, phase
+from MCPServer.progress import push_progress
+from MCPServer.result_cache import RESULT_CACHE, cache_key, cached_note, file_fingerprint, normalize_url
+from MCPServer.results import bounded_result
+from MCPServer.scan_checkpoint import open_checkpoint_store
+from MCPServer.soft404 import calibrate_host
+
+# 整体执行超时（秒，预留脚本启动时间）
+SCAN_TIMEOUT = 300
+# 扫描引擎：dirsearch 子进程 / 内置异步引擎
+ENGINE_DIRSEARCH = "dirsearch"
+ENGINE_NATIVE = "native"
+# 读取扫描输出的块大小（dirsearch 的进度条只用 \r 刷新，按块读取后再由解析器切分行）
+READ_SIZE = 4096
+
+
+def check_scan_target(target_url, engine=ENGINE_DIRSEARCH):
+    """
+    扫描前校验
+    :return: 错误信息，校验通过时返回 None
+    """
+    if engine == ENGINE_NATIVE:
+        # 内置引擎只需要字典文件
+        if not os.path.exists(DIRSEARCH_WORDLIST_PATH):
+            return f"错误：字典文件不存在，请检查路径是否正确：\n{DIRSEARCH_WORDLIST_PATH}"
+    elif engine == ENGINE_DIRSEARCH:
+        # 校验dirsearch.py文件是否存在
+        if not os.path.exists(DIRSEARCH_PATH):
+            return f"错误：dirsearch.py文件不存在，请检查路径是否正确：\n{DIRSEARCH_PATH}"
+    else:
+        return f"错误：不支持的扫描引擎：{engine}（可选：{ENGINE_DIRSEARCH} / {ENGINE_NATIVE}）"
+
+    # 校验目标URL是否合法（简单校验，确保包含http/https）
+    if not (target_url.startswith("http://") or target_url.startswith("https://")):
+        return "错误：目标URL格式不合法，请以http://或https://开头（如https://www.example.com）"
+    return None
+
+
+def build_dirsearch_cmd(target_url, extra_args=()):
+    """构建dirsearch执行命令"""
+    return [
+        PYTHON_EXECUTABLE_PATH,  # 从配置文件导入Python解释器路径
+        DIRSEARCH_PATH,           # 从配置文件导入dirsearch路径
+        "-u", target_url,
+        "-e", ",".join(DIRSEARCH_EXTENSIONS),  # 与内置引擎展开 %EXT% 的扩展名一致
+        "-i", '200',
+        *extra_args,
+    ]
+
+
+async def run_dirsearch(target_url, on_finding=None, timeout=SCAN_TIMEOUT, extra_args=(), exclude=None):
+    """
+    异步执行dirsearch（等待期间不阻塞事件循环），边读取输出边解析，超时或被取消时结束子进程
+    :param target_url: 目标URL
+    :param on_finding: 异步回调 on_finding(序号, DirFinding)，每发现一个路径立即调用
+    :param timeout: 超时时间（秒，None 表示不限制）
+    :param extra_args: 追加的dirsearch参数（如 ["-t", "10"]）
+    :param exclude: 过滤函数 exclude(DirFinding)，返回 True 的发现直接丢弃
+    :return: (退出码, 解析器)，解析器的 findings 为全部发现，messages 为去除进度条后的其他输出
+    """
+    process = await asyncio.create_subprocess_exec(
+        *build_dirsearch_cmd(target_url, extra_args),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = DirsearchOutputParser(target_url, exclude)
+
+    async def emit(findings):
+        if on_finding is None:
+            return
+        first = len(parser.findings) - len(findings) + 1
+        for count, finding in enumerate(findings, first):
+            await on_finding(count, finding)
+
+    parse_time = 0.0
+
+    def parse(text):
+        nonlocal parse_time
+        started_at = time.perf_counter()
+        findings = parser.feed(text)
+        parse_time += time.perf_counter() - started_at
+        return findings
+
+    async def pump():
+        while True:
+            data = await process.stdout.read(READ_SIZE)
+            if not data:
+                break
+            await emit(parse(decoder.decode(data)))
+        await emit(parse(decoder.decode(b"", final=True)))
+        await emit(parser.flush())
+        return await process.wait()
+
+    try:
+        # 子进程耗时（含输出解析，解析部分另记为 parse 阶段）
+        with phase("subprocess"):
+            returncode = await asyncio.wait_for(pump(), timeout)
+    finally:
+        # 超时或请求被取消时结束子进程，避免遗留孤儿进程
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        METRICS.observe_phase("parse", parse_time)
+    return returncode, parser
+
+
+async def calibrate_dirsearch(target_url):
+    """
+    dirsearch 扫描前的兜底页探测：dirsearch 输出只有状态码和取整后的大小，
+    因此只按状态码 + 大小近似比对，返回过滤函数
+    """
+    async with create_client() as client:
+        detector = await calibrate_host(client, target_url)
+    if not detector.fingerprints:
+        return None
+    return lambda finding: detector.matches_size(finding.status, finding.size, size_tolerance(finding.size),
+                                                 finding.path)
+
+
+async def run_scan(target_url, on_finding=None, engine=ENGINE_DIRSEARCH, concurrency=DEFAULT_CONCURRENCY,
+                   timeout=SCAN_TIMEOUT, calibrate=True, resume=False):
+    """
+    按所选引擎扫描
+    :param target_url: 目标URL
+    :param on_finding: 异步回调 on_finding(序号, DirFinding)
+    :param engine: dirsearch（子进程）/ native（内置异步引擎）
+    :param concurrency: 内置引擎的并发请求数
+    :param timeout: 超时时间（秒，None 表示不限制）
+    :param calibrate: 是否先探测随机路径，丢弃与泛解析/兜底页指纹相符的结果
+    :param resume: 是否从断点继续（仅 native 引擎：已完成的 目标+字典 直接返回断点中的结果，
+                   中断的从已完成的字典位置继续；dirsearch 引擎不记录断点）
+    :return: (退出码, 扫描结果, 耗时/吞吐说明)，扫描结果含 findings 和 messages
+    """
+    if engine == ENGINE_NATIVE:
+        with open_checkpoint_store() as store:
+            checkpoint = None
+            if store is not None:
+                # 与 dir_scan_batch 使用相同的断点键
+                checkpoint = store.open(target_url, DIRSEARCH_WORDLIST_PATH, ENGINE_NATIVE, DEFAULT_INCLUDE_STATUS,
+                                        calibrate, ",".join(DIRSEARCH_EXTENSIONS), resume=resume)
+            stats = await asyncio.wait_for(
+                run_native_scan(target_url, DIRSEARCH_WORDLIST_PATH, on_finding, concurrency, DIRSEARCH_EXTENSIONS,
+                                calibrate=calibrate, checkpoint=checkpoint),
+                timeout)
+        return (1 if stats.aborted else 0), stats, stats.summary()
+    started = time.perf_counter()
+    with phase("calibrate"):
+        exclude = await calibrate_dirsearch(target_url) if calibrate else None
+    returncode, parser = await run_dirsearch(target_url, on_finding, timeout, exclude=exclude)
+    summary = f"耗时 {time.perf_counter() - started:.2f} 秒"
+    if parser.filtered:
+        summary += f"，已过滤 {parser.filtered} 条泛解析响应"
+    return returncode, parser, summary
+
+
+def format_scan_result(target_url, returncode, result, summary=""):
+    """按退出码组织扫描结果：发现的路径逐行列出，失败时附上dirsearch的其他输出"""
+    findings = "\n".join(str(finding) for finding in result.findings)
+    if returncode == 0:
+        header = f"目录扫描完成（目标：{target_url}）\n发现 {len(result.findings)} 个路径"
+        if summary:
+            header += f"，{summary}"
+        return f"{header}\n-------------------------\n{findings}"
+    else:
+        messages = "\n".join(result.messages)
+        return (f"目录扫描执行失败（目标：{target_url}）\n-------------------------\n"
+                f"错误信息：\n{messages}\n{findings}").rstrip()
+
 
 def register_dir_scan_tool(mcp):
     """
@@ -12,46 +191,143 @@ def register_dir_scan_tool(mcp):
     :return: 无
     """
     @mcp.tool()
-    def dir_scan(target_url: str) -> str:
+    async def dir_scan(ctx: Context, target_url: str, engine: str = ENGINE_DIRSEARCH,
+                       concurrency: int = DEFAULT_CONCURRENCY, calibrate: bool = True, resume: bool = False,
+                       force_refresh: bool = False) -> str:
         """
-        调用dirsearch对目标URL进行目录扫描
+        对目标URL进行目录扫描，发现的路径通过进度通知实时推送
+        （相同目标、引擎和字典在缓存有效期内重复扫描时直接返回上次结果）
         :param target_url: 待扫描的目标URL（必填，如https://www.example.com）
-        :return: 扫描结果（成功返回输出，失败返回错误信息）
+        :param engine: 扫描引擎（默认：dirsearch 子进程；native 为内置异步引擎，复用连接、无需启动解释器）
+        :param concurrency: 内置引擎的并发请求数（默认：50，仅 native 引擎生效）
+        :param calibrate: 是否过滤泛解析/soft-404 兜底页（默认：是，先请求随机路径生成指纹，结果按主机缓存）
+        :param resume: 是否从断点继续（默认：否，仅 native 引擎）。超时或中断后从已完成的字典位置继续；
+                       已完成的 目标+字典 直接返回之前的结果
+        :param force_refresh: 是否忽略缓存重新扫描（默认：否）
+        :return: 扫描结果（成功返回发现的路径：状态码 大小 URL [-> 跳转地址]，失败返回错误信息）；
+                 结果较大时返回摘要和前若干行，完整结果通过 results://{result_id}/{cursor} 分页读取
         """
-        # 步骤1：校验dirsearch.py文件是否存在
-        if not os.path.exists(DIRSEARCH_PATH):
-            return f"错误：dirsearch.py文件不存在，请检查路径是否正确：\n{DIRSEARCH_PATH}"
+        error = check_scan_target(target_url, engine)
+        if error:
+            return error
+
+        # 并发数和断点续扫不影响扫描结果，不计入缓存键；扩展名决定展开后的字典，计入缓存键
+        key = cache_key("dir_scan", {"target_url": normalize_url(target_url), "engine": engine,
+                                     "calibrate": calibrate, "extensions": ",".join(DIRSEARCH_EXTENSIONS)},
+                        [file_fingerprint(DIRSEARCH_WORDLIST_PATH)])
+        entry = None if force_refresh else RESULT_CACHE.get(key)
+        if entry is not None:
+            # 保存的是原始结果文本（缓存说明附在外面），重复命中沿用同一个结果ID
+            text = entry.value
+            return f"{cached_note(entry)}\n" + bounded_result("dir_scan", target_url, text,
+                                                              text.split("\n-------------------------\n")[0])
+
+        try:
+            async def on_finding(count, finding):
+                await push_progress(ctx, count, str(finding))
+
+            returncode, result, summary = await run_scan(target_url, on_finding, engine, concurrency,
+                                                         calibrate=calibrate, resume=resume)
+            text = format_scan_result(target_url, returncode, result, summary)
+            if returncode == 0:
+                RESULT_CACHE.put(key, "dir_scan", text)
+            # 发现的路径很多时只返回摘要，完整结果分页读取
+            return bounded_result("dir_scan", target_url, text, text.split("\n-------------------------\n")[0])
+        except asyncio.TimeoutError:
+            if engine == ENGINE_NATIVE:
+                return f"错误：扫描超时（已超过{SCAN_TIMEOUT}秒），进度已保存，使用 resume=True 可从断点继续"
+            return f"错误：扫描超时（已超过{SCAN_TIMEOUT}秒），请增大超时时间后重试"
+        except Exception as e:
+            return f"错误：扫描过程中出现未知异常：\n{str(e)}"
+
+    @mcp.tool()
+    async def start_dir_scan(target_url: str, timeout: int = DEFAULT_JOB_TIMEOUT, engine: str = ENGINE_DIRSEARCH,
+                             concurrency: int = DEFAULT_CONCURRENCY, calibrate: bool = True,
+                             resume: bool = False) -> str:
+        """
+        以后台任务方式启动目录扫描，立即返回任务ID
+        （用 job_status / job_output 查询进度和部分结果，用 job_cancel 终止扫描）
+        :param target_url: 待扫描的目标URL（必填，如https://www.example.com）
+        :param timeout: 任务超时时间（秒，默认600）
+        :param engine: 扫描引擎（默认：dirsearch；可选 native）
+        :param concurrency: 内置引擎的并发请求数（默认：50）
+        :param calibrate: 是否过滤泛解析/soft-404 兜底页（默认：是）
+        :param resume: 是否从断点继续（默认：否）
+        :return: 任务ID
+        """
+        error = check_scan_target(target_url, engine)
+        if error:
+            return error
+
+        async def scan(job):
+            async def on_finding(count, finding):
+                job.write(f"{finding}\n")
+
+            returncode, result, summary = await run_scan(target_url, on_finding, engine, concurrency, timeout=None,
+                                                         calibrate=calibrate, resume=resume)
+            if returncode != 0:
+                raise RuntimeError(f"dirsearch 退出码 {returncode}：" + " / ".join(result.messages[-5:]))
+            return f"目录扫描完成（目标：{target_url}），发现 {len(result.findings)} 个路径，{summary}"
+
+        try:
+            job = JOB_MANAGER.submit("dir_scan", target_url, scan, timeout=timeout)
+        except JobLimitError as e:
+            return f"错误：{str(e)}"
+        return f"已启动后台扫描任务（目标：{target_url}）\n任务ID：{job.id}"
+
+    @mcp.tool()
+    async def dir_scan_batch(ctx: Context, targets: list[str] | None = None, targets_file: str = "",
+                             max_inflight: int = DEFAULT_MAX_INFLIGHT, host_rate: float = DEFAULT_HOST_RATE,
+                             host_concurrency: int = DEFAULT_HOST_CONCURRENCY, calibrate: bool = True,
+                             resume: bool = False, force_refresh: bool = False) -> str:
+        """
+        批量目录扫描（内置异步引擎）：多个目标并行扫描，共用全局并发上限，每个主机单独限速，
+        发现的路径通过进度通知实时推送，结束后返回汇总报告
+        :param targets: 目标URL列表（缺少协议时补 http://）
+        :param targets_file: 目标文件路径（每行一个目标，# 开头为注释），可与 targets 同时使用
+        :param max_inflight: 全局同时在途的请求数上限（默认：200）
+        :param host_rate: 单个主机的请求速率上限（次/秒，默认：50，0 表示不限速）
+        :param host_concurrency: 单个目标的并发数（默认：10）
+        :param calibrate: 是否过滤泛解析/soft-404 兜底页（默认：是）
+        :param resume: 是否从断点继续（默认：否）：已完成的目标直接沿用之前的结果，未完成的从断点继续
+        :param force_refresh: 是否忽略缓存重新扫描（默认：否；相同目标集合在缓存有效期内重复扫描时直接返回上次报告）
+        :return: JSON 报告（每个目标的请求数、错误数、过滤数、耗时及发现的路径，以及总请求数和吞吐）；
+                 报告较大时返回汇总和报告开头，完整报告通过 results://{result_id}/{cursor} 分页读取
+        """
+        if not os.path.exists(DIRSEARCH_WORDLIST_PATH):
+            return f"错误：字典文件不存在，请检查路径是否正确：\n{DIRSEARCH_WORDLIST_PATH}"
+        if targets_file and not os.path.exists(targets_file):
+            return f"错误：目标文件不存在：{targets_file}"
+        target_list = load_targets(targets, targets_file)
+        if not target_list:
+            return "错误：没有有效的扫描目标"
+
+        key = cache_key("dir_scan_batch", {"targets": sorted(target_list), "calibrate": calibrate,
+                                           "extensions": ",".join(DIRSEARCH_EXTENSIONS)},
+                        [file_fingerprint(DIRSEARCH_WORDLIST_PATH)])
+        entry = None if force_refresh else RESULT_CACHE.get(key)
+        if entry is not None:
+            summary, report_text = entry.value
+            return f"{cached_note(entry)}\n" + bounded_result("dir_scan_batch", f"{len(target_list)} 个目标",
+                                                              report_text, summary)
 
-        # 步骤2：校验目标URL是否合法（简单校验，确保包含http/https）
-        if not (target_url.startswith("http://") or target_url.startswith("https://")):
-            return "错误：目标URL格式不合法，请以http://或https://开头（如https://www.example.com）"
+        found = 0
 
-        # 步骤3：构建dirsearch执行命令
-        cmd = [
-            PYTHON_EXECUTABLE_PATH,  # 从配置文件导入Python解释器路径
-            DIRSEARCH_PATH,           # 从配置文件导入dirsearch路径
-            "-u", target_url,
-            "-i", '200',
-        ]
+        async def on_finding(target_url, count, finding):
+            nonlocal found
+            found += 1
+            await push_progress(ctx, found, f"[{target_url}] {finding}")
 
         try:
-            # 步骤4：执行命令并捕获输出
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                encoding="utf-8",
-                timeout=300,  # 整体执行超时（预留脚本启动时间）
-                shell=False
-            )
-
-            # 步骤5：处理执行结果
-            if result.returncode == 0:
-                return f"目录扫描完成（目标：{target_url}）\n-------------------------\n{result.stdout}"
-            else:
-                return f"目录扫描执行失败（目标：{target_url}）\n-------------------------\n错误信息：\n{result.stdout}"
-
-        except subprocess.TimeoutExpired:
-            return f"错误：扫描超时（已超过{timeout + 60}秒），请增大超时时间后重试"
+            report = await run_batch_scan(target_list, DIRSEARCH_WORDLIST_PATH, on_finding, max_inflight,
+                                          host_rate, host_concurrency=host_concurrency, calibrate=calibrate,
+                                          resume=resume, extensions=DIRSEARCH_EXTENSIONS)
         except Exception as e:
-            return f"错误：扫描过程中出现未知异常：\n{str(e)}"
\ No newline at end of file
+            return f"错误：批量扫描过程中出现未知异常：\n{str(e)}"
+        summary = (f"批量扫描完成：{len(target_list)} 个目标（失败 {report['failed_targets']} 个），"
+                   f"请求 {report['total_requests']} 次，发现 {report['total_findings']} 个路径")
+        report_text = json.dumps(report, ensure_ascii=False, indent=2)
+        # 有失败目标的报告不缓存，下次调用重新扫描
+        if not report["failed_targets"]:
+            RESULT_CACHE.put(key, "dir_scan_batch", [summary, report_text])
+        return bounded_result("dir_scan_batch", f"{len(target_list)} 个目标", report_text, summary)
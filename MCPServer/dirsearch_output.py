@@ -0,0 +1,132 @@
+# dirsearch_output.py
+# dirsearch 输出增量解析：按行切分子进程输出（进度条用 \r 刷新，同样视为行结束），
+# 把发现的路径解析为结构化记录（状态码、大小、URL、跳转地址），丢弃进度条和颜色控制符
+import re
+
+# ===================== 匹配规则 =====================
+# ANSI 颜色/光标控制序列
+ANSI_PATTERN = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+# 发现行：[12:34:56] 301 -  169B  - /js  ->  http://www.example.com/js/
+FINDING_PATTERN = re.compile(
+    r'^\[\d{1,2}:\d{2}:\d{2}\]\s+(\d{3})\s+-\s+([\d.]+)\s*([KMGT]?B)\s+-\s+(\S+)(?:\s+->\s+(\S+))?'
+)
+# 进度条：25.05%  2891/11460  123/s  job:1/1  errors:0
+PROGRESS_PATTERN = re.compile(r'\d+(?:\.\d+)?%|\d+/\d+\s+\d+/s')
+# 大小单位（dirsearch 按 1024 进位）
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+# 保留的其他输出行数上限
+MAX_MESSAGES = 200
+
+
+class DirFinding:
+    """dirsearch 发现的单个路径"""
+    __slots__ = ("status", "size", "path", "url", "redirect")
+
+    def __init__(self, status, size, path, url, redirect=None):
+        self.status = status        # 状态码
+        self.size = size            # 响应大小（字节，由 dirsearch 的 1KB/2MB 等换算，存在取整误差）
+        self.path = path            # 相对目标的路径
+        self.url = url              # 完整 URL
+        self.redirect = redirect    # 跳转地址（没有跳转时为 None）
+
+    def to_dict(self):
+        return {"status": self.status, "size": self.size, "path": self.path, "url": self.url,
+                "redirect": self.redirect}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["status"], data["size"], data["path"], data["url"], data.get("redirect"))
+
+    def __str__(self):
+        line = f"{self.status}  {self.size:>9}B  {self.url}"
+        if self.redirect:
+            line += f"  ->  {self.redirect}"
+        return line
+
+    def __repr__(self):
+        return f"<DirFinding {self}>"
+
+
+def join_url(target_url, path):
+    """把 dirsearch 输出的相对路径拼接到目标URL上"""
+    if path.startswith(("http://", "https://")):
+        return path
+    return target_url.rstrip("/") + "/" + path.lstrip("/")
+
+
+def parse_line(line, target_url):
+    """
+    解析一行输出
+    :return: DirFinding；不是发现行时返回 None
+    """
+    match = FINDING_PATTERN.match(line)
+    if not match:
+        return None
+    status, number, unit, path, redirect = match.groups()
+    size = int(float(number) * SIZE_UNITS[unit])
+    return DirFinding(int(status), size, path, join_url(target_url, path), redirect)
+
+
+def size_tolerance(size):
+    """dirsearch 显示大小时的取整误差（1KB 实际可能是 512~1535 字节）"""
+    for unit in (SIZE_UNITS["GB"], SIZE_UNITS["MB"], SIZE_UNITS["KB"]):
+        if size >= unit:
+            return unit // 2
+    return 0
+
+
+def is_noise(line):
+    """是否为进度条、空行等无意义输出"""
+    return not line.strip() or bool(PROGRESS_PATTERN.search(line))
+
+
+class DirsearchOutputParser:
+    """
+    dirsearch 输出增量解析器
+    用法：
+        parser = DirsearchOutputParser(target_url)
+        for finding in parser.feed(text): ...
+        findings = parser.flush()
+    """
+
+    def __init__(self, target_url, exclude=None):
+        """
+        :param target_url: 目标URL
+        :param exclude: 过滤函数 exclude(DirFinding)，返回 True 的发现被丢弃（如泛解析兜底页）
+        """
+        self.target_url = target_url
+        self.exclude = exclude
+        self.findings = []      # 迄今为止的全部发现
+        self.filtered = 0       # 被过滤函数丢弃的发现数
+        self.messages = []      # 非发现、非进度条的输出行（如目标信息、错误提示）
+        self._buffer = ""
+
+    def feed(self, text):
+        """
+        输入一段输出文本（可在行中间截断，剩余部分留到下一次）
+        :return: 本段中新发现的 DirFinding 列表
+        """
+        lines = re.split(r'\r\n|\r|\n', self._buffer + text)
+        self._buffer = lines.pop()
+        return self._parse_lines(lines)
+
+    def flush(self):
+        """处理最后一行不完整的输出"""
+        lines = [self._buffer] if self._buffer else []
+        self._buffer = ""
+        return self._parse_lines(lines)
+
+    def _parse_lines(self, lines):
+        findings = []
+        for line in lines:
+            line = ANSI_PATTERN.sub("", line).rstrip()
+            finding = parse_line(line.strip(), self.target_url)
+            if finding is not None:
+                if self.exclude is not None and self.exclude(finding):
+                    self.filtered += 1
+                    continue
+                findings.append(finding)
+                self.findings.append(finding)
+            elif not is_noise(line) and len(self.messages) < MAX_MESSAGES:
+                self.messages.append(line)
+        return findings
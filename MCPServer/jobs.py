@@ -0,0 +1,230 @@
+# jobs.py
+# 后台任务管理：start_* 工具立即返回任务ID，任务在进程内的有界调度器中异步执行，
+# 客户端通过 job_status / job_output / job_cancel 查询进度、分段读取输出或终止任务，不必占用HTTP连接等待
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+
+# ===================== 全局配置 =====================
+# 同时运行的任务数上限（超出的任务排队等待）
+MAX_RUNNING_JOBS = 4
+# 排队 + 运行中的任务数上限（超出时拒绝提交）
+MAX_ACTIVE_JOBS = 100
+# 保留的已结束任务数（超出时淘汰最早结束的任务）
+MAX_FINISHED_JOBS = 200
+# 单个任务的默认超时（秒）
+DEFAULT_JOB_TIMEOUT = 600
+# 单个任务保留的输出上限（字符数，超出部分丢弃）
+MAX_JOB_OUTPUT = 1024 * 1024
+# job_output 单次返回的默认字符数
+JOB_OUTPUT_PAGE = 64 * 1024
+
+# 任务状态
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMEOUT = "timeout"
+FINISHED_STATES = (DONE, FAILED, CANCELLED, TIMEOUT)
+
+
+class JobLimitError(RuntimeError):
+    """活动任务数已达上限"""
+
+
+class Job:
+    """单个后台任务：状态、累积输出及最终结果"""
+
+    def __init__(self, kind, description, timeout=DEFAULT_JOB_TIMEOUT, max_output=MAX_JOB_OUTPUT):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind                # 任务类型（如 dir_scan）
+        self.description = description  # 任务描述（如目标URL）
+        self.timeout = timeout
+        self.max_output = max_output
+        self.status = PENDING
+        self.result = None              # 任务结束时的结果摘要
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.truncated = False
+        self.task = None
+        self._chunks = []
+        self._size = 0
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def output_size(self):
+        return self._size
+
+    def write(self, text):
+        """追加输出（超出上限的部分丢弃并标记为已截断）"""
+        if not text or self.truncated:
+            return
+        room = self.max_output - self._size
+        if len(text) > room:
+            text = text[:room]
+            self.truncated = True
+        self._chunks.append(text)
+        self._size += len(text)
+
+    def read(self, offset=0, limit=JOB_OUTPUT_PAGE):
+        """读取 [offset, offset + limit) 范围的输出"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        output = self._chunks[0] if self._chunks else ""
+        return output[offset:offset + limit]
+
+    def summary(self):
+        """单行状态摘要"""
+        end = self.finished_at or time.time()
+        elapsed = end - (self.started_at or end)
+        line = f"{self.id}  {self.kind}  {self.status}  {elapsed:.1f}秒  输出{self._size}字符  {self.description}"
+        if self.error:
+            line += f"\n  错误：{self.error}"
+        return line
+
+
+class JobManager:
+    """
+    进程内有界任务调度器
+    用法：
+        job = JOB_MANAGER.submit("dir_scan", target_url, lambda job: run_dirsearch(target_url, job.write))
+    """
+
+    def __init__(self, max_running=MAX_RUNNING_JOBS, max_active=MAX_ACTIVE_JOBS, max_finished=MAX_FINISHED_JOBS):
+        self.max_running = max_running
+        self.max_active = max_active
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self._semaphore = None
+
+    def submit(self, kind, description, func, timeout=DEFAULT_JOB_TIMEOUT, max_output=MAX_JOB_OUTPUT):
+        """
+        提交任务（须在事件循环中调用），立即返回
+        :param kind: 任务类型
+        :param description: 任务描述
+        :param func: 异步函数 func(job)，通过 job.write 输出进度，返回值作为任务结果
+        :param timeout: 任务超时（秒）
+        :param max_output: 任务保留的输出上限（字符数）
+        :return: Job
+        """
+        active = sum(1 for job in self.jobs.values() if not job.finished)
+        if active >= self.max_active:
+            raise JobLimitError(f"活动任务数已达上限（{self.max_active}），请等待或取消部分任务")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+        job = Job(kind, description, timeout, max_output)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, func))
+        return job
+
+    async def _run(self, job, func):
+        try:
+            async with self._semaphore:
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.result = await asyncio.wait_for(func(job), job.timeout)
+                job.status = DONE
+        except asyncio.TimeoutError:
+            job.status = TIMEOUT
+            job.error = f"任务超时（已超过{job.timeout}秒）"
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.task = None
+            self._prune()
+
+    def _prune(self):
+        # 按结束时间淘汰（提交顺序靠前的长任务可能刚刚结束，不能先被淘汰）
+        finished = sorted((job for job in self.jobs.values() if job.finished), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        取消排队中或运行中的任务（任务函数中的 finally 负责结束子进程、关闭浏览器等清理）
+        :return: 是否发出了取消请求
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.finished or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+
+# 进程内共享的任务管理器（各模块的 start_* 工具都提交到这里）
+JOB_MANAGER = JobManager()
+
+
+def register_job_tools(mcp, manager=JOB_MANAGER):
+    """
+    注册任务查询/取消工具到FastMCP实例
+    :param mcp: FastMCP实例对象
+    :param manager: 任务管理器（默认：进程内共享的 JOB_MANAGER）
+    :return: 无
+    """
+    @mcp.tool()
+    def job_status(job_id: str = "") -> str:
+        """
+        查询后台任务状态
+        :param job_id: 任务ID（为空时列出全部任务）
+        :return: 任务状态、输出大小及结果
+        """
+        if not job_id:
+            if not manager.jobs:
+                return "当前没有后台任务"
+            return "\n".join(job.summary() for job in manager.jobs.values())
+        job = manager.get(job_id)
+        if job is None:
+            return f"错误：任务不存在：{job_id}"
+        result = job.summary()
+        if job.truncated:
+            result += f"\n  输出超过{job.max_output}字符，其余部分已丢弃"
+        if job.result:
+            result += f"\n-------------------------\n{job.result}"
+        return result
+
+    @mcp.tool()
+    def job_output(job_id: str, offset: int = 0, limit: int = JOB_OUTPUT_PAGE) -> str:
+        """
+        分段读取后台任务的输出（任务运行中即可读取已产生的部分结果）
+        :param job_id: 任务ID
+        :param offset: 起始位置（字符数，首次为0，之后传入上次返回的下一偏移）
+        :param limit: 本次最多返回的字符数（默认：65536）
+        :return: 任务状态、下一偏移及输出内容
+        """
+        job = manager.get(job_id)
+        if job is None:
+            return f"错误：任务不存在：{job_id}"
+        offset = max(0, offset)
+        text = job.read(offset, max(1, limit))
+        next_offset = offset + len(text)
+        more = "是" if next_offset < job.output_size or not job.finished else "否"
+        return f"状态：{job.status}\n下一偏移：{next_offset}\n可能还有更多输出：{more}\n-------------------------\n{text}"
+
+    @mcp.tool()
+    def job_cancel(job_id: str) -> str:
+        """
+        取消排队中或运行中的后台任务
+        :param job_id: 任务ID
+        :return: 取消结果
+        """
+        job = manager.get(job_id)
+        if job is None:
+            return f"错误：任务不存在：{job_id}"
+        if not manager.cancel(job_id):
+            return f"任务已结束，无需取消（状态：{job.status}）"
+        return f"已请求取消任务：{job_id}"
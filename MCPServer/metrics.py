@@ -0,0 +1,518 @@
+# metrics.py
+# 工具调用指标：包装 FastMCP 实例的工具注册，记录每个工具的调用次数、耗时分布、输入/输出字节数、错误数，
+# 以及子进程、解析等阶段耗时；通过 Prometheus 文本格式的 HTTP 端点和 metrics:// 资源查看，
+# 可在运行时为指定工具开启逐次调用的 cProfile 采样
+import asyncio
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import deque
+
+from config import METRICS_PATH, TOOL_PROFILING
+
+# ===================== 全局配置 =====================
+# 耗时分布的区间上限（秒），与 Prometheus 客户端默认区间相同并补充长耗时区间（目录扫描可达数分钟）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 600)
+# 每个工具保留的 cProfile 采样数及报告中列出的函数数
+PROFILE_KEEP = 5
+PROFILE_TOP_FUNCTIONS = 30
+# 以该前缀开头的返回文本计为错误（工具约定出错时返回“错误：……”）
+ERROR_RESULT_PREFIX = "错误"
+# Prometheus 文本格式的 Content-Type
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 当前调用的工具名（阶段耗时据此归属到工具；asyncio.to_thread 和后台任务会复制上下文）
+CURRENT_TOOL = contextvars.ContextVar("current_tool", default=None)
+# 当前调用在其他线程中的 cProfile 采样（to_thread 追加，调用结束时合并到本次采样）
+THREAD_PROFILES = contextvars.ContextVar("thread_profiles", default=None)
+# 进程内同时只进行一次工具调用采样：Python 3.11 及以前再次 enable 不会报错，而是顶替正在进行的采样
+_PROFILE_LOCK = threading.Lock()
+
+
+class Histogram:
+    """累积分布（Prometheus histogram 语义：各区间计数 + 总和 + 总数）"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(区间上限, 累积计数), ...]，最后一项为 +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        result.append(("+Inf", self.count))
+        return result
+
+    def quantile(self, q):
+        """按区间估算分位数（返回所在区间的上限，落在最后一个区间之外时返回 inf）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        for bound, total in self.cumulative()[:-1]:
+            if total >= target:
+                return bound
+        return float("inf")
+
+
+class ToolMetrics:
+    """单个工具的指标"""
+    __slots__ = ("name", "calls", "in_flight", "exceptions", "error_results", "latency", "bytes_in", "bytes_out",
+                 "phases", "last_call_at")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.in_flight = 0
+        self.exceptions = 0
+        self.error_results = 0
+        self.latency = Histogram()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.phases = {}
+        self.last_call_at = None
+
+    @property
+    def errors(self):
+        return self.exceptions + self.error_results
+
+
+class ProfileRecord:
+    """一次 cProfile 采样"""
+    __slots__ = ("tool", "started_at", "duration", "report", "event_loop")
+
+    def __init__(self, tool, started_at, duration, report, event_loop=False):
+        self.tool = tool
+        self.started_at = started_at
+        self.duration = duration
+        self.report = report
+        self.event_loop = event_loop    # 是否在事件循环线程上采样（异步工具：采样期间其他协程的执行也计入）
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return f"{value:.6f}".rstrip("0").rstrip(".") if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    进程内的工具指标（线程安全：工具的同步部分常在 asyncio.to_thread 的线程中执行）
+    用法：
+        instrument_tools(mcp)            # 之后注册的工具自动记录指标
+        with phase("subprocess"): ...    # 在工具内部记录阶段耗时
+    """
+
+    def __init__(self, profiling=TOOL_PROFILING):
+        self.tools = {}
+        self.profiled_tools = set()
+        # 全部工具开启 cProfile 采样（profiled_tools 为空时生效）
+        self.profile_all = profiling
+        self.profiles = {}
+        self._lock = threading.RLock()
+
+    def tool(self, name):
+        metrics = self.tools.get(name)
+        if metrics is None:
+            with self._lock:
+                metrics = self.tools.setdefault(name, ToolMetrics(name))
+        return metrics
+
+    def call_started(self, name):
+        with self._lock:
+            metrics = self.tool(name)
+            metrics.calls += 1
+            metrics.in_flight += 1
+            metrics.last_call_at = time.time()
+
+    def call_finished(self, name, duration, bytes_in, bytes_out, exception=False, error_result=False):
+        with self._lock:
+            metrics = self.tool(name)
+            metrics.in_flight -= 1
+            metrics.latency.observe(duration)
+            metrics.bytes_in += bytes_in
+            metrics.bytes_out += bytes_out
+            metrics.exceptions += exception
+            metrics.error_results += error_result
+
+    def observe_phase(self, name, duration, tool=None):
+        """记录阶段耗时（tool 省略时归属到当前调用的工具，不在工具调用中时不记录）"""
+        tool = tool or CURRENT_TOOL.get()
+        if tool is None:
+            return
+        with self._lock:
+            phases = self.tool(tool).phases
+            histogram = phases.get(name)
+            if histogram is None:
+                histogram = phases[name] = Histogram()
+            histogram.observe(duration)
+
+    # ---------- cProfile 采样 ----------
+    def set_profiling(self, enabled, tools=None):
+        """
+        开启/关闭 cProfile 采样
+        :param tools: 工具名列表（为空表示全部工具）
+        """
+        with self._lock:
+            if tools:
+                if enabled:
+                    self.profiled_tools.update(tools)
+                else:
+                    self.profiled_tools.difference_update(tools)
+            else:
+                self.profile_all = enabled
+                self.profiled_tools.clear()
+
+    def profiling(self, name):
+        return self.profile_all or name in self.profiled_tools
+
+    def add_profile(self, name, started_at, duration, profiler, thread_profilers=(), event_loop=False):
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        for thread_profiler in thread_profilers:
+            stats.add(thread_profiler)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        with self._lock:
+            self.profiles.setdefault(name, deque(maxlen=PROFILE_KEEP)).append(
+                ProfileRecord(name, started_at, duration, stream.getvalue(), event_loop))
+
+    # ---------- 输出 ----------
+    def prometheus_text(self):
+        """Prometheus 文本格式"""
+        with self._lock:
+            tools = sorted(self.tools.values(), key=lambda metrics: metrics.name)
+            lines = []
+
+            def family(metric, kind, help_text, samples):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} {kind}")
+                for labels, value in samples:
+                    label_text = ",".join(f'{key}="{_label(val)}"' for key, val in labels)
+                    lines.append(f"{metric}{{{label_text}}} {_number(value)}")
+
+            def histogram_samples(metric, labels, histogram):
+                for bound, total in histogram.cumulative():
+                    yield f"{metric}_bucket", labels + (("le", bound),), total
+                yield f"{metric}_sum", labels, histogram.sum
+                yield f"{metric}_count", labels, histogram.count
+
+            family("mcp_tool_calls_total", "counter", "工具调用次数",
+                   [((("tool", m.name),), m.calls) for m in tools])
+            family("mcp_tool_in_flight", "gauge", "正在执行的调用数",
+                   [((("tool", m.name),), m.in_flight) for m in tools])
+            family("mcp_tool_errors_total", "counter", "出错的调用次数（exception：抛出异常；result：返回错误文本）",
+                   [((("tool", m.name), ("kind", kind)), value) for m in tools
+                    for kind, value in (("exception", m.exceptions), ("result", m.error_results))])
+            family("mcp_tool_request_bytes_total", "counter", "工具参数的字节数（JSON）",
+                   [((("tool", m.name),), m.bytes_in) for m in tools])
+            family("mcp_tool_response_bytes_total", "counter", "工具返回内容的字节数",
+                   [((("tool", m.name),), m.bytes_out) for m in tools])
+
+            for metric, help_text, histograms in (
+                    ("mcp_tool_duration_seconds", "工具调用耗时（秒）",
+                     [((("tool", m.name),), m.latency) for m in tools]),
+                    ("mcp_tool_phase_seconds", "工具内部各阶段耗时（秒，如 subprocess / parse / export）",
+                     [((("tool", m.name), ("phase", name)), histogram)
+                      for m in tools for name, histogram in sorted(m.phases.items())])):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in histograms:
+                    for sample, sample_labels, value in histogram_samples(metric, labels, histogram):
+                        label_text = ",".join(f'{key}="{_label(val)}"' for key, val in sample_labels)
+                        lines.append(f"{sample}{{{label_text}}} {_number(value)}")
+            return "\n".join(lines) + "\n"
+
+    def summary_text(self):
+        """各工具的汇总表（metrics://tools 资源）"""
+        with self._lock:
+            tools = sorted(self.tools.values(), key=lambda metrics: metrics.latency.sum, reverse=True)
+            if not tools:
+                return "暂无工具调用记录"
+            lines = [f"{'工具':<28}{'调用':>8}{'错误':>6}{'执行中':>6}{'平均(秒)':>10}{'p95(秒)':>9}"
+                     f"{'输入(B)':>10}{'输出(B)':>12}"]
+            for m in tools:
+                average = m.latency.sum / m.latency.count if m.latency.count else 0.0
+                lines.append(f"{m.name:<28}{m.calls:>8}{m.errors:>6}{m.in_flight:>6}{average:>10.3f}"
+                             f"{m.latency.quantile(0.95):>9}{m.bytes_in:>10}{m.bytes_out:>12}")
+            state = "全部工具" if self.profile_all else "、".join(sorted(self.profiled_tools)) or "关闭"
+            lines.append(f"\ncProfile 采样：{state}")
+            return "\n".join(lines)
+
+    def tool_text(self, name):
+        """单个工具的详细指标（metrics://tools/{tool_name} 资源）"""
+        with self._lock:
+            m = self.tools.get(name)
+            if m is None:
+                return f"错误：工具没有调用记录：{name}"
+            lines = [f"工具：{name}",
+                     f"调用 {m.calls} 次（执行中 {m.in_flight}），抛出异常 {m.exceptions} 次，返回错误 {m.error_results} 次",
+                     f"输入 {m.bytes_in} 字节，输出 {m.bytes_out} 字节",
+                     f"耗时：总计 {m.latency.sum:.3f} 秒，p50≤{m.latency.quantile(0.5)} p95≤{m.latency.quantile(0.95)} "
+                     f"p99≤{m.latency.quantile(0.99)} 秒"]
+            for phase_name, histogram in sorted(m.phases.items()):
+                lines.append(f"阶段 {phase_name}：{histogram.count} 次，总计 {histogram.sum:.3f} 秒，"
+                             f"p95≤{histogram.quantile(0.95)} 秒")
+            records = self.profiles.get(name)
+            if records:
+                lines.append(f"\ncProfile 采样 {len(records)} 次，最近一次："
+                             f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(records[-1].started_at))}，"
+                             f"耗时 {records[-1].duration:.3f} 秒")
+                if records[-1].event_loop:
+                    lines.append("注意：异步工具在事件循环线程上采样，采样期间同一事件循环中其他协程"
+                                 "（其他工具调用、会话处理等）的执行也计入本次采样")
+                lines.append(records[-1].report)
+            return "\n".join(lines)
+
+
+# 进程内共享的指标（所有工具的指标都记录到这里）
+METRICS = MetricsRegistry()
+
+
+class phase:
+    """
+    记录一个阶段的耗时（归属到当前调用的工具）
+    用法：
+        with phase("subprocess"):
+            await process.wait()
+    """
+
+    def __init__(self, name, registry=METRICS):
+        self.name = name
+        self.registry = registry
+        self.started_at = None
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe_phase(self.name, time.perf_counter() - self.started_at)
+
+
+def timed_iter(iterable, name, registry=METRICS):
+    """
+    包装迭代器，把从中取值所花的时间合计记为一个阶段（用于惰性解析：解析与写出交替进行时只统计解析部分）
+    :return: 生成器，产出与 iterable 相同
+    """
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            started_at = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - started_at
+            yield item
+    finally:
+        registry.observe_phase(name, elapsed)
+
+
+def start_profiler():
+    """
+    在当前线程开始 cProfile 采样
+    :return: Profile（当前线程已有其他采样时为 None：3.11 及以前检查 sys.getprofile，之后的版本 enable 报 ValueError）
+    """
+    if sys.getprofile() is not None:
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+async def to_thread(func, *args, **kwargs):
+    """
+    与 asyncio.to_thread 相同；当前调用开启了 cProfile 采样时，线程中的执行也一并采样
+    （工具中耗 CPU 的同步部分用它放到线程执行，否则采样只能看到事件循环在等待）
+    """
+    thread_profilers = THREAD_PROFILES.get()
+    if thread_profilers is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    def run():
+        profiler = start_profiler()
+        if profiler is None:
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            thread_profilers.append(profiler)
+
+    return await asyncio.to_thread(run)
+
+
+# ===================== 工具注册包装 =====================
+def _payload_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _request_size(func, args, kwargs):
+    # Context 等非参数对象不计入
+    arguments = inspect.signature(func).bind_partial(*args, **kwargs).arguments
+    params = {key: value for key, value in arguments.items()
+              if value is None or isinstance(value, (str, int, float, bool, list, dict, tuple))}
+    return _payload_size(params)
+
+
+def instrument(func, name, registry=METRICS):
+    """
+    包装工具函数：记录调用次数、耗时、输入/输出字节数和错误，按需进行 cProfile 采样
+    包装后的函数签名、注解与原函数相同（FastMCP 据此生成参数说明和注入 Context）
+    """
+    def start():
+        registry.call_started(name)
+        profiler = token = None
+        # 已有其他采样在进行（并发的工具调用或外部的 profiler）时本次不采样
+        if registry.profiling(name) and _PROFILE_LOCK.acquire(blocking=False):
+            profiler = start_profiler()
+            if profiler is None:
+                _PROFILE_LOCK.release()
+            else:
+                token = THREAD_PROFILES.set([])
+        return time.time(), time.perf_counter(), profiler, token
+
+    # 异步工具的采样在事件循环线程上进行，会混入同时运行的其他协程
+    event_loop = inspect.iscoroutinefunction(func)
+
+    def finish(state, bytes_in, result=None, exception=False):
+        started_at, started, profiler, token = state
+        duration = time.perf_counter() - started
+        if profiler is not None:
+            profiler.disable()
+            _PROFILE_LOCK.release()
+            thread_profilers = THREAD_PROFILES.get()
+            THREAD_PROFILES.reset(token)
+            registry.add_profile(name, started_at, duration, profiler, thread_profilers, event_loop)
+        error_result = isinstance(result, str) and result.startswith(ERROR_RESULT_PREFIX)
+        registry.call_finished(name, duration, bytes_in, _payload_size(result), exception, error_result)
+
+    if event_loop:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bytes_in = _request_size(func, args, kwargs)
+            token = CURRENT_TOOL.set(name)
+            state = start()
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException:
+                finish(state, bytes_in, exception=True)
+                raise
+            finally:
+                CURRENT_TOOL.reset(token)
+            finish(state, bytes_in, result)
+            return result
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bytes_in = _request_size(func, args, kwargs)
+            token = CURRENT_TOOL.set(name)
+            state = start()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                finish(state, bytes_in, exception=True)
+                raise
+            finally:
+                CURRENT_TOOL.reset(token)
+            finish(state, bytes_in, result)
+            return result
+    return wrapper
+
+
+def instrument_tools(mcp, registry=METRICS):
+    """
+    让 FastMCP 实例之后注册的所有工具（@mcp.tool() 及 mcp.add_tool）自动记录指标
+    须在注册工具之前调用（紧接在创建 FastMCP 实例之后）
+    :param mcp: FastMCP实例对象
+    :param registry: 指标（默认：进程内共享的 METRICS）
+    :return: 无
+    """
+    add_tool = mcp.add_tool
+
+    @functools.wraps(add_tool)
+    def instrumented_add_tool(fn, name=None, *args, **kwargs):
+        return add_tool(instrument(fn, name or fn.__name__, registry), name, *args, **kwargs)
+
+    mcp.add_tool = instrumented_add_tool
+
+
+def register_metrics(mcp, registry=METRICS):
+    """
+    注册指标端点、metrics:// 资源及 cProfile 采样开关工具到FastMCP实例
+    （HTTP 端点 METRICS_PATH 在 streamable-http / sse 传输下可用，供 Prometheus 抓取）
+    :param mcp: FastMCP实例对象
+    :param registry: 指标（默认：进程内共享的 METRICS）
+    :return: 无
+    """
+    from starlette.responses import Response
+
+    @mcp.custom_route(METRICS_PATH, methods=["GET"])
+    async def metrics_endpoint(request):
+        return Response(registry.prometheus_text(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    @mcp.resource("metrics://tools", mime_type="text/plain")
+    def tool_metrics() -> str:
+        """各工具的调用次数、错误数、耗时和输入/输出字节数汇总"""
+        return registry.summary_text()
+
+    @mcp.resource("metrics://tools/{tool_name}", mime_type="text/plain")
+    def tool_metrics_detail(tool_name: str) -> str:
+        """单个工具的详细指标：耗时分位数、各阶段耗时及最近一次 cProfile 采样"""
+        return registry.tool_text(tool_name)
+
+    @mcp.resource("metrics://prometheus", mime_type="text/plain")
+    def prometheus_metrics() -> str:
+        """Prometheus 文本格式的全部指标（与 HTTP 端点相同）"""
+        return registry.prometheus_text()
+
+    @mcp.tool()
+    def set_tool_profiling(enabled: bool, tools: list[str] | None = None) -> str:
+        """
+        开启或关闭工具调用的 cProfile 采样（每次调用单独采样，结果见 metrics://tools/{tool_name}）
+        注意：采样覆盖事件循环线程及经 metrics.to_thread 放到线程中执行的部分；采样会明显拖慢调用。
+        异步工具在事件循环线程上采样，采样期间同一事件循环中其他协程（其他工具调用、会话处理等）的执行也会计入，
+        报告中会注明；需要只含本次调用的采样时，应避免同时调用其他工具
+        :param enabled: 是否开启
+        :param tools: 工具名列表（默认：全部工具）
+        :return: 当前采样状态
+        """
+        unknown = [name for name in tools or () if mcp._tool_manager.get_tool(name) is None]
+        if unknown:
+            return f"错误：工具不存在：{'、'.join(unknown)}"
+        registry.set_profiling(enabled, tools)
+        state = "全部工具" if registry.profile_all else "、".join(sorted(registry.profiled_tools)) or "无"
+        return f"cProfile 采样已{'开启' if enabled else '关闭'}，当前采样的工具：{state}"
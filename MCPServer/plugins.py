@@ -0,0 +1,161 @@
+# plugins.py
+# 工具模块注册表：服务启动时按配置注册各工具模块（工具的参数和说明在注册时即可列出），
+# 模块中的重量级依赖（selenium、pyarrow 等）用 lazy_import 延迟到首次调用工具时才导入；
+# 附带 -X importtime 导入耗时分析，用于检查服务冷启动是否超出预算
+import importlib
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+from config import ENABLED_TOOL_PLUGINS, STARTUP_BUDGET_MS
+
+# ===================== 全局配置 =====================
+# 导入耗时报告中列出的模块数
+IMPORT_REPORT_TOP = 20
+# 分析冷启动时导入的服务模块（项目根目录下的 test.py）
+SERVER_MODULE = "test"
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ===================== 延迟导入 =====================
+class LazyModule:
+    """模块代理：首次访问属性时才真正导入"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "已导入" if self._module is not None else "未导入"
+        return f"<LazyModule {self._name}（{state}）>"
+
+
+def lazy_import(name, optional=False):
+    """
+    延迟导入模块
+    :param name: 模块名（可以是子模块，如 selenium.webdriver.edge.options）
+    :param optional: 可选依赖：未安装时返回 None（与 try/except ImportError 赋 None 的写法等价，但不导入模块）
+    :return: LazyModule（已导入过的直接返回模块本身）
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    # 只查顶层包是否安装：查找子模块会先导入其上级包
+    if optional and importlib.util.find_spec(name.partition(".")[0]) is None:
+        return None
+    return LazyModule(name)
+
+
+# ===================== 工具模块注册 =====================
+class ToolPlugin:
+    """一个工具模块：模块路径 + 注册函数名"""
+    __slots__ = ("name", "module", "register", "description")
+
+    def __init__(self, name, module, register, description):
+        self.name = name
+        self.module = module
+        self.register = register
+        self.description = description
+
+
+TOOL_PLUGINS = {plugin.name: plugin for plugin in (
+    ToolPlugin("dir_scan", "MCPServer.dir_scan", "register_dir_scan_tool", "目录扫描（dirsearch / 内置引擎 / 批量）"),
+    ToolPlugin("jobs", "MCPServer.jobs", "register_job_tools", "后台任务查询/取消"),
+    ToolPlugin("results", "MCPServer.results", "register_result_resources", "大结果分页读取（results:// 资源）"),
+    ToolPlugin("metrics", "MCPServer.metrics", "register_metrics",
+               "工具指标（Prometheus 端点、metrics:// 资源、cProfile 采样开关；配合 instrument_tools）"),
+    ToolPlugin("selenium", "MCPServer.Selenium", "register_selenium_tool",
+               "浏览器抓包、爬取与 Burp 日志筛选（浏览器会话池需配合 selenium_lifespan）"),
+)}
+
+
+def register_plugins(mcp, names=ENABLED_TOOL_PLUGINS):
+    """
+    按名称注册工具模块
+    :param mcp: FastMCP实例对象
+    :param names: 启用的工具模块名（见 TOOL_PLUGINS，默认读取 config.ENABLED_TOOL_PLUGINS）
+    :return: {模块名: 导入+注册耗时（毫秒）}
+    :raises KeyError: 未知的工具模块名
+    """
+    load_times = {}
+    for name in names:
+        plugin = TOOL_PLUGINS[name]
+        started_at = time.perf_counter()
+        register = getattr(importlib.import_module(plugin.module), plugin.register)
+        register(mcp)
+        load_times[name] = (time.perf_counter() - started_at) * 1000
+    return load_times
+
+
+# ===================== 导入耗时分析 =====================
+def parse_importtime(stderr):
+    """
+    解析 python -X importtime 的输出
+    :return: [(模块名, 自身耗时微秒, 累计耗时微秒, 嵌套层级), ...]（按导入完成顺序）
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            # 表头行
+            continue
+        # 模块名前一个空格，每嵌套一层再缩进两个空格
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def profile_imports(module=SERVER_MODULE, python=sys.executable, cwd=PROJECT_ROOT):
+    """
+    在新进程中以 -X importtime 导入模块（冷启动，不受当前进程已导入模块的影响）
+    :return: (导入记录列表, 进程总耗时毫秒)
+    :raises RuntimeError: 导入失败
+    """
+    started_at = time.perf_counter()
+    result = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"], cwd=cwd,
+                            capture_output=True, text=True, encoding="utf-8", errors="replace")
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败：{result.stderr.strip().splitlines()[-1:]}")
+    return parse_importtime(result.stderr), elapsed_ms
+
+
+def format_import_report(records, elapsed_ms, budget_ms=STARTUP_BUDGET_MS, top=IMPORT_REPORT_TOP):
+    """
+    生成导入耗时报告：总耗时、预算检查、累计耗时最高的直接依赖、自身耗时最高的模块
+    :return: (报告文本, 是否超出预算)
+    """
+    total_ms = sum(record[1] for record in records) / 1000
+    over_budget = bool(budget_ms) and total_ms > budget_ms
+    lines = [f"导入模块 {len(records)} 个，导入耗时 {total_ms:.0f} ms（进程总耗时 {elapsed_ms:.0f} ms）"]
+    if budget_ms:
+        lines.append(f"启动预算 {budget_ms} ms：{'超出' if over_budget else '符合'}")
+
+    # 被分析模块直接导入的模块（嵌套第 1 层），其累计耗时即各依赖的总代价
+    lines.append(f"\n累计耗时最高的直接依赖（前 {top} 个）：")
+    roots = sorted((record for record in records if record[3] == 1), key=lambda record: record[2], reverse=True)
+    for name, _, cumulative_us, _ in roots[:top]:
+        lines.append(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    lines.append(f"\n自身耗时最高的模块（前 {top} 个）：")
+    for name, self_us, _, _ in sorted(records, key=lambda record: record[1], reverse=True)[:top]:
+        lines.append(f"  {self_us / 1000:8.1f} ms  {name}")
+    return "\n".join(lines), over_budget
+
+
+# ===================== 程序入口（冷启动耗时检查）=====================
+if __name__ == "__main__":
+    # 用法：python -m MCPServer.plugins [模块名] [预算毫秒]，超出预算时退出码为 1（可放在提交前检查中）
+    module_name = sys.argv[1] if len(sys.argv) > 1 else SERVER_MODULE
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else STARTUP_BUDGET_MS
+    report, exceeded = format_import_report(*profile_imports(module_name), budget_ms=budget)
+    print(report)
+    sys.exit(1 if exceeded else 0)
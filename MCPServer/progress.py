@@ -0,0 +1,18 @@
+# progress.py
+# MCP 增量推送：客户端携带 progressToken 时用进度通知推送，否则退回日志通知，保证结果能实时送达
+async def push_progress(ctx, progress, message, total=None):
+    """
+    向 MCP 客户端推送一条增量消息
+    :param ctx: FastMCP Context（为 None 时不推送，便于在 MCP 之外复用）
+    :param progress: 当前进度值（如已推送的条数）
+    :param message: 推送内容
+    :param total: 总量（未知时为 None）
+    :return: 无
+    """
+    if ctx is None:
+        return
+    meta = ctx.request_context.meta
+    if meta is not None and meta.progressToken is not None:
+        await ctx.report_progress(progress, total, message)
+    else:
+        await ctx.info(message)
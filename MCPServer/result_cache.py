@@ -0,0 +1,220 @@
+# result_cache.py
+# 工具结果缓存：按 工具名 + 规范化参数 + 输入指纹（日志/字典文件的大小、修改时间及首尾内容哈希）缓存幂等调用的结果，
+# 重复调用直接返回（毫秒级）；超过有效期或输入变化时自然失效，按条数/总大小以 LRU 淘汰，
+# 可写入 SQLite 在服务重启后继续使用；工具的 force_refresh 参数跳过缓存重新执行
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+from config import RESULT_CACHE_MAX_BYTES, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_PATH, RESULT_CACHE_TTL
+
+# ===================== 全局配置 =====================
+# 输入文件指纹读取的首尾字节数（大日志不做全文哈希，否则命中缓存也要数秒）
+FINGERPRINT_SAMPLE = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key         TEXT PRIMARY KEY,
+    tool        TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+"""
+
+
+def file_fingerprint(path):
+    """
+    输入文件指纹：大小、修改时间（纳秒）及首尾 FINGERPRINT_SAMPLE 字节的哈希
+    （追加写入的日志大小会变化；原地改写而大小、修改时间都不变的情况由首尾内容区分）
+    :return: 指纹文本（文件不存在时为空字符串）
+    """
+    try:
+        stat = os.stat(path)
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            digest.update(f.read(FINGERPRINT_SAMPLE))
+            if stat.st_size > FINGERPRINT_SAMPLE:
+                f.seek(max(FINGERPRINT_SAMPLE, stat.st_size - FINGERPRINT_SAMPLE))
+                digest.update(f.read(FINGERPRINT_SAMPLE))
+    except OSError:
+        return ""
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{digest.hexdigest()[:16]}"
+
+
+def normalize_url(url):
+    """规范化目标URL：去除首尾空白，协议和主机小写，去掉末尾的 /（与断点键的处理一致）"""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, "")).rstrip("/")
+
+
+def cache_key(tool, args, fingerprints=()):
+    """
+    缓存键
+    :param tool: 工具名
+    :param args: 影响结果的参数（dict；不影响结果的参数如并发数、force_refresh 不应放入）
+    :param fingerprints: 输入文件指纹列表（见 file_fingerprint）
+    :return: sha256 十六进制文本
+    """
+    payload = json.dumps([tool, args, list(fingerprints)], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheEntry:
+    """一条缓存结果"""
+    __slots__ = ("key", "tool", "value", "size", "created_at", "accessed_at")
+
+    def __init__(self, key, tool, value, size, created_at, accessed_at=None):
+        self.key = key
+        self.tool = tool
+        self.value = value          # 可 JSON 序列化的工具结果
+        self.size = size            # JSON 序列化后的字节数（按它计算总大小）
+        self.created_at = created_at
+        self.accessed_at = accessed_at or created_at
+
+    @property
+    def age(self):
+        return time.time() - self.created_at
+
+
+class ResultCache:
+    """
+    工具结果缓存（内存 LRU；设置了 path 时写入 SQLite，首次使用时载入未过期的结果）
+    用法：
+        key = cache_key("filter_burp_log", {"query": query}, [file_fingerprint(log_file)])
+        entry = None if force_refresh else RESULT_CACHE.get(key)
+        if entry is None:
+            RESULT_CACHE.put(key, "filter_burp_log", run_filter())
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES,
+                 max_bytes=RESULT_CACHE_MAX_BYTES):
+        """
+        :param path: SQLite 文件路径（为空时只缓存在内存中）
+        :param ttl: 有效期（秒）
+        :param max_entries: 条数上限
+        :param max_bytes: 总大小上限（字节）
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        self._loaded = False
+
+    def _load(self):
+        """首次使用时打开 SQLite 并载入未过期的结果（数据库不可用时退回只用内存）"""
+        self._loaded = True
+        if not self.path:
+            return
+        try:
+            self.conn = sqlite3.connect(self.path)
+            self.conn.executescript(SCHEMA)
+            self.conn.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl,))
+            self.conn.commit()
+            rows = self.conn.execute(
+                "SELECT key, tool, value, size, created_at, accessed_at FROM results ORDER BY accessed_at").fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️  结果缓存数据库不可用（{str(e)}），只在内存中缓存")
+            self.conn = None
+            return
+        for key, tool, value, size, created_at, accessed_at in rows:
+            self._insert(CacheEntry(key, tool, json.loads(value), size, created_at, accessed_at))
+        self._evict()
+
+    def _insert(self, entry):
+        old = self.entries.pop(entry.key, None)
+        if old is not None:
+            self.total_size -= old.size
+        self.entries[entry.key] = entry
+        self.total_size += entry.size
+
+    def _write(self, sql, params):
+        """写入数据库（出错时退回只用内存，不影响工具返回结果）"""
+        if self.conn is None:
+            return
+        try:
+            self.conn.execute(sql, params)
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  结果缓存写入失败（{str(e)}），之后只在内存中缓存")
+            self.close()
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.total_size -= entry.size
+        self._write("DELETE FROM results WHERE key = ?", (key,))
+
+    def _evict(self):
+        """淘汰最久未使用的结果，直到条数和总大小都在上限内"""
+        while self.entries and (len(self.entries) > self.max_entries or self.total_size > self.max_bytes):
+            self._remove(next(iter(self.entries)))
+
+    def get(self, key):
+        """
+        :return: CacheEntry（不存在或已过期时为 None）
+        """
+        if not self._loaded:
+            self._load()
+        entry = self.entries.get(key)
+        if entry is not None and entry.age > self.ttl:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry.accessed_at = time.time()
+        self.entries.move_to_end(key)
+        # 访问时间写回数据库，重启后按它恢复 LRU 顺序
+        self._write("UPDATE results SET accessed_at = ? WHERE key = ?", (entry.accessed_at, key))
+        return entry
+
+    def put(self, key, tool, value):
+        """
+        保存结果（超过总大小上限的单个结果不缓存）
+        :param value: 可 JSON 序列化的工具结果
+        :return: CacheEntry 或 None
+        """
+        if not self._loaded:
+            self._load()
+        text = json.dumps(value, ensure_ascii=False)
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return None
+        entry = CacheEntry(key, tool, value, size, time.time())
+        self._insert(entry)
+        self._write("INSERT OR REPLACE INTO results (key, tool, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (key, tool, text, size, entry.created_at, entry.accessed_at))
+        self._evict()
+        return entry
+
+    def invalidate(self, key):
+        if not self._loaded:
+            self._load()
+        self._remove(key)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# 进程内共享的结果缓存（各工具的缓存结果都保存到这里）
+RESULT_CACHE = ResultCache()
+
+
+def cached_note(entry):
+    """缓存命中说明（附在工具返回内容的开头）"""
+    return f"（缓存结果：{entry.age:.0f} 秒前生成，输入未变化；force_refresh=True 可重新执行）"
@@ -0,0 +1,214 @@
+# results.py
+# 大结果分页：目录扫描输出、筛选导出文件等大结果保存在服务端并分配结果ID，工具只返回摘要和结果地址，
+# 客户端通过资源模板 results://{result_id}/{cursor} 按游标逐页读取（也可调用 read_result 工具），
+# 单次响应的大小始终有上限；未启用 results 工具模块（没有读取入口）时不保存，直接截断返回
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+# ===================== 全局配置 =====================
+# 单页最大字符数（文件结果为字节数），按行对齐，不把一行拆到两页
+RESULT_PAGE_SIZE = 32 * 1024
+# 不超过该字符数的结果直接返回，不保存
+INLINE_RESULT_LIMIT = 8 * 1024
+# 摘要中附带的预览行数
+PREVIEW_LINES = 20
+# 保留的结果数上限（超出时淘汰最早的）及保留时长（秒）
+MAX_RESULTS = 100
+RESULT_TTL = 3600
+RESULT_URI = "results://{result_id}/{cursor}"
+# 摘要与正文之间的分隔线
+SEPARATOR = "-------------------------"
+
+
+class StoredResult:
+    """
+    一个保存在服务端的结果：内存文本或磁盘上的文本文件（文件只记录路径，读取时按偏移读取一页）
+    游标为下一页的起始偏移（文本为字符偏移，文件为字节偏移），首页为 0
+    """
+    __slots__ = ("id", "kind", "description", "text", "path", "created_at")
+
+    def __init__(self, kind, description, text=None, path=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.description = description
+        self.text = text
+        self.path = path
+        self.created_at = time.time()
+
+    @property
+    def size(self):
+        return len(self.text) if self.path is None else os.path.getsize(self.path)
+
+    def uri(self, cursor=0):
+        return RESULT_URI.format(result_id=self.id, cursor=cursor)
+
+    def read_page(self, cursor=0, page_size=RESULT_PAGE_SIZE):
+        """
+        读取从游标开始的一页
+        :return: (页面文本, 页面结束偏移)，结束偏移即下一页游标（等于 size 时已到末尾）
+        """
+        if self.path is None:
+            chunk = self.text[cursor:cursor + page_size]
+            end = cursor + len(chunk)
+            if end < len(self.text):
+                cut = chunk.rfind("\n") + 1
+                if cut > 0:
+                    chunk, end = chunk[:cut], cursor + cut
+            return chunk, end
+
+        with open(self.path, "rb") as f:
+            f.seek(cursor)
+            data = f.read(page_size)
+        end = cursor + len(data)
+        if end < os.path.getsize(self.path):
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                # 超长的一行：不在多字节字符中间截断
+                try:
+                    data.decode("utf-8")
+                except UnicodeDecodeError as e:
+                    if e.end == len(data) and e.start > 0:
+                        cut = e.start
+            if cut > 0:
+                data, end = data[:cut], cursor + cut
+        return data.decode("utf-8", errors="replace"), end
+
+
+class ResultStore:
+    """
+    进程内的结果存储（按保存顺序淘汰）
+    register_result_resources 注册读取入口后 served 为真，此前工具不应保存结果（客户端无法读取）
+    用法：
+        result = RESULT_STORE.put("dir_scan", target_url, text=output)
+        text, end = RESULT_STORE.get(result.id).read_page(0)
+    """
+
+    def __init__(self, max_results=MAX_RESULTS, ttl=RESULT_TTL):
+        self.max_results = max_results
+        self.ttl = ttl
+        self.results = OrderedDict()
+        self.served = False
+
+    def put(self, kind, description, text=None, path=None):
+        """
+        保存结果（text 与 path 二选一）；与已保存的结果内容相同时（如缓存命中后再次返回）沿用原结果并刷新保存时间
+        :return: StoredResult
+        """
+        self._prune()
+        for result in self.results.values():
+            if (result.kind, result.description, result.path) == (kind, description, path) and result.text == text:
+                result.created_at = time.time()
+                self.results.move_to_end(result.id)
+                return result
+        result = StoredResult(kind, description, text, path)
+        self.results[result.id] = result
+        while len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+        return result
+
+    def get(self, result_id):
+        self._prune()
+        return self.results.get(result_id)
+
+    def _prune(self):
+        expire_before = time.time() - self.ttl
+        for result_id in [result_id for result_id, result in self.results.items()
+                          if result.created_at < expire_before]:
+            del self.results[result_id]
+
+
+# 进程内共享的结果存储（各工具的大结果都保存到这里）
+RESULT_STORE = ResultStore()
+
+
+def page_hint(result):
+    """结果地址说明（附在工具返回的摘要之后）"""
+    pages = max(1, -(-result.size // RESULT_PAGE_SIZE))
+    unit = "字节" if result.path else "字符"
+    return (f"完整结果：{result.uri()}（{result.size}{unit}，约 {pages} 页；"
+            f"读取资源或调用 read_result(\"{result.id}\")，按返回的下一页游标继续）")
+
+
+def bounded_result(kind, description, text, summary, store=RESULT_STORE):
+    """
+    限制工具返回的大小：结果不超过 INLINE_RESULT_LIMIT 时原样返回，否则保存完整结果，
+    返回 摘要 + 结果地址 + 前 PREVIEW_LINES 行预览（未启用 results 工具模块时不保存，只返回摘要和预览）
+    :param summary: 摘要（如“发现 N 个路径”）；text 以它开头时预览从其后开始，不重复摘要
+    :return: 工具返回文本
+    """
+    if len(text) <= INLINE_RESULT_LIMIT:
+        return text
+    body = text
+    if body.startswith(summary):
+        body = body[len(summary):].lstrip("\n")
+        if body.startswith(SEPARATOR):
+            body = body[len(SEPARATOR):].lstrip("\n")
+    preview = "\n".join(body.splitlines()[:PREVIEW_LINES])[:INLINE_RESULT_LIMIT]
+    if store.served:
+        hint = page_hint(store.put(kind, description, text=text))
+    else:
+        hint = f"（结果共 {len(text)} 字符，仅显示前 {PREVIEW_LINES} 行；启用 results 工具模块后可分页读取完整结果）"
+    return f"{summary}\n{hint}\n{SEPARATOR}\n{preview}\n……"
+
+
+def store_file_result(kind, path, store=RESULT_STORE):
+    """
+    登记磁盘上的文本结果（如筛选导出文件），不读入内存
+    :return: StoredResult（未启用 results 工具模块时为 None）
+    """
+    if not store.served:
+        return None
+    return store.put(kind, path, path=os.path.abspath(path))
+
+
+def format_page(result, cursor):
+    """单页响应：位置、下一页游标及页面内容"""
+    text, end = result.read_page(cursor)
+    position = f"{cursor}-{end}/{result.size}"
+    following = f"下一页：{result.uri(end)}（游标 {end}）" if end < result.size else "已是最后一页"
+    return (f"结果 {result.id}（{result.kind}：{result.description}）\n位置：{position}\n{following}\n"
+            f"-------------------------\n{text}")
+
+
+def read_result_page(result_id, cursor, store=RESULT_STORE):
+    """读取结果的一页（资源模板和 read_result 工具共用）"""
+    result = store.get(result_id)
+    if result is None:
+        return f"错误：结果不存在或已过期：{result_id}"
+    try:
+        cursor = int(cursor)
+    except (TypeError, ValueError):
+        return f"错误：游标不合法：{cursor}"
+    if cursor < 0 or (cursor and cursor >= result.size):
+        return f"错误：游标超出范围（0-{result.size - 1}）：{cursor}"
+    try:
+        return format_page(result, cursor)
+    except OSError as e:
+        return f"错误：结果文件无法读取：{str(e)}"
+
+
+def register_result_resources(mcp, store=RESULT_STORE):
+    """
+    注册结果分页资源模板及读取工具到FastMCP实例
+    :param mcp: FastMCP实例对象
+    :param store: 结果存储（默认：进程内共享的 RESULT_STORE）
+    :return: 无
+    """
+    store.served = True
+
+    @mcp.resource(RESULT_URI, mime_type="text/plain")
+    def result_page(result_id: str, cursor: str) -> str:
+        """按游标分页读取保存在服务端的大结果（首页游标为 0，每页附下一页地址）"""
+        return read_result_page(result_id, cursor, store)
+
+    @mcp.tool()
+    def read_result(result_id: str, cursor: int = 0) -> str:
+        """
+        分页读取保存在服务端的大结果（与资源 results://{result_id}/{cursor} 相同，供不支持资源的客户端使用）
+        :param result_id: 结果ID（工具返回的“完整结果”地址中的ID）
+        :param cursor: 游标（首页为0，之后传入上次返回的下一页游标）
+        :return: 位置、下一页游标及页面内容
+        """
+        return read_result_page(result_id, cursor, store)
@@ -0,0 +1,148 @@
+# scan_checkpoint.py
+# 目录扫描断点：按 目标 + 字典（含文件大小/修改时间）+ 扫描参数 记录已完成的字典位置、已发现的路径和兜底页指纹，
+# 定期写入 SQLite；超时、取消或服务重启后可从断点继续，已完成的 目标+字典 组合直接跳过
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from config import SCAN_CHECKPOINT_PATH
+from MCPServer.dirsearch_output import DirFinding
+from MCPServer.soft404 import Soft404Detector
+
+# ===================== 全局配置 =====================
+# 扫描过程中写断点的间隔（秒）
+CHECKPOINT_INTERVAL = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    key         TEXT PRIMARY KEY,
+    target      TEXT NOT NULL,
+    wordlist    TEXT NOT NULL,
+    position    INTEGER NOT NULL DEFAULT 0,
+    findings    TEXT NOT NULL DEFAULT '[]',
+    calibration TEXT,
+    completed   INTEGER NOT NULL DEFAULT 0,
+    updated_at  REAL NOT NULL
+);
+"""
+
+
+def checkpoint_key(target_url, wordlist_path, *params):
+    """断点键：目标、字典路径及其大小/修改时间、扫描参数（字典变化后旧断点自然失效）"""
+    parts = [target_url.rstrip("/"), os.path.abspath(wordlist_path)]
+    # dirsearch 引擎不读取该字典，字典不存在时只按路径区分
+    if os.path.exists(wordlist_path):
+        stat = os.stat(wordlist_path)
+        parts.extend((str(stat.st_size), str(stat.st_mtime_ns)))
+    parts.extend(str(param) for param in params)
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class ScanCheckpoint:
+    """单个 目标 + 字典 的扫描断点"""
+
+    def __init__(self, store, key, target_url, wordlist_path, position=0, findings=(), calibration=None,
+                 completed=False):
+        self.store = store
+        self.key = key
+        self.target_url = target_url
+        self.wordlist_path = wordlist_path
+        self.position = position            # 字典中此前的条目均已请求完成
+        self.findings = list(findings)      # DirFinding 列表
+        self.calibration = calibration      # Soft404Detector（续扫时沿用，保证过滤标准一致）
+        self.completed = completed
+        self.messages = []                  # 与其他扫描结果对象保持一致（format_scan_result 使用）
+        self._saved_at = time.monotonic()
+
+    def merge_findings(self, findings):
+        """合并发现（断点之后已完成的请求在续扫时会重新请求，按 URL 去重）"""
+        seen = {finding.url for finding in self.findings}
+        self.findings.extend(finding for finding in findings if finding.url not in seen)
+
+    def save(self, position=None, findings=None, completed=False):
+        """写入断点"""
+        if position is not None:
+            self.position = position
+        if findings is not None:
+            self.merge_findings(findings)
+        self.completed = completed
+        self.store.save(self)
+        self._saved_at = time.monotonic()
+
+    def due(self):
+        """距上次写入是否已超过 CHECKPOINT_INTERVAL"""
+        return time.monotonic() - self._saved_at >= CHECKPOINT_INTERVAL
+
+
+class CheckpointStore:
+    """
+    断点存储（SQLite）
+    用法：
+        with CheckpointStore() as store:
+            checkpoint = store.open(target_url, wordlist_path, "native", include_status, calibrate, extensions,
+                                    resume=True)
+    """
+
+    def __init__(self, path=SCAN_CHECKPOINT_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def open(self, target_url, wordlist_path, *params, resume=True):
+        """
+        获取断点
+        :param resume: 是否沿用已有断点（否则从头开始并覆盖旧断点）
+        :return: ScanCheckpoint
+        """
+        key = checkpoint_key(target_url, wordlist_path, *params)
+        row = self.conn.execute(
+            "SELECT position, findings, calibration, completed FROM checkpoints WHERE key = ?", (key,)).fetchone()
+        if not resume or row is None:
+            return ScanCheckpoint(self, key, target_url, wordlist_path)
+        position, findings, calibration, completed = row
+        return ScanCheckpoint(
+            self, key, target_url, wordlist_path, position,
+            [DirFinding.from_dict(item) for item in json.loads(findings)],
+            Soft404Detector.from_dict(json.loads(calibration)) if calibration else None,
+            bool(completed),
+        )
+
+    def save(self, checkpoint):
+        calibration = checkpoint.calibration
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (checkpoint.key, checkpoint.target_url, checkpoint.wordlist_path, checkpoint.position,
+                 json.dumps([finding.to_dict() for finding in checkpoint.findings], ensure_ascii=False),
+                 json.dumps(calibration.to_dict()) if calibration is not None else None,
+                 int(checkpoint.completed), time.time()))
+
+
+@contextmanager
+def open_checkpoint_store(path=SCAN_CHECKPOINT_PATH):
+    """
+    打开断点存储，数据库不可用（路径无效、无写权限等）时给出 None，扫描照常进行但不记录断点
+    用法：
+        with open_checkpoint_store() as store:
+            checkpoint = store.open(...) if store is not None else None
+    """
+    try:
+        store = CheckpointStore(path)
+    except sqlite3.Error as e:
+        print(f"⚠️  断点数据库不可用（{str(e)}），本次扫描不记录断点")
+        yield None
+        return
+    with store:
+        yield store
@@ -0,0 +1,195 @@
+# soft404.py
+# 泛解析 / soft-404 识别：扫描前请求若干随机路径作为基线，按 状态码 + 长度区间 + 正文 simhash 生成指纹，
+# 按 主机 + 基础路径 缓存（同一主机下不同应用的兜底页可能不同），
+# 扫描中与指纹相符的响应（对任意路径都返回的兜底页）直接在扫描器内丢弃，不再进入工具结果
+import hashlib
+import re
+import secrets
+import time
+from urllib.parse import urlsplit
+
+from MCPServer.dirsearch_output import join_url
+
+# ===================== 全局配置 =====================
+# 基线探测路径（{} 替换为随机字符串，覆盖目录、常见扩展名和隐藏文件几种兜底规则）
+CALIBRATION_PATTERNS = ("{}", "{}/", "{}.php", "{}.html", "{}.bak", ".{}")
+# 长度区间大小（字节）：兜底页常回显请求路径，长度会有小幅波动，相邻区间视为相同
+LENGTH_BUCKET = 64
+# simhash 汉明距离阈值（小于等于该值视为同一页面）：兜底页通常只有几十个词，
+# 回显路径多出一两个词就会翻转 3~7 位，而不同页面之间一般相差 20 位以上
+SIMHASH_DISTANCE = 8
+# 参与 simhash 的正文字节数及去重后的词数上限
+SIMHASH_MAX_BYTES = 64 * 1024
+SIMHASH_MAX_TOKENS = 512
+# 回显路径短于该长度时不做替换（过短的路径会误删正文中的普通字符，长度差异由长度区间容忍）
+MIN_REFLECTED_LENGTH = 4
+# 只有大小可比时（dirsearch 输出）允许的固定偏差（字节），另加回显路径的长度
+SIZE_MATCH_SLACK = 16
+# 兜底页中回显请求路径的次数上限（按大小比对时，路径每回显一次大小多出路径长度）
+MAX_REFLECTIONS = 2
+# 指纹缓存有效期（秒）
+CALIBRATION_TTL = 3600
+
+TOKEN_PATTERN = re.compile(rb"[A-Za-z0-9_]+")
+
+
+def simhash(body):
+    """64 位 simhash（按正文中的单词计算，使用稳定的 blake2b 哈希，结果可跨进程保存）"""
+    tokens = set(TOKEN_PATTERN.findall(body[:SIMHASH_MAX_BYTES]))
+    weights = [0] * 64
+    for index, token in enumerate(tokens):
+        if index >= SIMHASH_MAX_TOKENS:
+            break
+        value = int.from_bytes(hashlib.blake2b(token, digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def normalize_body(body, word):
+    """去掉正文中回显的请求路径，避免同一兜底页因路径不同而指纹不同"""
+    if len(word) >= MIN_REFLECTED_LENGTH:
+        body = body.replace(word.encode("utf-8", errors="ignore"), b"")
+    return body
+
+
+def normalize_redirect(redirect, word):
+    """跳转地址同样去掉回显的请求路径"""
+    if not redirect:
+        return None
+    return redirect.replace(word, "") if len(word) >= MIN_REFLECTED_LENGTH else redirect
+
+
+class ResponseFingerprint:
+    """兜底页指纹"""
+    __slots__ = ("status", "size", "digest", "simhash", "redirect")
+
+    def __init__(self, status, size, digest, simhash_value, redirect=None):
+        self.status = status
+        self.size = size                # 去掉回显路径后的正文长度
+        self.digest = digest            # 去掉回显路径后的正文 sha1（完全相同时免算 simhash）
+        self.simhash = simhash_value
+        self.redirect = redirect
+
+    @classmethod
+    def from_response(cls, status, body, redirect, word):
+        body = normalize_body(body, word)
+        return cls(status, len(body), hashlib.sha1(body).hexdigest(), simhash(body),
+                   normalize_redirect(redirect, word))
+
+    def to_dict(self):
+        return {"status": self.status, "size": self.size, "digest": self.digest,
+                "simhash": self.simhash, "redirect": self.redirect}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["status"], data["size"], data["digest"], data["simhash"], data.get("redirect"))
+
+    def same_bucket(self, status, size):
+        """状态码相同且长度落在相邻区间内"""
+        return status == self.status and abs(size // LENGTH_BUCKET - self.size // LENGTH_BUCKET) <= 1
+
+    def __repr__(self):
+        return f"<ResponseFingerprint {self.status} {self.size}B {self.simhash:016x}>"
+
+
+class Soft404Detector:
+    """
+    单个主机的兜底页识别器
+    用法：
+        detector = await calibrate_host(client, target_url)
+        if detector.is_soft404(status, body, redirect, word): ...
+    """
+
+    def __init__(self, fingerprints=(), calibrated_at=None):
+        self.fingerprints = list(fingerprints)
+        self.calibrated_at = calibrated_at or time.time()
+
+    @property
+    def expired(self):
+        return time.time() - self.calibrated_at > CALIBRATION_TTL
+
+    def add(self, fingerprint):
+        # 相同的兜底页只保留一份指纹
+        for existing in self.fingerprints:
+            if existing.digest == fingerprint.digest and existing.status == fingerprint.status:
+                return
+        self.fingerprints.append(fingerprint)
+
+    def is_soft404(self, status, body, redirect=None, word=""):
+        """
+        响应是否与基线指纹相符
+        先比较状态码、长度区间、跳转地址，都相符时再比较正文（先比 sha1，不同时再比 simhash）
+        """
+        if not self.fingerprints:
+            return False
+        body = normalize_body(body, word)
+        candidates = [fp for fp in self.fingerprints
+                      if fp.same_bucket(status, len(body)) and fp.redirect == normalize_redirect(redirect, word)]
+        if not candidates:
+            return False
+        digest = hashlib.sha1(body).hexdigest()
+        if any(fp.digest == digest for fp in candidates):
+            return True
+        value = simhash(body)
+        return any(bin(fp.simhash ^ value).count("1") <= SIMHASH_DISTANCE for fp in candidates)
+
+    def matches_size(self, status, size, tolerance=0, word=""):
+        """
+        只有状态码和大小时的近似判断（dirsearch 输出不含正文，大小为 1KB/2MB 这类取整值）
+        指纹大小不含回显的路径，响应大小允许比它多出至多 MAX_REFLECTIONS 次路径长度
+        :param tolerance: 大小的取整误差（字节）
+        :param word: 请求的路径（用于估计回显带来的大小差异）
+        """
+        reflected = MAX_REFLECTIONS * len(word) if len(word) >= MIN_REFLECTED_LENGTH else 0
+        low = tolerance + SIZE_MATCH_SLACK
+        high = low + reflected
+        return any(fp.status == status and -low <= size - fp.size <= high for fp in self.fingerprints)
+
+    def to_dict(self):
+        return {"calibrated_at": self.calibrated_at, "fingerprints": [fp.to_dict() for fp in self.fingerprints]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([ResponseFingerprint.from_dict(fp) for fp in data["fingerprints"]], data["calibrated_at"])
+
+
+# ===================== 按主机 + 基础路径缓存 =====================
+_DETECTOR_CACHE = {}
+
+
+def host_key(target_url):
+    """主机键：协议 + 主机（含端口）"""
+    parts = urlsplit(target_url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def calibration_key(target_url):
+    """指纹缓存键：主机键 + 基础路径（/app1/ 与 /app2/ 分别探测）"""
+    return host_key(target_url) + urlsplit(target_url).path.rstrip("/")
+
+
+async def calibrate_host(client, target_url, refresh=False):
+    """
+    获取目标（主机 + 基础路径）的兜底页识别器：缓存未过期时直接返回，否则请求随机路径重新生成指纹
+    :param client: httpx.AsyncClient
+    :param target_url: 目标URL（随机路径拼接在其下）
+    :param refresh: 是否忽略缓存重新探测
+    :return: Soft404Detector
+    """
+    key = calibration_key(target_url)
+    detector = _DETECTOR_CACHE.get(key)
+    if detector is not None and not detector.expired and not refresh:
+        return detector
+    detector = Soft404Detector()
+    for pattern in CALIBRATION_PATTERNS:
+        word = pattern.format(secrets.token_hex(6))
+        try:
+            response = await client.get(join_url(target_url, word))
+        except Exception:
+            # 探测失败不影响扫描，只是少一个基线
+            continue
+        detector.add(ResponseFingerprint.from_response(response.status_code, response.content,
+                                                       response.headers.get("location"), word))
+    _DETECTOR_CACHE[key] = detector
+    return detector
@@ -0,0 +1,343 @@
+# traffic_export.py
+# 筛选结果的结构化导出：除 Burp 风格的文本日志外，支持 JSON Lines（每行一条请求/响应记录，可 gzip/zstd 压缩）
+# 和 Parquet 列式文件（安装了 pyarrow 时）；相同的响应正文按哈希只存一份（默认在导出文件内，文件自包含；
+# 提供正文库时存入正文库，导出文件只保留哈希），
+# 回读时直接得到结构化记录 / HttpExchange，无需再对文本做分隔符切分和正则解析
+import base64
+import gzip
+import io
+import json
+from urllib.parse import urlsplit
+
+from MCPServer.body_store import BodyStore, body_digest
+from MCPServer.burp_http import HttpExchange, build_message
+from MCPServer.burp_log import TrafficLogWriter, decode_entry
+from MCPServer.plugins import lazy_import
+
+# 可选依赖（未安装时为 None），导出对应格式时才真正导入
+pyarrow = lazy_import("pyarrow", optional=True)                  # Parquet 列式导出
+parquet = lazy_import("pyarrow.parquet", optional=True)
+zstandard = lazy_import("zstandard", optional=True)             # zstd 压缩
+
+# ===================== 全局配置 =====================
+FORMAT_LOG = "log"
+FORMAT_JSONL = "jsonl"
+FORMAT_PARQUET = "parquet"
+EXPORT_FORMATS = (FORMAT_LOG, FORMAT_JSONL, FORMAT_PARQUET)
+COMPRESSION_SUFFIXES = {"": "", "gzip": ".gz", "zstd": ".zst"}
+# Parquet 每个行组的记录数（写入时攒够一组再落盘，内存占用与导出总量无关）
+PARQUET_ROW_GROUP_SIZE = 10000
+# 文本日志中重复正文的占位（首次出现的正文照常写出，之后以哈希引用同一文件中之前的那份）
+DUPLICATE_BODY_MARKER = "<<重复正文 sha256:{digest} {size}B>>"
+
+
+def encode_body(body):
+    """正文编码为 JSON 字符串：能按 UTF-8 解码的直接存文本，否则存 base64"""
+    try:
+        return body.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        return base64.b64encode(body).decode("ascii"), "base64"
+
+
+def decode_body(data, encoding):
+    return base64.b64decode(data) if encoding == "base64" else data.encode("utf-8")
+
+
+def exchange_record(exchange):
+    """
+    请求/响应对转为结构化记录（响应正文只记录哈希，正文本身另存）
+    :return: (记录字典, 响应正文字节或 None)
+    """
+    request, response = exchange.request, exchange.response
+    record = {
+        "method": request.method,
+        "url": request.url,
+        "status": None,
+        "content_type": None,
+        "request_headers": request.headers,
+        "request_body": request.body.decode("utf-8", errors="ignore"),
+        "response_headers": {},
+        "response_body_digest": None,
+        "response_size": 0,
+    }
+    if response is None:
+        return record, None
+    body = response.body
+    record.update(status=response.status, content_type=response.content_type, response_headers=response.headers,
+                  response_body_digest=body_digest(body), response_size=len(body))
+    return record, body
+
+
+def record_exchange(record, body=b""):
+    """结构化记录还原为 HttpExchange（供查询表达式筛选导出文件）"""
+    parts = urlsplit(record["url"])
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    request = build_message("request", f"{record['method']} {path} HTTP/1.1", dict(record["request_headers"]),
+                            (record["request_body"] or "").encode("utf-8"))
+    request.method, request.path, request.scheme = record["method"], path, parts.scheme
+    request.host = request.host or parts.netloc
+    if record["status"] is None:
+        return HttpExchange(request)
+    response = build_message("response", f"HTTP/1.1 {record['status']}", dict(record["response_headers"]), body)
+    response.status = record["status"]
+    return HttpExchange(request, response)
+
+
+def export_path(base_path, export_format=FORMAT_LOG, compression=""):
+    """导出文件名：基础路径 + 格式扩展名 + 压缩扩展名"""
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"不支持的压缩方式：{compression}（可选：gzip / zstd）")
+    if export_format == FORMAT_LOG:
+        if compression:
+            raise ValueError("log 格式不支持压缩，请改用 jsonl 或 parquet")
+        return base_path + ".log"
+    if export_format == FORMAT_JSONL:
+        return base_path + ".jsonl" + COMPRESSION_SUFFIXES[compression]
+    if export_format == FORMAT_PARQUET:
+        if pyarrow is None:
+            raise ValueError("未安装 pyarrow，无法导出 parquet 格式")
+        return base_path + ".parquet"
+    raise ValueError(f"不支持的导出格式：{export_format}（可选：{' / '.join(EXPORT_FORMATS)}）")
+
+
+def open_text(path, mode="r"):
+    """按扩展名打开（可能压缩的）文本文件"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError("未安装 zstandard，无法读写 zstd 压缩文件")
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor().stream_writer(raw)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+# ===================== 写入 =====================
+class LogExchangeWriter(TrafficLogWriter):
+    """
+    Burp 风格文本日志（请求、响应各一个条目）
+    dedup 为真时，同一文件中重复出现的响应正文替换为 DUPLICATE_BODY_MARKER（只保留响应头），
+    首次出现的正文完整写在文件中，不使用正文库
+    """
+
+    def __init__(self, path, dedup=False):
+        super().__init__(path)
+        self.dedup = dedup
+        self.duplicate_bodies = 0
+        self._digests = set()
+
+    def write_exchange(self, exchange):
+        self.write(exchange.request.text)
+        response = exchange.response
+        if response is None:
+            return
+        body = response.body
+        if not self.dedup or not body:
+            self.write(response.text)
+            return
+        digest = body_digest(body)
+        if digest not in self._digests:
+            self._digests.add(digest)
+            self.write(response.text)
+            return
+        self.duplicate_bodies += 1
+        marker = DUPLICATE_BODY_MARKER.format(digest=digest, size=len(body))
+        if len(body) <= len(marker):
+            # 正文比占位还短，照常写出
+            self.write(response.text)
+            return
+        head = decode_entry(response.raw[:response.body_start]).strip()
+        self.write(head + "\n\n" + marker)
+
+
+class JsonlExchangeWriter:
+    """
+    JSON Lines 导出：{"type": "body", ...} 行保存正文（每个哈希只写一次，出现在首次引用之前），
+    {"type": "exchange", ...} 行为请求/响应记录，响应正文以 response_body_digest 引用；
+    提供正文库时正文只存入正文库，不写 body 行
+    """
+
+    def __init__(self, path, body_store=None):
+        self.path = path
+        self.body_store = body_store
+        self.count = 0
+        self.unique_bodies = 0
+        self.duplicate_bodies = 0
+        self._digests = set()
+        self.out = open_text(path, "w")
+
+    def write_exchange(self, exchange):
+        record, body = exchange_record(exchange)
+        digest = record["response_body_digest"]
+        if body is not None and digest in self._digests:
+            self.duplicate_bodies += 1
+        elif body is not None:
+            self._digests.add(digest)
+            self.unique_bodies += 1
+            if self.body_store is not None:
+                self.body_store.put(body)
+            else:
+                data, encoding = encode_body(body)
+                self.out.write(json.dumps({"type": "body", "digest": digest, "encoding": encoding, "data": data},
+                                          ensure_ascii=False) + "\n")
+        record["type"] = "exchange"
+        self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        if not self.out.closed:
+            self.out.close()
+            if self.body_store is not None and self.body_store.written:
+                self.body_store.prune()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetExchangeWriter:
+    """
+    Parquet 列式导出：头部以 JSON 字符串存放，响应正文列只在哈希首次出现时写入（重复的为空，回读时按哈希补全）；
+    提供正文库时正文列全部为空，正文只存入正文库
+    """
+
+    SCHEMA_FIELDS = (("method", "string"), ("url", "string"), ("status", "int32"), ("content_type", "string"),
+                     ("request_headers", "string"), ("request_body", "string"), ("response_headers", "string"),
+                     ("response_body_digest", "string"), ("response_size", "int64"), ("response_body", "binary"))
+
+    def __init__(self, path, compression="", body_store=None):
+        self.path = path
+        self.body_store = body_store
+        self.count = 0
+        self.unique_bodies = 0
+        self.duplicate_bodies = 0
+        self._digests = set()
+        self._rows = []
+        schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in self.SCHEMA_FIELDS])
+        self._writer = parquet.ParquetWriter(path, schema, compression=compression or "none")
+        self._schema = schema
+
+    def write_exchange(self, exchange):
+        record, body = exchange_record(exchange)
+        record["request_headers"] = json.dumps(record["request_headers"], ensure_ascii=False)
+        record["response_headers"] = json.dumps(record["response_headers"], ensure_ascii=False)
+        digest = record["response_body_digest"]
+        record["response_body"] = None
+        if body is not None and digest in self._digests:
+            self.duplicate_bodies += 1
+        elif body is not None:
+            self._digests.add(digest)
+            self.unique_bodies += 1
+            if self.body_store is not None:
+                self.body_store.put(body)
+            else:
+                record["response_body"] = body
+        self._rows.append(record)
+        self.count += 1
+        if len(self._rows) >= PARQUET_ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(pyarrow.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+            if self.body_store is not None and self.body_store.written:
+                self.body_store.prune()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_exchange_writer(base_path, export_format=FORMAT_LOG, compression="", dedup_bodies=False):
+    """
+    按格式创建导出写入器（均提供 write_exchange / close / path / count / duplicate_bodies）
+    jsonl / parquet 中相同的响应正文总是只写一份（之后的记录以哈希引用文件中的那份）
+    :param base_path: 不含扩展名的导出路径
+    :param dedup_bodies: jsonl / parquet 的正文改存本地正文库（导出文件只保留哈希，不再自包含）；
+                         log 格式中重复的正文替换为哈希占位（不使用正文库）
+    :raises ValueError: 格式或压缩方式不支持、缺少可选依赖
+    """
+    path = export_path(base_path, export_format, compression)
+    body_store = BodyStore() if dedup_bodies else None
+    if export_format == FORMAT_JSONL:
+        return JsonlExchangeWriter(path, body_store)
+    if export_format == FORMAT_PARQUET:
+        return ParquetExchangeWriter(path, compression, body_store)
+    return LogExchangeWriter(path, dedup_bodies)
+
+
+# ===================== 回读 =====================
+def is_export_file(path):
+    """是否为结构化导出文件（jsonl / parquet）"""
+    return path.endswith((".jsonl", ".jsonl.gz", ".jsonl.zst", ".parquet"))
+
+
+def load_records(path, body_store=None):
+    """
+    读取结构化导出文件
+    :param body_store: 文件中没有的正文到该正文库中按哈希查找（默认：配置中的正文库）
+    :return: 生成器，按导出顺序产出 (记录字典, 响应正文字节或 None)，重复正文已按哈希补全
+    """
+    body_store = body_store or BodyStore()
+    bodies = _BodyLookup(body_store)
+    if path.endswith(".parquet"):
+        if pyarrow is None:
+            raise ValueError("未安装 pyarrow，无法读取 parquet 文件")
+        for batch in parquet.ParquetFile(path).iter_batches():
+            for row in batch.to_pylist():
+                body = row.pop("response_body")
+                if body is not None:
+                    bodies[row["response_body_digest"]] = body
+                row["request_headers"] = json.loads(row["request_headers"])
+                row["response_headers"] = json.loads(row["response_headers"])
+                yield row, bodies.get(row["response_body_digest"])
+        return
+
+    with open_text(path) as f:
+        for line in f:
+            item = json.loads(line)
+            if item.pop("type") == "body":
+                bodies[item["digest"]] = decode_body(item["data"], item["encoding"])
+                continue
+            yield item, bodies.get(item["response_body_digest"])
+
+
+class _BodyLookup(dict):
+    """哈希 → 正文：文件中没有的按需从正文库读取（读到的缓存起来，重复引用不再读盘）"""
+
+    def __init__(self, body_store):
+        super().__init__()
+        self.body_store = body_store
+
+    def __missing__(self, digest):
+        if digest is None:
+            return None
+        body = self[digest] = self.body_store.get(digest)
+        return body
+
+    def get(self, digest, default=None):
+        body = self[digest]
+        return default if body is None else body
+
+
+def iter_exported_exchanges(path):
+    """读取结构化导出文件并还原为 HttpExchange（可直接交给查询表达式筛选）"""
+    for record, body in load_records(path):
+        yield record_exchange(record, body or b"")
@@ -0,0 +1,304 @@
+# webdriver_pool.py
+# Edge WebDriver 会话池：服务启动时预热若干个已配置 Burp 代理的浏览器，工具调用时租用，
+# 用完清空 Cookie/存储后放回（不重启浏览器），借出前做健康检查，使用达到次数上限后回收重建
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from config import SELENIUM_PATH, WEBDRIVER_HEADLESS
+from MCPServer.plugins import lazy_import
+
+# selenium 导入较慢，首次启动浏览器时才导入
+webdriver = lazy_import("selenium.webdriver")
+edge_options = lazy_import("selenium.webdriver.edge.options")
+edge_service = lazy_import("selenium.webdriver.edge.service")
+
+# ===================== 全局配置 =====================
+# 池中浏览器数量（同时可租用的会话数）
+WEBDRIVER_POOL_SIZE = 2
+# 单个浏览器最多使用次数，达到后关闭并重建（避免长期运行的浏览器内存膨胀、残留状态）
+WEBDRIVER_MAX_USES = 20
+# 保留的错误信息条数上限
+MAX_POOL_MESSAGES = 20
+
+# 统计页面中未完成的 XHR/fetch 请求数（每个新文档加载前注入，网络空闲等待使用）
+NETWORK_HOOK_SCRIPT = """
+(function () {
+  if (window.__mcpPendingRequests !== undefined) return;
+  window.__mcpPendingRequests = 0;
+  // 默认只记录 250 条资源请求，调大以免长时间会话中计数停止增长
+  if (performance.setResourceTimingBufferSize) performance.setResourceTimingBufferSize(100000);
+  var done = function () { window.__mcpPendingRequests = Math.max(0, window.__mcpPendingRequests - 1); };
+  var send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    window.__mcpPendingRequests++;
+    this.addEventListener('loadend', done);
+    try { return send.apply(this, arguments); } catch (e) { done(); throw e; }
+  };
+  if (window.fetch) {
+    var fetch = window.fetch;
+    window.fetch = function () {
+      window.__mcpPendingRequests++;
+      var promise = fetch.apply(this, arguments);
+      promise.then(done, done);
+      return promise;
+    };
+  }
+})();
+"""
+# 网络活动采样：已完成的资源请求数、未完成的 XHR/fetch 数、当前地址（跳转也视为活动）
+NETWORK_ACTIVITY_SCRIPT = """
+return [performance.getEntriesByType('resource').length, window.__mcpPendingRequests || 0, location.href];
+"""
+
+
+def create_edge_driver(burp_proxy="127.0.0.1:8080", headless=WEBDRIVER_HEADLESS, performance_log=False):
+    """
+    启动一个走 Burp 代理的 Edge 浏览器
+    :param burp_proxy: Burp 代理地址（None 表示直连）
+    :param headless: 是否无界面运行（无桌面的 Linux 上测试时使用）
+    :param performance_log: 是否开启性能日志（仅 DevTools 抓包需要；开启后不读取会在驱动中一直累积）
+    :return: WebDriver
+    """
+    options = edge_options.Options()
+    if burp_proxy:
+        options.add_argument(f'--proxy-server=http://{burp_proxy}')
+    options.add_argument('--ignore-certificate-errors')
+    options.add_argument('--ignore-ssl-errors')
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument('--disable-popup-blocking')
+    if performance_log:
+        options.set_capability("ms:loggingPrefs", {"performance": "ALL"})
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1920,1080')
+        # 容器/root 用户下没有沙箱和足够的共享内存
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+
+    try:
+        driver_path = SELENIUM_PATH
+        driver_service = (edge_service.Service(executable_path=driver_path) if os.path.exists(driver_path)
+                          else edge_service.Service())
+    except Exception:
+        driver_service = edge_service.Service()
+
+    driver = webdriver.Edge(service=driver_service, options=options)
+    if not headless:
+        driver.maximize_window()
+    install_network_hook(driver)
+    return driver
+
+
+def install_network_hook(driver):
+    """注册 NETWORK_HOOK_SCRIPT：之后每个新打开的页面都会统计未完成的请求数"""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_HOOK_SCRIPT})
+    except Exception:
+        # 不支持 CDP 时只能依据已完成的请求数和 Burp 日志判断空闲
+        pass
+
+
+def network_activity(driver):
+    """
+    采样浏览器网络活动（供 follow_exchanges 的 activity 参数使用）
+    :return: ((已完成的资源请求数, 当前地址), 是否有未完成的 XHR/fetch)
+    """
+    resource_count, pending, url = driver.execute_script(NETWORK_ACTIVITY_SCRIPT)
+    return (resource_count, url), pending > 0
+
+
+class PooledDriver:
+    """池中的单个浏览器会话"""
+    __slots__ = ("driver", "uses", "created_at", "performance_log")
+
+    def __init__(self, driver, performance_log=False):
+        self.driver = driver
+        self.uses = 0                       # 已租用次数
+        self.created_at = time.time()
+        self.performance_log = performance_log  # 是否开启了性能日志（重置时丢弃积压的事件）
+
+    def healthy(self):
+        """浏览器进程和 WebDriver 连接是否可用"""
+        try:
+            return bool(self.driver.window_handles) and self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def reset(self):
+        """
+        清空会话状态：关闭多余窗口，清除 Cookie、当前页面的本地存储和缓存，回到空白页
+        （其他来源残留的存储由使用次数上限兜底：浏览器重建后全部清空）
+        """
+        driver = self.driver
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        try:
+            origin = driver.execute_script("return window.location.origin")
+            if origin and origin != "null":
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            # about:blank 等页面没有可清理的存储
+            pass
+        driver.delete_all_cookies()
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        driver.get("about:blank")
+        if self.performance_log:
+            # 丢弃积压的性能日志（不读取会一直累积）
+            driver.get_log("performance")
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class WebDriverPool:
+    """
+    浏览器会话池
+    用法：
+        pool = WebDriverPool(burp_proxy)
+        pool.start()                        # 后台预热
+        async with pool.lease() as session:
+            session.driver.get(target_url)
+        await pool.close()
+    """
+
+    def __init__(self, burp_proxy="127.0.0.1:8080", size=WEBDRIVER_POOL_SIZE, max_uses=WEBDRIVER_MAX_USES,
+                 headless=WEBDRIVER_HEADLESS, performance_log=False, factory=None):
+        """
+        :param burp_proxy: Burp 代理地址（None 表示直连）
+        :param size: 浏览器数量上限
+        :param max_uses: 单个浏览器最多使用次数
+        :param headless: 是否无界面运行
+        :param performance_log: 浏览器是否开启性能日志（租用方使用 DevToolsCapture 时需要）
+        :param factory: 创建 WebDriver 的同步函数（默认 create_edge_driver）
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self.performance_log = performance_log
+        self.factory = factory or (lambda: create_edge_driver(burp_proxy, headless, performance_log))
+        self.created = 0                    # 累计启动的浏览器数
+        self.recycled = 0                   # 因次数上限或健康检查失败回收的浏览器数
+        self.messages = []                  # 启动/重置失败的错误信息
+        self._idle = []
+        self._warming = 0
+        self._slots = asyncio.Semaphore(size)
+        self._cond = asyncio.Condition()
+        self._tasks = set()
+        self._closed = False
+
+    def start(self):
+        """后台预热 size 个浏览器（不阻塞服务启动，租用时等待预热完成）"""
+        for _ in range(self.size):
+            self._spawn()
+
+    def _spawn(self):
+        # 创建任务时即计入预热中（任务尚未开始执行时租用方也会等待它，而不是当场再启动一个）
+        self._warming += 1
+        task = asyncio.create_task(self._warm())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _record(self, message):
+        if len(self.messages) >= MAX_POOL_MESSAGES:
+            self.messages.pop(0)
+        self.messages.append(message)
+
+    async def _create(self):
+        driver = await asyncio.to_thread(self.factory)
+        self.created += 1
+        return PooledDriver(driver, self.performance_log)
+
+    async def _warm(self):
+        try:
+            session = await self._create()
+            if self._closed:
+                await asyncio.to_thread(session.quit)
+                return
+            self._idle.append(session)
+        except Exception as e:
+            self._record(f"浏览器预热失败：{type(e).__name__} {e}")
+        finally:
+            self._warming -= 1
+            async with self._cond:
+                self._cond.notify_all()
+
+    async def _discard(self, session, replace=True):
+        self.recycled += 1
+        await asyncio.to_thread(session.quit)
+        if replace and not self._closed:
+            self._spawn()
+
+    async def acquire(self):
+        """
+        租用一个浏览器（池满时等待归还）：优先取已预热的空闲会话并做健康检查，不可用则关闭重建
+        :return: PooledDriver
+        """
+        if self._closed:
+            raise RuntimeError("浏览器会话池已关闭")
+        await self._slots.acquire()
+        try:
+            while True:
+                async with self._cond:
+                    await self._cond.wait_for(lambda: self._idle or not self._warming)
+                    session = self._idle.pop() if self._idle else None
+                if session is None:
+                    # 没有空闲会话且没有正在预热的：当场启动一个（新启动的无需健康检查）
+                    session = await self._create()
+                    break
+                if await asyncio.to_thread(session.healthy):
+                    break
+                self._record("空闲浏览器健康检查失败，已关闭重建")
+                await self._discard(session, replace=False)
+        except BaseException:
+            self._slots.release()
+            raise
+        session.uses += 1
+        return session
+
+    async def release(self, session):
+        """归还浏览器：重置会话状态后放回空闲列表；达到次数上限或重置失败时关闭，并在后台预热替补"""
+        try:
+            if self._closed or session.uses >= self.max_uses:
+                await self._discard(session)
+                return
+            try:
+                await asyncio.to_thread(session.reset)
+            except Exception as e:
+                self._record(f"浏览器重置失败：{type(e).__name__} {e}")
+                await self._discard(session)
+                return
+            async with self._cond:
+                self._idle.append(session)
+                self._cond.notify_all()
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def lease(self):
+        session = await self.acquire()
+        try:
+            yield session
+        finally:
+            await self.release(session)
+
+    def summary(self):
+        return (f"浏览器会话池：空闲 {len(self._idle)}，预热中 {self._warming}，上限 {self.size}，"
+                f"累计启动 {self.created}，回收 {self.recycled}")
+
+    async def close(self):
+        """关闭所有空闲浏览器（租用中的浏览器归还时关闭）"""
+        self._closed = True
+        # 等待预热中的浏览器启动完成后随即关闭（启动在线程中进行，取消任务会遗留浏览器进程）
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(asyncio.to_thread(session.quit) for session in idle))
@@ -0,0 +1,396 @@
+# run.py
+# 基准测试：在合成 Burp 日志（10M / 100M / 1G）上测量两份 filter_burp_log_for_json 及完整导出流程，
+# 在本地替身服务器上测量内置目录扫描引擎及 dirsearch 子进程（未配置 dirsearch 时跳过，两者吞吐并列对比）；
+# 每个用例在独立子进程中运行（峰值内存互不影响），
+# 输出吞吐（MB/s、条/s、请求/s）、峰值 RSS 和单条延迟分位数，结果保存为 JSON，可与之前的结果对比
+# 用法：
+#     python -m benchmarks.run                          # 10M 日志 + 目录扫描
+#     python -m benchmarks.run --sizes 10M,100M,1G --compare benchmarks/results/<之前的结果>.json
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.standin import DEFAULT_TREE, StandinServer
+from config import DIRSEARCH_PATH
+from benchmarks.synthetic_log import (DEFAULT_BODY_MAX, DEFAULT_BODY_MIN, DEFAULT_JSON_RATIO, LogProfile,
+                                      ensure_burp_log, parse_hosts, parse_size)
+
+try:
+    import resource  # 可选依赖（仅类 Unix），读取峰值 RSS
+except ImportError:
+    resource = None
+
+try:
+    import psutil  # 可选依赖，Windows 上读取峰值内存
+except ImportError:
+    psutil = None
+
+# ===================== 全局配置 =====================
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+# 合成日志、字典的缓存目录及结果目录
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+# 日志筛选用例（每个日志大小各跑一次）及目录扫描用例
+LOG_CASES = ("filter_selenium", "filter_utils", "filter_export")
+SCAN_CASES = ("dir_scan_native", "dir_scan_wildcard", "dir_scan_dirsearch")
+DEFAULT_SIZES = "10M"
+# 目录扫描字典条数及并发数
+DEFAULT_WORDS = 20000
+DEFAULT_CONCURRENCY = 50
+# 对比时视为退化的幅度（百分比）
+DEFAULT_THRESHOLD = 10
+# 各用例在计时前预先导入的模块（服务模块的导入耗时不计入用例耗时）
+CASE_MODULES = {
+    "filter_selenium": ("MCPServer.Selenium", "MCPServer.burp_http"),
+    "filter_utils": ("utils.burp日志优化", "MCPServer.burp_log"),
+    "filter_export": ("MCPServer.Selenium",),
+    "dir_scan_native": ("MCPServer.dir_brute",),
+    "dir_scan_wildcard": ("MCPServer.dir_brute",),
+    "dir_scan_dirsearch": ("MCPServer.dir_scan",),
+}
+# 对比的指标：指标 → 是否越大越好
+COMPARE_METRICS = {"mb_per_s": True, "entries_per_s": True, "requests_per_s": True, "peak_rss_mb": False,
+                   "latency_p99_ms": False}
+
+
+# ===================== 测量 =====================
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB），无法获取时返回 None"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 1024 ** 2, 1)
+    return None
+
+
+def percentiles(samples):
+    """延迟分位数（毫秒）"""
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    count = len(samples)
+
+    def pick(q):
+        return round(samples[min(count - 1, int(q * count))] * 1000, 3)
+
+    return {"latency_p50_ms": pick(0.5), "latency_p90_ms": pick(0.9), "latency_p99_ms": pick(0.99),
+            "latency_max_ms": round(samples[-1] * 1000, 3)}
+
+
+def timed(iterable, samples):
+    """
+    包装输入迭代器：记录每一条从读取解析到下游处理完毕的耗时
+    （下游取下一条时记一次，间隔即上一条的 解析 + 筛选 时间）
+    """
+    last = time.perf_counter()
+    for item in iterable:
+        yield item
+        now = time.perf_counter()
+        samples.append(now - last)
+        last = now
+
+
+# ===================== 用例 =====================
+def bench_filter_selenium(log_path, samples):
+    """MCPServer/Selenium.py：流式配对 + 默认查询（filter_burp_log 的核心路径，不写导出文件）"""
+    from MCPServer.Selenium import compile_query, default_query, filter_burp_log_for_json
+    from MCPServer.burp_http import iter_exchanges
+    matches = sum(1 for _ in filter_burp_log_for_json(timed(iter_exchanges(log_path), samples),
+                                                      [compile_query(default_query())]))
+    return {"entries": len(samples), "matches": matches}
+
+
+def bench_filter_utils(log_path, samples):
+    """utils/burp日志优化.py：按条目做 URL 关键字 + Content-Type + JSON 校验"""
+    utils_filter = importlib.import_module("utils.burp日志优化")
+    from MCPServer.burp_log import iter_raw_traffic_entries
+    raw_entries = (raw for _, raw in iter_raw_traffic_entries(log_path))
+    matches = sum(1 for _ in utils_filter.filter_burp_log_for_json(timed(raw_entries, samples)))
+    return {"entries": len(samples), "matches": matches}
+
+
+def bench_filter_export(log_path, samples):
+    """完整的 filter_burp_log 流程（不用索引、不去重正文）：筛选 + 写入导出文件"""
+    from MCPServer import Selenium
+    iter_exchanges = Selenium.iter_exchanges
+    Selenium.iter_exchanges = lambda *args: timed(iter_exchanges(*args), samples)
+    with tempfile.TemporaryDirectory() as export_dir:
+        Selenium.EXPORT_DIR = export_dir + os.sep
+        results = Selenium.export_filtered_traffic(log_path, [Selenium.default_query()], use_index=False,
+                                                   dedup_bodies=False)
+    return {"entries": len(samples), "matches": results[0][2]}
+
+
+def ensure_wordlist(data_dir, words, seed=1):
+    """生成字典：随机路径 + 替身服务器的全部已知路径（打乱顺序）"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"words_{words}_{seed}.txt")
+    if not os.path.exists(path):
+        rng = random.Random(seed)
+        alphabet = "abcdefghijklmnopqrstuvwxyz0123456789-_"
+        lines = ["".join(rng.choice(alphabet) for _ in range(rng.randint(3, 12))) for _ in range(words)]
+        lines.extend(DEFAULT_TREE)
+        rng.shuffle(lines)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    return path
+
+
+def bench_dir_scan(wordlist_path, samples, concurrency, wildcard):
+    """内置目录扫描引擎对本地替身服务器（泛解析模式下检验 soft-404 过滤）"""
+    from MCPServer.dir_brute import DirBruteForcer, load_wordlist
+
+    class TimedBruteForcer(DirBruteForcer):
+        async def fetch(self, client, url):
+            started_at = time.perf_counter()
+            try:
+                return await super().fetch(client, url)
+            finally:
+                samples.append(time.perf_counter() - started_at)
+
+    # 替身服务器放在单独的进程中，不与扫描争用同一个解释器
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.standin"] + (["--wildcard"] if wildcard else []),
+                              cwd=PROJECT_ROOT, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline())
+        target_url = f"http://127.0.0.1:{port}/"
+        engine = TimedBruteForcer(concurrency)
+        stats = asyncio.run(engine.scan(target_url, load_wordlist(wordlist_path).words(), calibrate=True))
+    finally:
+        server.terminate()
+        server.wait()
+    found = sorted(finding.path for finding in stats.findings)
+    expected = StandinServer().expected_findings()
+    return {"requests": stats.requests, "errors": stats.errors, "matches": len(found), "filtered": stats.filtered,
+            "findings_correct": found == expected, "scan_elapsed": round(stats.elapsed, 3)}
+
+
+def bench_dir_scan_dirsearch(wordlist_path, concurrency):
+    """dirsearch 子进程（dir_scan 的默认引擎）对同一个替身服务器，字典和并发数与内置引擎相同"""
+    from MCPServer.dir_scan import run_dirsearch
+
+    # dirsearch 本身就是子进程，替身服务器放在本进程的后台线程中，请求数按服务器实际收到的计算
+    with StandinServer() as server:
+        started_at = time.perf_counter()
+        returncode, parser = asyncio.run(run_dirsearch(server.url, timeout=None,
+                                                       extra_args=["-w", wordlist_path, "-t", str(concurrency)]))
+        scan_elapsed = time.perf_counter() - started_at
+        requests = server.requests
+        expected = server.expected_findings()
+    found = sorted(finding.path.strip("/") for finding in parser.findings)
+    return {"returncode": returncode, "requests": requests, "matches": len(found),
+            "findings_correct": found == expected, "scan_elapsed": round(scan_elapsed, 3)}
+
+
+def run_case(case, args):
+    """
+    在当前进程中运行单个用例
+    :return: 结果字典
+    """
+    samples = []
+    for module in CASE_MODULES[case]:
+        importlib.import_module(module)
+    rss_before = peak_rss_mb()
+    started_at = time.perf_counter()
+    # 被测函数的进度输出转到 stderr，stdout 只输出结果 JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        if case in SCAN_CASES:
+            wordlist_path = ensure_wordlist(args.data_dir, args.words)
+            if case == "dir_scan_dirsearch":
+                result = bench_dir_scan_dirsearch(wordlist_path, args.concurrency)
+            else:
+                result = bench_dir_scan(wordlist_path, samples, args.concurrency, case == "dir_scan_wildcard")
+            input_bytes = os.path.getsize(wordlist_path)
+        else:
+            bench = {"filter_selenium": bench_filter_selenium, "filter_utils": bench_filter_utils,
+                     "filter_export": bench_filter_export}[case]
+            result = bench(args.log, samples)
+            input_bytes = os.path.getsize(args.log)
+    elapsed = time.perf_counter() - started_at
+
+    result.update(case=case, elapsed=round(elapsed, 3), input_bytes=input_bytes,
+                  rss_before_mb=rss_before, peak_rss_mb=peak_rss_mb())
+    if case in SCAN_CASES:
+        result["requests_per_s"] = round(result["requests"] / result["scan_elapsed"], 1)
+    else:
+        result["mb_per_s"] = round(input_bytes / 1024 ** 2 / elapsed, 2)
+        if "entries" in result:
+            result["entries_per_s"] = round(result["entries"] / elapsed, 1)
+    result.update(percentiles(samples))
+    return result
+
+
+def spawn_case(case, args, log_path=None):
+    """在子进程中运行用例（峰值 RSS 只包含该用例）"""
+    if case == "dir_scan_dirsearch" and not os.path.exists(DIRSEARCH_PATH):
+        return {"case": case, "skipped": f"未找到 dirsearch（config.DIRSEARCH_PATH：{DIRSEARCH_PATH}）"}
+    command = [sys.executable, "-m", "benchmarks.run", "--child", case, "--data-dir", args.data_dir,
+               "--words", str(args.words), "--concurrency", str(args.concurrency)]
+    if log_path:
+        command += ["--log", log_path]
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True, encoding="utf-8", errors="replace")
+    if completed.returncode != 0:
+        return {"case": case, "error": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+# ===================== 结果保存与对比 =====================
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown", False
+    return commit or "unknown", bool(dirty)
+
+
+def case_key(result):
+    return f"{result['case']}@{result['log_size']}" if "log_size" in result else result["case"]
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    与之前的结果逐项对比
+    :return: (对比报告行列表, 退化项数)
+    """
+    previous = {case_key(result): result for result in baseline["results"]}
+    lines = [f"对比基线：{baseline['commit']}（{baseline['timestamp']}）"]
+    regressions = 0
+    for result in current["results"]:
+        old = previous.get(case_key(result))
+        if old is None or "error" in result or "error" in old or "skipped" in result or "skipped" in old:
+            continue
+        for metric, higher_is_better in COMPARE_METRICS.items():
+            if not old.get(metric) or result.get(metric) is None:
+                continue
+            change = (result[metric] - old[metric]) / old[metric] * 100
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = "  ⚠️ 退化"
+                regressions += 1
+            lines.append(f"  {case_key(result):28} {metric:16} {old[metric]:>12} → {result[metric]:<12} "
+                         f"{change:+.1f}%{flag}")
+    return lines, regressions
+
+
+def format_result(result):
+    if "error" in result:
+        return f"  {case_key(result):28} 失败：{result['error']}"
+    if "skipped" in result:
+        return f"  {case_key(result):28} 跳过：{result['skipped']}"
+    parts = [f"{result['elapsed']:.2f}s"]
+    for metric, unit in (("mb_per_s", "MB/s"), ("entries_per_s", "条/s"), ("requests_per_s", "req/s")):
+        if metric in result:
+            parts.append(f"{result[metric]} {unit}")
+    parts.append(f"峰值 {result['peak_rss_mb']} MB")
+    if "latency_p50_ms" in result:
+        parts.append(f"p50/p99 {result['latency_p50_ms']}/{result['latency_p99_ms']} ms")
+    if "findings_correct" in result:
+        parts.append("发现结果正确" if result["findings_correct"] else "⚠️ 发现结果与预期不符")
+    return f"  {case_key(result):28} " + "，".join(parts)
+
+
+def format_engine_comparison(results):
+    """
+    同一替身服务器、同一字典下两种扫描引擎的吞吐对比
+    :return: 对比行（缺少任一引擎的结果时为 None）
+    """
+    rates = {result["case"]: result.get("requests_per_s") for result in results}
+    native, dirsearch = rates.get("dir_scan_native"), rates.get("dir_scan_dirsearch")
+    if not native or not dirsearch:
+        return None
+    return (f"目录扫描吞吐对比：native {native} req/s | dirsearch {dirsearch} req/s"
+            f"（native 为 dirsearch 的 {native / dirsearch:.1f} 倍）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志筛选与目录扫描基准测试")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="合成日志大小，逗号分隔（10M / 100M / 1G 或字节数）")
+    parser.add_argument("--cases", default=",".join(LOG_CASES + SCAN_CASES), help="运行的用例，逗号分隔")
+    parser.add_argument("--hosts", default="", help="主机分布 host=权重,...（默认见 synthetic_log.DEFAULT_HOSTS）")
+    parser.add_argument("--json-ratio", type=float, default=DEFAULT_JSON_RATIO, help="JSON 响应比例")
+    parser.add_argument("--body-min", type=int, default=DEFAULT_BODY_MIN, help="响应正文最小字节数")
+    parser.add_argument("--body-max", type=int, default=DEFAULT_BODY_MAX, help="响应正文最大字节数")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子（相同参数生成相同的日志）")
+    parser.add_argument("--words", type=int, default=DEFAULT_WORDS, help="目录扫描字典条数")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="目录扫描并发数")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="合成日志和字典的缓存目录")
+    parser.add_argument("--out-dir", default=RESULTS_DIR, help="结果 JSON 保存目录")
+    parser.add_argument("--compare", default="", help="与之前的结果 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="视为退化的幅度（百分比）")
+    parser.add_argument("--child", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--log", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child, args), ensure_ascii=False))
+        return 0
+
+    cases = [case for case in args.cases.split(",") if case]
+    unknown = set(cases) - set(LOG_CASES + SCAN_CASES)
+    if unknown:
+        parser.error(f"未知用例：{', '.join(sorted(unknown))}")
+    profile = LogProfile(parse_hosts(args.hosts) if args.hosts else None, args.json_ratio, args.body_min,
+                         args.body_max, args.seed)
+    commit, dirty = git_commit()
+    report = {"commit": commit, "dirty": dirty, "timestamp": datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+              "profile": profile.to_dict(), "results": []}
+
+    for size_text in args.sizes.split(","):
+        log_cases = [case for case in cases if case in LOG_CASES]
+        if not log_cases:
+            break
+        size = parse_size(size_text)
+        print(f"准备 {size_text} 合成日志……", flush=True)
+        log_path = ensure_burp_log(args.data_dir, size, profile)
+        for case in log_cases:
+            result = spawn_case(case, args, log_path)
+            result["log_size"] = size_text
+            report["results"].append(result)
+            print(format_result(result), flush=True)
+    for case in cases:
+        if case in SCAN_CASES:
+            result = spawn_case(case, args)
+            report["results"].append(result)
+            print(format_result(result), flush=True)
+    comparison = format_engine_comparison(report["results"])
+    if comparison:
+        print(comparison)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    out_path = os.path.join(args.out_dir, f"bench_{datetime.now():%Y%m%d_%H%M%S}_{commit}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存：{out_path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            lines, regressions = compare_results(report, json.load(f), args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"{regressions} 项指标退化超过 {args.threshold}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
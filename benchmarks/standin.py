@@ -0,0 +1,164 @@
+# standin.py
+# 本地 HTTP 替身目标：在后台线程中运行的 asyncio HTTP/1.1 服务器（支持 keep-alive），
+# 提供已知的目录结构，可选泛解析模式（不存在的路径也返回 200 兜底页），用于目录扫描基准测试
+import asyncio
+import sys
+import threading
+
+# ===================== 全局配置 =====================
+# 默认目录结构：路径 → (状态码, 正文大小, 跳转地址)
+DEFAULT_TREE = {
+    "admin": (200, 1500, None),
+    "admin/login": (200, 2200, None),
+    "api": (200, 800, None),
+    "api/v1/users": (200, 4096, None),
+    "backup.zip": (200, 10240, None),
+    "old": (301, 0, "/new/"),
+    "private": (403, 120, None),
+    "robots.txt": (200, 64, None),
+}
+# 请求头最大长度
+MAX_HEADER_SIZE = 16 * 1024
+
+
+# 泛解析兜底页的正文（与常见单页应用的兜底页相当，有足够的词供 simhash 比较）
+CATCH_ALL_TEMPLATE = (
+    "<html><head><title>Welcome</title><link rel=stylesheet href=/static/app.css></head><body>"
+    "<nav><a href=/>Home</a> <a href=/products>Products</a> <a href=/about>About us</a> "
+    "<a href=/contact>Contact</a> <a href=/login>Sign in</a></nav><div id=app><h1>Sorry</h1>"
+    "<p>The page you requested could not be found on this server. It may have been moved, renamed or "
+    "temporarily unavailable. Please check the address or return to the home page to continue browsing "
+    "our catalogue, latest news and customer support resources.</p><p>Requested: {path}</p></div>"
+    "<footer>Copyright 2024 Example Corporation. All rights reserved. Privacy policy and terms of service "
+    "apply to all visitors.</footer><script src=/static/app.js></script></body></html>"
+)
+
+
+def catch_all_page(path):
+    """泛解析兜底页：正文大体相同，但回显请求路径（长度随路径变化，检验 soft-404 过滤）"""
+    return CATCH_ALL_TEMPLATE.format(path=path[:200]).encode("utf-8", errors="ignore")
+
+
+class StandinServer:
+    """
+    替身服务器
+    用法：
+        with StandinServer(wildcard=True) as server:
+            run_scan(server.url, ...)
+    """
+
+    def __init__(self, tree=None, wildcard=False, host="127.0.0.1", port=0, delay=0.0):
+        """
+        :param tree: 目录结构（默认 DEFAULT_TREE）
+        :param wildcard: 是否泛解析：不存在的路径返回 200 兜底页而不是 404
+        :param port: 监听端口（0 表示自动分配）
+        :param delay: 每个响应的延迟（秒），用于观察客户端的并发上限
+        """
+        self.tree = {path.strip("/"): value for path, value in (tree or DEFAULT_TREE).items()}
+        self.wildcard = wildcard
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.requests = 0
+        # 正在处理的请求数及其峰值
+        self.active = 0
+        self.peak_active = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def expected_findings(self, include_status=(200,)):
+        """字典覆盖全部已知路径时应发现的路径（泛解析兜底页应被过滤掉）"""
+        return sorted(path for path, (status, _, _) in self.tree.items() if status in include_status)
+
+    def respond(self, path):
+        """
+        :return: (状态码, 正文, 跳转地址)
+        """
+        key = path.split("?", 1)[0].strip("/")
+        entry = self.tree.get(key)
+        if entry is not None:
+            status, size, location = entry
+            return status, b"a" * size, location
+        if self.wildcard:
+            return 200, catch_all_page(path), None
+        return 404, b"Not Found", None
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.split()
+                path = parts[1].decode("utf-8", errors="ignore") if len(parts) > 1 else "/"
+                header_size = 0
+                while True:
+                    header = await reader.readline()
+                    header_size += len(header)
+                    if header in (b"\r\n", b"\n", b"") or header_size > MAX_HEADER_SIZE:
+                        break
+                self.requests += 1
+                self.active += 1
+                self.peak_active = max(self.peak_active, self.active)
+                try:
+                    if self.delay:
+                        await asyncio.sleep(self.delay)
+                finally:
+                    self.active -= 1
+                status, body, location = self.respond(path)
+                head = f"HTTP/1.1 {status} Standin\r\nContent-Type: text/html\r\nContent-Length: {len(body)}\r\n"
+                if location:
+                    head += f"Location: {location}\r\n"
+                writer.write(head.encode("ascii") + b"\r\n" + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port,
+                                                                          backlog=1024))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ===================== 程序入口（基准测试在子进程中启动）=====================
+if __name__ == "__main__":
+    # 用法：python -m benchmarks.standin [--wildcard] [端口]，启动后在第一行输出实际端口
+    argv = [arg for arg in sys.argv[1:] if arg != "--wildcard"]
+    server = StandinServer(wildcard="--wildcard" in sys.argv, port=int(argv[0]) if argv else 0).start()
+    print(server.port, flush=True)
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
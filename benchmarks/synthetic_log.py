@@ -0,0 +1,139 @@
+# synthetic_log.py
+# 合成 Burp 日志：按指定大小生成与 Burp 自动保存格式一致的流量日志（元信息、请求、响应三段），
+# 主机分布、JSON 响应比例和正文大小可配置，相同参数生成的文件完全相同（固定随机种子），供基准测试复用
+import hashlib
+import json
+import os
+import random
+
+from MCPServer.burp_log import TRAFFIC_SEPARATOR
+
+# ===================== 全局配置 =====================
+# 预设大小（基准测试命令行中的 10M / 100M / 1G）
+SIZE_PRESETS = {"10M": 10 * 1024 ** 2, "100M": 100 * 1024 ** 2, "1G": 1024 ** 3}
+# 默认主机分布（主机 → 权重），第一个为 Selenium.TARGET_URL_KEYWORD，默认查询按它筛选
+DEFAULT_HOSTS = {"dipp.sf-express.com": 3, "eva2.csdn.net": 2, "static.example.com": 4, "api.example.org": 1}
+# 默认 JSON 响应比例及正文大小范围（字节）
+DEFAULT_JSON_RATIO = 0.5
+DEFAULT_BODY_MIN = 200
+DEFAULT_BODY_MAX = 4096
+# 生成时的写入缓冲（条数）
+WRITE_BATCH = 1000
+
+
+class LogProfile:
+    """合成日志的流量特征"""
+    __slots__ = ("hosts", "json_ratio", "body_min", "body_max", "seed")
+
+    def __init__(self, hosts=None, json_ratio=DEFAULT_JSON_RATIO, body_min=DEFAULT_BODY_MIN,
+                 body_max=DEFAULT_BODY_MAX, seed=1):
+        self.hosts = dict(hosts or DEFAULT_HOSTS)
+        self.json_ratio = json_ratio
+        self.body_min = body_min
+        self.body_max = body_max
+        self.seed = seed
+
+    def to_dict(self):
+        return {"hosts": self.hosts, "json_ratio": self.json_ratio, "body_min": self.body_min,
+                "body_max": self.body_max, "seed": self.seed}
+
+    def fingerprint(self):
+        """特征指纹（缓存文件名使用，特征变化时重新生成）"""
+        return hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def parse_size(text):
+    """解析大小：预设名（10M / 100M / 1G）或字节数"""
+    return SIZE_PRESETS.get(text.upper(), None) or int(text)
+
+
+def parse_hosts(text):
+    """解析主机分布：host=权重,host=权重（权重省略时为 1）"""
+    hosts = {}
+    for part in text.split(","):
+        host, _, weight = part.strip().partition("=")
+        if host:
+            hosts[host] = float(weight or 1)
+    return hosts
+
+
+def _json_body(rng, index, size):
+    # 直接拼接文本（生成 1G 日志时逐个 json.dumps 太慢），结构为 {"code":0,...,"data":{"list":[...]}}
+    head = f'{{"code":0,"message":"success","requestId":"{index:08x}","data":{{"list":['.encode("utf-8")
+    items = []
+    length = len(head) + 4
+    while length < size:
+        item = f'{{"id":{rng.randrange(10 ** 6)},"name":"{"测试" * rng.randint(1, 8)}","value":{index}}}'
+        items.append(item)
+        length += len(item.encode("utf-8")) + 1
+    return head + ",".join(items).encode("utf-8") + b"]}}"
+
+
+def _html_body(rng, size):
+    row = b"<div class=\"row\">lorem ipsum dolor sit amet</div>\n"
+    return b"<html><body>\n" + row * max(0, (size - 28) // len(row)) + b"</body></html>"
+
+
+def build_entry(rng, index, profile, hosts, weights):
+    """
+    生成一条流量（元信息 + 请求 + 响应）
+    :return: 字节
+    """
+    host = rng.choices(hosts, weights)[0]
+    method = "POST" if rng.random() < 0.3 else "GET"
+    is_json = rng.random() < profile.json_ratio
+    size = rng.randint(profile.body_min, profile.body_max)
+    path = f"/api/v{index % 3}/item/{index}" if is_json else f"/page/{index % 500}.html"
+    if is_json:
+        body, content_type = _json_body(rng, index, size), "application/json;charset=UTF-8"
+    else:
+        body, content_type = _html_body(rng, size), "text/html; charset=utf-8"
+    request_body = b'{"page":1,"size":20}' if method == "POST" else b""
+    request = (f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: Mozilla/5.0\r\n"
+               f"Accept: */*\r\nCookie: session={index:016x}\r\n"
+               + (f"Content-Type: application/json\r\nContent-Length: {len(request_body)}\r\n" if request_body
+                  else "")
+               + "\r\n").encode("ascii") + request_body
+    status = rng.choices((200, 304, 404, 500), (90, 4, 5, 1))[0]
+    response = (f"HTTP/1.1 {status} OK\r\nServer: nginx\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode("ascii") + body
+    sep = TRAFFIC_SEPARATOR.encode("ascii")
+    meta = f"{index // 3600 % 24:02d}:{index // 60 % 60:02d}:{index % 60:02d}  https://{host}:443  [10.0.0.1]"
+    return (sep + b"\r\n" + meta.encode("ascii") + b"\r\n" + sep + b"\r\n" + request + b"\r\n\r\n" + sep
+            + b"\r\n" + response + b"\r\n" + sep + b"\r\n\r\n\r\n\r\n")
+
+
+def generate_burp_log(path, size, profile=None):
+    """
+    生成不小于 size 字节的合成日志（写满最后一条为止）
+    :return: (文件大小, 流量条数)
+    """
+    profile = profile or LogProfile()
+    rng = random.Random(profile.seed)
+    hosts, weights = list(profile.hosts), list(profile.hosts.values())
+    written = count = 0
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        while written < size:
+            batch = []
+            for _ in range(WRITE_BATCH):
+                batch.append(build_entry(rng, count, profile, hosts, weights))
+                count += 1
+            data = b"".join(batch)
+            f.write(data)
+            written += len(data)
+    os.replace(temp_path, path)
+    return written, count
+
+
+def ensure_burp_log(data_dir, size, profile=None):
+    """
+    取得指定大小和特征的合成日志（已生成过的直接复用）
+    :return: 日志文件路径
+    """
+    profile = profile or LogProfile()
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"burp_{size}_{profile.fingerprint()}.log")
+    if not os.path.exists(path):
+        generate_burp_log(path, size, profile)
+    return path
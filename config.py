@@ -7,6 +7,41 @@ PYTHON_EXECUTABLE_PATH = r'C:\Users\Lenovo\AppData\Local\Programs\Python\Python3
 # dirsearch.py 绝对路径git remote set-url origin https://github.com/your-username/new-repo-name.git
 DIRSEARCH_PATH = r"D:\gongju\Rabbit_Treasure_Box_v1.0\toosl\Information_collection\directory_scan\dirsearch-0.4.3\dirsearch-0.4.3\dirsearch.py"
 
+# 内置目录扫描引擎（dir_scan engine=native）使用的字典，默认复用 dirsearch 自带字典
+DIRSEARCH_WORDLIST_PATH = r"D:\gongju\Rabbit_Treasure_Box_v1.0\toosl\Information_collection\directory_scan\dirsearch-0.4.3\dirsearch-0.4.3\db\dicc.txt"
+# 字典中 %EXT% 占位符展开的扩展名（两种引擎共用：dirsearch 以 -e 传入，与其默认扩展名一致）
+DIRSEARCH_EXTENSIONS = ("php", "aspx", "jsp", "html", "js")
+
 SELENIUM_PATH = r"C:\Users\Lenovo\Desktop\mcp\mcp-server-demo\MCPServer\msedgedriver.exe"
 
-BURP_LOG_PATH  = r"C:\Users\Lenovo\Desktop\mcp\mcp-server-demo\MCPServer\log.txt"
\ No newline at end of file
+# 浏览器是否无界面运行（无桌面的 Linux 上测试会话池时设为 True）
+WEBDRIVER_HEADLESS = False
+
+# selenium_automation 的抓包方式：burp（浏览器走 Burp 代理，从 BURP_LOG_PATH 读取流量）
+# 或 devtools（浏览器直连，通过 DevTools 网络事件在内存中抓包，无需 Burp）
+CAPTURE_BACKEND = "burp"
+
+BURP_LOG_PATH  = r"C:\Users\Lenovo\Desktop\mcp\mcp-server-demo\MCPServer\log.txt"
+
+# 目录扫描断点（dir_scan / dir_scan_batch 的 resume 选项）保存位置
+SCAN_CHECKPOINT_PATH = r"C:\Users\Lenovo\Desktop\mcp\mcp-server-demo\MCPServer\scan_checkpoints.db"
+# 工具结果缓存（dir_scan / dir_scan_batch / filter_burp_log 的重复调用直接返回，见 MCPServer/result_cache.py）
+# 保存位置（留空则只缓存在内存中，服务重启后失效）、有效期（秒）、条数上限、总大小上限（字节）
+RESULT_CACHE_PATH = r"C:\Users\Lenovo\Desktop\mcp\mcp-server-demo\MCPServer\result_cache.db"
+RESULT_CACHE_TTL = 600
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# 响应正文库（按内容哈希去重保存导出流量中的响应正文）
+BODY_STORE_DIR = r"C:\Users\Lenovo\Desktop\mcp\mcp-server-demo\MCPServer\body_store"
+# 正文库总大小上限（字节），超出时按最近使用时间淘汰最久未用的正文
+BODY_STORE_MAX_BYTES = 1024 * 1024 * 1024
+
+# 服务启动时注册的工具模块（可选：dir_scan / jobs / results / metrics / selenium，见 MCPServer/plugins.py）
+ENABLED_TOOL_PLUGINS = ("dir_scan", "jobs", "results", "metrics")
+# 冷启动导入耗时预算（毫秒，python -m MCPServer.plugins 检查；0 表示不检查）
+STARTUP_BUDGET_MS = 1500
+
+# 工具指标的 HTTP 端点路径（Prometheus 抓取地址：http://服务地址:端口/metrics，见 MCPServer/metrics.py）
+METRICS_PATH = "/metrics"
+# 启动时是否对全部工具开启 cProfile 采样（运行中可用 set_tool_profiling 工具切换）
+TOOL_PROFILING = False
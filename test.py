@@ -11,12 +11,15 @@ import os
 
 # 后续导入语句不变（此时就能正常找到 MCP-tool 包了）
 from mcp.server.fastmcp import FastMCP
-# 注意：目录名是 MCP-tool，导入时可以直接用连字符，也可以用下划线，两种都支持
-from MCPServer.dir_scan import register_dir_scan_tool
+# 工具模块按 config.ENABLED_TOOL_PLUGINS 注册，重量级依赖在首次调用工具时才导入（见 MCPServer/plugins.py）
+from MCPServer.plugins import register_plugins
+# 工具指标：之后注册的所有工具自动记录调用次数、耗时、字节数和错误（见 MCPServer/metrics.py）
+from MCPServer.metrics import instrument_tools
 
 
 # Create an MCP server
 mcp = FastMCP("Demo", json_response=True)
+instrument_tools(mcp)
 
 # Add an addition tool
 @mcp.tool()
@@ -30,8 +33,8 @@ def say_hello(a: str) -> str:
     """Add one sentence"""
     return "Hello " + a
 
-# 注册外部的目录扫描工具（关键：将mcp实例传入，完成工具注册）
-register_dir_scan_tool(mcp)
+# 注册外部工具模块（默认：目录扫描 + 后台任务查询/取消 + 结果分页 + 工具指标，关键：将mcp实例传入，完成工具注册）
+register_plugins(mcp)
 
 # Add a dynamic greeting resource
 @mcp.resource("greeting://{name}")
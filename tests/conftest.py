@@ -0,0 +1,8 @@
+# conftest.py
+# 测试从项目根目录导入 config / MCPServer / benchmarks（项目没有打包安装，与 test.py 启动服务时的导入方式一致）
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,113 @@
+# test_burp_http.py
+# Burp日志结构化解析：按位置配对请求与响应（缺响应、连续请求、末尾条目被截断、正文含分隔符片段和空行）
+import pytest
+
+from MCPServer.burp_http import iter_exchanges, parse_message
+from MCPServer.burp_log import CHUNK_SIZE, TRAFFIC_SEPARATOR
+
+SEP = TRAFFIC_SEPARATOR.encode("ascii")
+
+
+def meta(host):
+    return f"12:00:00  https://{host}:443  [10.0.0.1]".encode("ascii")
+
+
+def request(method, path, host=None):
+    head = f"{method} {path} HTTP/1.1\r\n" + (f"Host: {host}\r\n" if host else "") + "Accept: */*\r\n\r\n"
+    return head.encode("ascii")
+
+
+def response(status, body=b"", content_type="application/json"):
+    return (f"HTTP/1.1 {status} OK\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode("ascii") + body
+
+
+def write_log(tmp_path, entries, tail=b"\r\n\r\n"):
+    """按 Burp 自动保存格式写出：每个条目前后都是分隔符"""
+    data = b"".join(SEP + b"\r\n" + entry + b"\r\n" for entry in entries) + SEP + tail
+    path = tmp_path / "burp.log"
+    path.write_bytes(data)
+    return str(path)
+
+
+def pairs(path, chunk_size=CHUNK_SIZE):
+    return [(exchange.request.method, exchange.request.url,
+             exchange.response.status if exchange.response else None)
+            for exchange in iter_exchanges(path, chunk_size=chunk_size)]
+
+
+@pytest.fixture(params=[7, CHUNK_SIZE], ids=["tiny_chunks", "default_chunks"])
+def chunk_size(request):
+    return request.param
+
+
+def test_request_without_response(tmp_path, chunk_size):
+    path = write_log(tmp_path, [
+        meta("a.example.com"), request("GET", "/lost", "a.example.com"),
+        meta("a.example.com"), request("GET", "/ok", "a.example.com"), response(200, b"{}"),
+    ])
+    assert pairs(path, chunk_size) == [("GET", "https://a.example.com/lost", None),
+                                       ("GET", "https://a.example.com/ok", 200)]
+
+
+def test_consecutive_requests(tmp_path, chunk_size):
+    # 两条请求连续出现：前一条没有响应，响应归属于最近的一条
+    path = write_log(tmp_path, [
+        meta("a.example.com"), request("POST", "/first", "a.example.com"),
+        request("GET", "/second", "a.example.com"), response(404),
+        response(500),
+    ])
+    assert pairs(path, chunk_size) == [("POST", "https://a.example.com/first", None),
+                                       ("GET", "https://a.example.com/second", 404)]
+
+
+def test_meta_line_supplies_scheme_and_host(tmp_path, chunk_size):
+    # HTTP/2 请求没有 Host 头：按元信息行补上（去掉端口）
+    path = write_log(tmp_path, [meta("h2.example.com"), request("GET", "/x"), response(200)])
+    exchange, = iter_exchanges(path, chunk_size=chunk_size)
+    assert exchange.request.host == "h2.example.com" and exchange.request.scheme == "https"
+    assert exchange.request.url == "https://h2.example.com/x"
+
+
+def test_truncated_final_entry(tmp_path, chunk_size):
+    # 日志末尾的响应写到一半：仍与前面的请求配对，正文只有已写出的部分
+    data = (SEP + b"\r\n" + meta("a.example.com") + b"\r\n" + SEP + b"\r\n" + request("GET", "/a", "a.example.com")
+            + b"\r\n" + SEP + b"\r\n" + response(200, b"{}") + b"\r\n" + SEP + b"\r\n"
+            + request("GET", "/b", "a.example.com") + b"\r\n" + SEP + b"\r\n" + b'HTTP/1.1 200 OK\r\nContent-Ty')
+    path = tmp_path / "burp.log"
+    path.write_bytes(data)
+    exchanges = list(iter_exchanges(str(path), chunk_size=chunk_size))
+    assert [(exchange.request.path, exchange.response.status) for exchange in exchanges] == [("/a", 200), ("/b", 200)]
+    assert exchanges[1].response.body == b""
+    assert exchanges[1].response.headers == {}
+
+
+def test_truncated_final_request(tmp_path, chunk_size):
+    data = (SEP + b"\r\n" + request("GET", "/a", "a.example.com") + b"\r\n" + SEP + b"\r\n" + response(200)
+            + b"\r\n" + SEP + b"\r\nGET /b HT")
+    path = tmp_path / "burp.log"
+    path.write_bytes(data)
+    # 不完整的请求行无法识别，不产生新的交互
+    assert pairs(str(path), chunk_size) == [("GET", "http://a.example.com/a", 200)]
+
+
+def test_body_with_separator_fragments_and_blank_lines(tmp_path, chunk_size):
+    body = b'{"note": "======\r\n\r\n======"}\r\n\r\n' + b"=" * (len(SEP) - 1) + b"\r\n\r\ntail"
+    path = write_log(tmp_path, [
+        meta("a.example.com"), request("POST", "/upload", "a.example.com"), response(200, body),
+        meta("a.example.com"), request("GET", "/next", "a.example.com"), response(204),
+    ])
+    exchanges = list(iter_exchanges(path, chunk_size=chunk_size))
+    assert pairs(path, chunk_size) == [("POST", "https://a.example.com/upload", 200),
+                                       ("GET", "https://a.example.com/next", 204)]
+    # 正文从头部之后的第一个空行开始，其中的空行和等号片段原样保留（条目末尾的换行由分隔符格式带入）
+    assert exchanges[0].response.body == body + b"\r\n"
+    assert exchanges[0].response.content_type == "application/json"
+
+
+def test_parse_message_kinds():
+    assert parse_message(b"\r\n" + request("GET", "/p?q=1", "h")).kind == "request"
+    message = parse_message(response(302))
+    assert message.kind == "response" and message.status == 302
+    assert parse_message(meta("h")).host == "h:443"
+    assert parse_message(b"garbage").kind == "other"
@@ -0,0 +1,60 @@
+# test_burp_index.py
+# Burp日志旁路索引：分批写入、增量追加及日志被替换时的重建，结果应与全量流式配对一致
+import sqlite3
+
+import pytest
+
+from benchmarks.synthetic_log import generate_burp_log
+from MCPServer import burp_index
+from MCPServer.burp_http import iter_exchanges
+from MCPServer.burp_index import BurpLogIndex
+
+
+def signature(exchanges):
+    return [(exchange.request.method, exchange.request.url, exchange.request.raw,
+             exchange.response.raw if exchange.response else None) for exchange in exchanges]
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    # 小批次，保证一次 update 跨越多个批次
+    monkeypatch.setattr(burp_index, "INDEX_BATCH_ROWS", 7)
+    path = str(tmp_path / "burp.log")
+    generate_burp_log(path, 200 * 1024)
+    return path
+
+
+def test_batched_index_matches_streaming(log_file):
+    with BurpLogIndex(log_file) as index:
+        added = index.update()
+        assert added == index.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        assert index.update() == 0
+        assert signature(index.iter_exchanges()) == signature(iter_exchanges(log_file))
+
+
+def test_incremental_append(log_file, tmp_path):
+    with open(log_file, "rb") as f:
+        data = f.read()
+    half = data.rfind(b"\r\n\r\n\r\n\r\n", 0, len(data) // 2) + 8
+    with open(log_file, "wb") as f:
+        f.write(data[:half])
+    with BurpLogIndex(log_file) as index:
+        index.update()
+        with open(log_file, "ab") as f:
+            f.write(data[half:])
+        assert index.update() > 0
+        assert signature(index.iter_exchanges()) == signature(iter_exchanges(log_file))
+
+
+def test_reset_is_committed(log_file):
+    with BurpLogIndex(log_file) as index:
+        index.update()
+    # 日志被清空：重建后的空索引须已提交，其他连接能看到
+    open(log_file, "wb").close()
+    with BurpLogIndex(log_file) as index:
+        assert index.update() == 0
+        assert not index.conn.in_transaction
+    conn = sqlite3.connect(log_file + burp_index.INDEX_SUFFIX)
+    assert conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0
+    assert conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0] == burp_index.INDEX_VERSION
+    conn.close()
@@ -0,0 +1,34 @@
+# test_burp_log.py
+# 分块切分：任意块大小下的切分结果与 content.split(分隔符) 一致，条目远大于块大小时同样正确
+import io
+
+import pytest
+
+from MCPServer.burp_log import TRAFFIC_SEPARATOR_BYTES, iter_raw_entries
+
+SEP = TRAFFIC_SEPARATOR_BYTES
+SAMPLES = [
+    b"",
+    SEP,
+    b"head" + SEP + b"body\r\n" + SEP,
+    SEP + b"=" * 10 + SEP + SEP + b"x" * 5000 + SEP + b"partial tail",
+    b"=" * (len(SEP) * 2 + 3) + b"\n" + SEP[:-1],
+]
+
+
+@pytest.mark.parametrize("data", SAMPLES)
+@pytest.mark.parametrize("chunk_size", [1, 7, len(SEP), 4096])
+def test_split_matches_bytes_split(data, chunk_size):
+    entries = list(iter_raw_entries(io.BytesIO(data), chunk_size=chunk_size))
+    assert [raw for _, raw in entries] == data.split(SEP)
+    assert all(type(raw) is bytes for _, raw in entries)
+    # 偏移指向各片段在文件中的起始位置
+    assert all(data[offset:offset + len(raw)] == raw for offset, raw in entries)
+
+
+def test_range_and_tail():
+    data = SEP + b"a" * 3000 + SEP + b"b" * 3000 + SEP + b"unfinished"
+    entries = list(iter_raw_entries(io.BytesIO(data), start=len(SEP), chunk_size=64, include_tail=False))
+    assert [raw for _, raw in entries] == [b"a" * 3000, b"b" * 3000]
+    end = len(SEP) * 2 + 3000
+    assert [raw for _, raw in iter_raw_entries(io.BytesIO(data), end=end, chunk_size=64)] == [b"", b"a" * 3000, b""]
@@ -0,0 +1,58 @@
+# test_burp_parallel.py
+# 多进程并行筛选：调低并行阈值，让切分点落在条目中间，结果须与串行全量筛选完全一致
+import os
+
+import pytest
+
+from benchmarks.synthetic_log import generate_burp_log
+from MCPServer import burp_parallel
+from MCPServer.burp_http import iter_exchanges
+from MCPServer.burp_log import iter_raw_traffic_entries
+from MCPServer.burp_parallel import RANGES_PER_WORKER, iter_range_exchanges, split_log_ranges
+from MCPServer.burp_query import compile_query
+from MCPServer.Selenium import filter_burp_log_for_json, filter_burp_log_parallel
+
+WORKERS = 2
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = str(tmp_path / "burp.log")
+    generate_burp_log(path, 300 * 1024)
+    return path
+
+
+def exchange_keys(exchanges):
+    return [(exchange.request.offset, exchange.request.url,
+             exchange.response.offset if exchange.response else None) for exchange in exchanges]
+
+
+def result_keys(results):
+    return [(hits, key) for (hits, _), key in zip(results, exchange_keys(exchange for _, exchange in results))]
+
+
+def test_range_targets_fall_inside_entries(log_file):
+    # 按字节等分的目标位置都不在条目起点：切分须向后找到下一个分隔符
+    size = os.path.getsize(log_file)
+    parts = WORKERS * RANGES_PER_WORKER
+    entry_starts = {offset for offset, _ in iter_raw_traffic_entries(log_file, 0)}
+    targets = [size * k // parts for k in range(1, parts)]
+    assert not entry_starts.intersection(targets)
+    ranges = split_log_ranges(log_file, parts)
+    assert len(ranges) == parts and ranges[0][0] == 0 and ranges[-1][1] == size
+    assert all(start in entry_starts for start, _ in ranges[1:])
+
+
+def test_range_exchanges_match_serial(log_file):
+    ranges = split_log_ranges(log_file, 16)
+    merged = [exchange for start, end in ranges for exchange in iter_range_exchanges(log_file, start, end)]
+    assert exchange_keys(merged) == exchange_keys(iter_exchanges(log_file))
+
+
+def test_parallel_filter_matches_serial(log_file, monkeypatch):
+    monkeypatch.setattr(burp_parallel, "MIN_PARALLEL_SIZE", 0)
+    queries = [compile_query(text) for text in ["status:2xx type:json", "host:api.example.org", "NOT type:json"]]
+    serial = list(filter_burp_log_for_json(iter_exchanges(log_file), queries))
+    parallel = list(filter_burp_log_parallel(log_file, queries, WORKERS))
+    assert serial and result_keys(parallel) == result_keys(serial)
+    assert [exchange.response.body for _, exchange in parallel] == [exchange.response.body for _, exchange in serial]
@@ -0,0 +1,41 @@
+# test_burp_query.py
+# 查询语言：未知字段报错；size 条件可由旁路索引中的正文大小判断，无需读取正文
+import pytest
+
+from benchmarks.synthetic_log import generate_burp_log
+from MCPServer.burp_http import iter_exchanges
+from MCPServer.burp_index import BurpLogIndex
+from MCPServer.burp_query import QuerySyntaxError, compile_query
+
+
+@pytest.mark.parametrize("text", ["stauts:200", "host:example.com Tpye:json", "NOT bdy:token"])
+def test_unknown_field_is_an_error(text):
+    with pytest.raises(QuerySyntaxError, match="未知字段"):
+        compile_query(text)
+
+
+@pytest.mark.parametrize("text", ["https://example.com/api", '"localhost:8080"', "example.com:8080"])
+def test_keywords_with_colons(text):
+    assert compile_query(text).root is not None
+
+
+def test_size_is_answered_from_index(tmp_path):
+    path = str(tmp_path / "burp.log")
+    generate_burp_log(path, 100 * 1024)
+    query = compile_query("size:>1k status:2xx")
+    assert not query.needs_body
+
+    expected = [exchange.request.url for exchange in iter_exchanges(path) if query.match(exchange)]
+    prematched = []
+
+    def prematch(exchange):
+        result = query.prematch(exchange)
+        prematched.append(result)
+        return result
+
+    with BurpLogIndex(path) as index:
+        index.update()
+        found = [exchange.request.url for exchange in index.iter_exchanges(prematch) if query.match(exchange)]
+    assert found and found == expected
+    # 预判已能确定结果：读取原始字节的条目全部命中
+    assert prematched.count(True) == len(expected)
@@ -0,0 +1,113 @@
+# test_devtools_capture.py
+# DevTools 抓包：用返回性能日志事件的假 WebDriver 验证请求/响应组装、查询预判和正文获取
+import base64
+import json
+
+from MCPServer.burp_query import compile_query
+from MCPServer.devtools_capture import DevToolsCapture
+
+
+class FakeDriver:
+    """get_log 依次返回预置的性能日志批次，execute_cdp_cmd 按 requestId 返回正文"""
+
+    def __init__(self, batches, bodies):
+        self.batches = list(batches)
+        self.bodies = bodies
+        self.fetched = []
+
+    def get_log(self, kind):
+        assert kind == "performance"
+        return self.batches.pop(0) if self.batches else []
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert cmd == "Network.getResponseBody"
+        request_id = params["requestId"]
+        self.fetched.append(request_id)
+        if request_id not in self.bodies:
+            raise RuntimeError("No resource with given identifier found")
+        return self.bodies[request_id]
+
+
+def event(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+def request_sent(request_id, url, method="GET", **extra):
+    return event("Network.requestWillBeSent", requestId=request_id,
+                 request=dict({"url": url, "method": method, "headers": {"Accept": "*/*"}}, **extra))
+
+
+def response_received(request_id, status, content_type):
+    return event("Network.responseReceived", requestId=request_id,
+                 response={"status": status, "statusText": "OK", "headers": {"Content-Type": content_type}})
+
+
+def finished(request_id):
+    return event("Network.loadingFinished", requestId=request_id)
+
+
+def exchange_log(request_id, url, status, content_type, method="GET", **extra):
+    return [request_sent(request_id, url, method, **extra), response_received(request_id, status, content_type),
+            finished(request_id)]
+
+
+def test_prematch_limits_body_fetch():
+    batches = [
+        # 创建时丢弃的积压事件
+        exchange_log("0", "https://app.example.com/old", 200, "application/json"),
+        exchange_log("1", "https://app.example.com/api/users?page=2", 200, "application/json")
+        + exchange_log("2", "https://app.example.com/static/logo.png", 200, "image/png")
+        + exchange_log("3", "https://other.example.org/api/users", 200, "application/json")
+        + exchange_log("4", "https://app.example.com/api/login", 200, "application/json", "POST",
+                       postData='{"user": "a"}'),
+        [event("Page.frameNavigated", frameId="f")],
+    ]
+    bodies = {"1": {"body": '{"data": [1]}', "base64Encoded": False},
+              "4": {"body": base64.b64encode(b'{"token": "t"}').decode(), "base64Encoded": True}}
+    driver = FakeDriver(batches, bodies)
+    query = compile_query("host:app.example.com path:/api/* type:json has:data")
+    capture = DevToolsCapture(driver, query.prematch)
+
+    exchanges = capture.poll()
+    assert capture.offset == 12
+    assert [exchange.request.url for exchange in exchanges] == [
+        "https://app.example.com/api/users?page=2", "https://app.example.com/static/logo.png",
+        "https://other.example.org/api/users", "https://app.example.com/api/login"]
+    # 头部已确定不命中的响应不取正文
+    assert driver.fetched == ["1", "4"]
+    assert exchanges[0].request.path == "/api/users?page=2" and exchanges[0].request.host == "app.example.com"
+    assert exchanges[0].response.body == b'{"data": [1]}'
+    assert exchanges[3].request.body == b'{"user": "a"}' and exchanges[3].response.body == b'{"token": "t"}'
+    assert [query.match(exchange) for exchange in exchanges] == [True, False, False, False]
+    assert capture.poll() == []
+
+
+def test_redirect_failure_and_flush():
+    batches = [
+        [],
+        [request_sent("1", "https://app.example.com/a"),
+         event("Network.requestWillBeSent", requestId="1",
+               request={"url": "https://app.example.com/b", "method": "GET", "headers": {}},
+               redirectResponse={"status": 302, "headers": {"Location": "/b"}}),
+         request_sent("2", "https://app.example.com/broken"),
+         event("Network.loadingFailed", requestId="2"),
+         request_sent("3", "data:image/png;base64,AAAA"),
+         response_received("1", 200, "application/json")],
+    ]
+    driver = FakeDriver(batches, {})
+    capture = DevToolsCapture(driver)
+
+    exchanges = capture.poll()
+    assert [(exchange.request.url, exchange.response and exchange.response.status) for exchange in exchanges] == [
+        ("https://app.example.com/a", 302), ("https://app.example.com/broken", None)]
+    # 未完成的请求在结束时输出（已收到响应头的不含正文）
+    pending = capture.flush()
+    assert len(pending) == 1 and pending[0].request.url == "https://app.example.com/b"
+    assert pending[0].response.status == 200 and pending[0].response.body == b""
+    assert driver.fetched == [] and capture.flush() == []
+
+
+def test_missing_body_is_empty():
+    driver = FakeDriver([[], exchange_log("1", "https://app.example.com/api/gone", 200, "application/json")], {})
+    exchanges = DevToolsCapture(driver).poll()
+    assert driver.fetched == ["1"] and exchanges[0].response.body == b""
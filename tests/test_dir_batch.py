@@ -0,0 +1,78 @@
+# test_dir_batch.py
+# 批量目录扫描：同一主机下的多个目标对替身服务器（benchmarks/standin.py）扫描，
+# 服务器观察到的并发峰值不超过全局在途上限 / 单目标 worker 数，同一主机的请求速率受令牌桶限制
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.standin import StandinServer
+from MCPServer import dir_batch
+from MCPServer.dir_batch import TokenBucket, run_batch_scan
+from MCPServer.scan_checkpoint import open_checkpoint_store
+
+WORDS = [f"missing{idx}" for idx in range(20)] + ["admin", "robots.txt"]
+TARGET_PATHS = ["", "app1/", "app2/"]
+
+
+@pytest.fixture
+def wordlist_path(tmp_path):
+    path = tmp_path / "dicc.txt"
+    path.write_text("\n".join(WORDS), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoints.db")
+    monkeypatch.setattr(dir_batch, "open_checkpoint_store", lambda: open_checkpoint_store(path))
+    return path
+
+
+def batch_scan(server, wordlist_path, **kwargs):
+    targets = [server.url + path for path in TARGET_PATHS]
+    return asyncio.run(run_batch_scan(targets, wordlist_path, calibrate=False, extensions=(), **kwargs))
+
+
+def test_max_inflight_caps_server_concurrency(wordlist_path):
+    with StandinServer(delay=0.02) as server:
+        report = batch_scan(server, wordlist_path, max_inflight=4, host_concurrency=5, host_rate=0)
+        peak = server.peak_active
+    assert report["total_requests"] == len(WORDS) * len(TARGET_PATHS)
+    assert 1 < peak <= 4
+    # 只有根目录下的路径存在
+    assert [len(target["findings"]) for target in report["targets"]] == [2, 0, 0]
+
+
+def test_host_concurrency_caps_each_target(wordlist_path):
+    with StandinServer(delay=0.02) as server:
+        report = batch_scan(server, wordlist_path, max_inflight=100, host_concurrency=2, host_rate=0)
+        peak = server.peak_active
+    assert report["failed_targets"] == 0
+    assert 2 < peak <= 2 * len(TARGET_PATHS)
+
+
+def test_host_rate_limits_requests_per_host(wordlist_path):
+    rate, burst = 40, 5
+    with StandinServer() as server:
+        started_at = time.perf_counter()
+        report = batch_scan(server, wordlist_path, host_rate=rate, host_burst=burst, host_concurrency=5)
+        elapsed = time.perf_counter() - started_at
+        requests = server.requests
+    # 三个目标同属一个主机，共用一个令牌桶：突发之后按 rate 放行
+    assert requests == report["total_requests"] == len(WORDS) * len(TARGET_PATHS)
+    assert elapsed >= (requests - burst) / rate * 0.95
+
+
+def test_token_bucket_burst_then_rate():
+    async def scenario():
+        bucket = TokenBucket(50, burst=3)
+        stamps = []
+        for _ in range(8):
+            await bucket.acquire()
+            stamps.append(time.monotonic())
+        return stamps
+
+    stamps = asyncio.run(scenario())
+    assert stamps[2] - stamps[0] < 0.01
+    assert stamps[-1] - stamps[2] >= 5 / 50 * 0.95
@@ -0,0 +1,60 @@
+# test_dir_brute.py
+# 内置目录爆破引擎：对本地替身服务器（benchmarks/standin.py）扫描，发现结果应与替身的已知目录结构一致
+import asyncio
+
+import pytest
+
+from benchmarks.standin import DEFAULT_TREE, StandinServer
+from config import DIRSEARCH_EXTENSIONS
+from MCPServer.dir_brute import Wordlist, run_native_scan
+
+# 替身目录结构：默认结构 + 只能通过 %EXT% 展开命中的路径
+TREE = dict(DEFAULT_TREE, **{"index.php": (200, 900, None), "admin/config.aspx": (200, 300, None)})
+WORDS = ["admin", "admin/login", "/api", "api/v1/users", "backup.zip", "old", "private", "robots.txt",
+         "index.%EXT%", "admin/config.%EXT%", "missing", "nothing.%EXT%", "# 注释行", ""]
+
+
+@pytest.fixture
+def wordlist_path(tmp_path):
+    path = tmp_path / "dicc.txt"
+    path.write_text("\n".join(WORDS), encoding="utf-8")
+    return str(path)
+
+
+def scan(url, wordlist_path, **kwargs):
+    stats = asyncio.run(run_native_scan(url, wordlist_path, concurrency=8, **kwargs))
+    return sorted(finding.path for finding in stats.findings), stats
+
+
+def test_wordlist_expands_extensions(wordlist_path):
+    words = list(Wordlist(wordlist_path).words())
+    assert "index.php" in words and "index.aspx" in words and "admin/config.js" in words
+    assert len([word for word in words if word.startswith("nothing.")]) == len(DIRSEARCH_EXTENSIONS)
+    assert not any("%EXT%" in word or word.startswith(("/", "#")) for word in words)
+    # 不传扩展名时跳过含占位符的条目
+    assert not any(word.startswith("index.") for word in Wordlist(wordlist_path).words(()))
+
+
+@pytest.mark.parametrize("wildcard", [False, True])
+def test_native_scan_matches_standin(wordlist_path, wildcard):
+    with StandinServer(TREE, wildcard=wildcard) as server:
+        found, stats = scan(server.url, wordlist_path)
+        expected = server.expected_findings()
+    assert "index.php" in found and "admin/config.aspx" in found
+    assert found == expected
+    assert stats.errors == 0 and not stats.aborted
+
+
+def test_native_scan_requests_every_expanded_word(wordlist_path):
+    words = list(Wordlist(wordlist_path).words())
+    with StandinServer(TREE) as server:
+        _, stats = scan(server.url, wordlist_path, calibrate=False)
+        requests = server.requests
+    assert stats.requests == requests == len(words)
+
+
+def test_native_scan_include_status(wordlist_path):
+    with StandinServer(TREE) as server:
+        found, _ = scan(server.url, wordlist_path, include_status="200,301-399,403")
+        expected = server.expected_findings(include_status=(200, 301, 403))
+    assert found == expected and "old" in found and "private" in found
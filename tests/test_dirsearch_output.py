@@ -0,0 +1,79 @@
+# test_dirsearch_output.py
+# dirsearch 输出增量解析：输出在任意位置被切开（行中间、\r\n 之间、多字节 UTF-8 字符中间），
+# 解析出的发现和其他输出行与一次性输入时完全一致
+import asyncio
+import sys
+
+import pytest
+
+from MCPServer import dir_scan
+from MCPServer.dirsearch_output import DirsearchOutputParser
+
+TARGET_URL = "http://www.example.com/"
+OUTPUT = (
+    "\x1b[33mExtensions: php, aspx, jsp, html, js | HTTP method: GET | Threads: 25\x1b[0m\r\n"
+    "Target: http://www.example.com/\r\n\r\n"
+    "[12:34:56] Starting: \r\n"
+    "\x1b[K 0.52%  60/11460  120/s  job:1/1  errors:0\r"
+    "\x1b[32m[12:34:57] 200 -    2KB - /管理/登录.php\x1b[0m\r\n"
+    "\x1b[K 25.05%  2891/11460  123/s  job:1/1  errors:0\r"
+    "[12:34:58] 301 -  169B  - /js  ->  http://www.example.com/js/\n"
+    "[12:34:59] 403 -  1.5MB - /备份/数据库.zip\r\n"
+    "\x1b[K 99.99%  11459/11460  130/s  job:1/1  errors:0\r"
+    "Task Completed — 共发现 3 条\n"
+    "[12:35:00] 200 -   64B  - /robots.txt"
+).encode("utf-8")
+
+
+def parse(pieces):
+    parser = DirsearchOutputParser(TARGET_URL)
+    findings = []
+    for piece in pieces:
+        findings.extend(parser.feed(piece))
+    findings.extend(parser.flush())
+    assert [finding.to_dict() for finding in findings] == [finding.to_dict() for finding in parser.findings]
+    return [finding.to_dict() for finding in findings], parser.messages
+
+
+EXPECTED = parse([OUTPUT.decode("utf-8")])
+
+
+def test_whole_output():
+    findings, messages = EXPECTED
+    assert [(item["status"], item["path"]) for item in findings] == [
+        (200, "/管理/登录.php"), (301, "/js"), (403, "/备份/数据库.zip"), (200, "/robots.txt")]
+    assert findings[0]["url"] == "http://www.example.com/管理/登录.php" and findings[1]["redirect"]
+    assert findings[2]["size"] == int(1.5 * 1024 ** 2)
+    assert messages[-1] == "Task Completed — 共发现 3 条"
+    assert not any("%" in message or "\x1b" in message for message in messages)
+
+
+def test_split_at_every_offset():
+    text = OUTPUT.decode("utf-8")
+    for pos in range(len(text) + 1):
+        assert parse([text[:pos], text[pos:]]) == EXPECTED, pos
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7])
+def test_split_into_small_pieces(size):
+    text = OUTPUT.decode("utf-8")
+    assert parse([text[pos:pos + size] for pos in range(0, len(text), size)]) == EXPECTED
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 5, 4096])
+def test_run_dirsearch_decodes_split_utf8(monkeypatch, read_size):
+    # 子进程按字节输出：读取块边界会落在多字节字符中间，由增量解码器拼回
+    script = f"import sys; sys.stdout.buffer.write({OUTPUT!r})"
+    monkeypatch.setattr(dir_scan, "build_dirsearch_cmd",
+                        lambda target_url, extra_args=(): [sys.executable, "-c", script])
+    monkeypatch.setattr(dir_scan, "READ_SIZE", read_size)
+    reported = []
+
+    async def on_finding(count, finding):
+        reported.append((count, finding.to_dict()))
+
+    returncode, parser = asyncio.run(dir_scan.run_dirsearch(TARGET_URL, on_finding))
+    findings, messages = EXPECTED
+    assert returncode == 0
+    assert [finding.to_dict() for finding in parser.findings] == findings and parser.messages == messages
+    assert reported == list(enumerate(findings, 1))
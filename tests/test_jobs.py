@@ -0,0 +1,196 @@
+# test_jobs.py
+# 后台任务：排队与并发上限、活动任务上限、超时、取消排队/运行中的任务、输出截断与分段读取、已结束任务淘汰
+import asyncio
+
+import pytest
+
+from MCPServer.jobs import (CANCELLED, DONE, FAILED, PENDING, RUNNING, TIMEOUT, Job, JobLimitError, JobManager,
+                            register_job_tools)
+
+
+class FakeMCP:
+    """只收集注册的工具函数"""
+
+    def __init__(self):
+        self.tools = {}
+
+    def tool(self):
+        def decorator(func):
+            self.tools[func.__name__] = func
+            return func
+        return decorator
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def settle():
+    # 让已创建的任务跑到第一个等待点
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_jobs_beyond_max_running_are_queued():
+    async def scenario():
+        manager = JobManager(max_running=2)
+        release = asyncio.Event()
+        active = peak = 0
+
+        async def work(job):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await release.wait()
+            active -= 1
+            return job.description
+
+        jobs = [manager.submit("test", str(idx), work) for idx in range(5)]
+        await settle()
+        statuses = [job.status for job in jobs]
+        release.set()
+        await asyncio.gather(*(job.task for job in jobs))
+        return jobs, statuses, peak
+
+    jobs, statuses, peak = run(scenario())
+    assert statuses == [RUNNING, RUNNING, PENDING, PENDING, PENDING]
+    assert peak == 2
+    assert [(job.status, job.result) for job in jobs] == [(DONE, str(idx)) for idx in range(5)]
+
+
+def test_submit_rejected_at_max_active():
+    async def scenario():
+        manager = JobManager(max_running=1, max_active=2)
+        release = asyncio.Event()
+
+        async def work(job):
+            await release.wait()
+
+        first = manager.submit("test", "a", work)
+        second = manager.submit("test", "b", work)
+        with pytest.raises(JobLimitError):
+            manager.submit("test", "c", work)
+        release.set()
+        await asyncio.gather(first.task, second.task)
+        # 已结束的任务不计入活动任务数
+        third = manager.submit("test", "c", work)
+        await third.task
+        return third
+
+    assert run(scenario()).status == DONE
+
+
+def test_timeout_and_failure():
+    async def scenario():
+        manager = JobManager()
+
+        async def slow(job):
+            job.write("started\n")
+            await asyncio.sleep(10)
+
+        async def broken(job):
+            raise ValueError("bad target")
+
+        slow_job = manager.submit("test", "slow", slow, timeout=0.05)
+        broken_job = manager.submit("test", "broken", broken)
+        await asyncio.gather(slow_job.task, broken_job.task)
+        return slow_job, broken_job
+
+    slow_job, broken_job = run(scenario())
+    assert slow_job.status == TIMEOUT and "超时" in slow_job.error
+    assert slow_job.read() == "started\n" and slow_job.finished_at >= slow_job.started_at
+    assert broken_job.status == FAILED and broken_job.error == "bad target"
+
+
+def test_cancel_pending_and_running_jobs():
+    async def scenario():
+        manager = JobManager(max_running=1)
+        started = []
+        cleaned = []
+
+        async def work(job):
+            started.append(job.description)
+            try:
+                await asyncio.sleep(10)
+            finally:
+                cleaned.append(job.description)
+
+        running = manager.submit("test", "running", work)
+        pending = manager.submit("test", "pending", work)
+        await settle()
+        assert (running.status, pending.status) == (RUNNING, PENDING)
+        assert manager.cancel(pending.id)
+        await settle()
+        # 排队中的任务取消后不会再启动，也不影响运行中的任务
+        assert pending.status == CANCELLED and running.status == RUNNING
+        assert manager.cancel(running.id)
+        await asyncio.gather(running.task, return_exceptions=True)
+        assert not manager.cancel(running.id) and not manager.cancel("missing")
+        return running, pending, started, cleaned
+
+    running, pending, started, cleaned = run(scenario())
+    assert running.status == CANCELLED and pending.started_at is None
+    assert started == ["running"] and cleaned == ["running"]
+
+
+def test_output_truncated_at_max_output():
+    job = Job("test", "x", max_output=10)
+    job.write("12345")
+    job.write("67890abc")
+    job.write("more")
+    assert job.read() == "1234567890" and job.output_size == 10 and job.truncated
+
+
+def test_job_output_pages_by_offset():
+    async def scenario():
+        manager = JobManager()
+        mcp = FakeMCP()
+        register_job_tools(mcp, manager)
+        job_output = mcp.tools["job_output"]
+
+        async def work(job):
+            for idx in range(10):
+                job.write(f"line{idx}\n")
+
+        job = manager.submit("test", "x", work)
+        await job.task
+        pages = []
+        offset = 0
+        while True:
+            text = job_output(job.id, offset, 12)
+            header, _, body = text.partition("-------------------------\n")
+            pages.append(body)
+            offset = int(header.split("下一偏移：")[1].split("\n")[0])
+            if "可能还有更多输出：否" in header:
+                break
+        return job, pages, job_output(job.id, -5, 6), job_output("missing")
+
+    job, pages, negative, missing = run(scenario())
+    assert "".join(pages) == "".join(f"line{idx}\n" for idx in range(10))
+    assert all(len(page) <= 12 for page in pages) and len(pages) == 5
+    assert negative.endswith("line0\n") and missing.startswith("错误：")
+
+
+def test_prune_evicts_oldest_finished_jobs():
+    async def scenario():
+        manager = JobManager(max_finished=2)
+        release = asyncio.Event()
+
+        async def quick(job):
+            return job.description
+
+        async def blocked(job):
+            await release.wait()
+
+        active = manager.submit("test", "active", blocked)
+        for idx in range(4):
+            await manager.submit("test", str(idx), quick).task
+        remaining = [job.description for job in manager.jobs.values()]
+        release.set()
+        await active.task
+        return manager, remaining
+
+    manager, remaining = run(scenario())
+    # 运行中的任务不会被淘汰；已结束的按结束时间只保留最近的 max_finished 个
+    assert remaining == ["active", "2", "3"]
+    assert [job.description for job in manager.jobs.values()] == ["active", "3"]
@@ -0,0 +1,52 @@
+# test_metrics.py
+# 工具调用采样：并发调用或已有外部 profiler 时不再开启新的采样（3.11 上会顶替正在进行的采样）；
+# 异步工具的采样注明混入了事件循环上的其他协程
+import asyncio
+import cProfile
+import sys
+
+from MCPServer.metrics import MetricsRegistry, instrument
+
+
+def make_tool(registry, name="slow_tool"):
+    async def slow_tool(delay: float = 0.01) -> str:
+        await asyncio.sleep(delay)
+        return "ok"
+    return instrument(slow_tool, name, registry)
+
+
+def test_concurrent_calls_profile_one_at_a_time():
+    registry = MetricsRegistry(profiling=True)
+    tool = make_tool(registry)
+
+    async def run():
+        return await asyncio.gather(*(tool(0.02) for _ in range(3)))
+
+    assert asyncio.run(run()) == ["ok"] * 3
+    assert len(registry.profiles["slow_tool"]) == 1
+    assert registry.tools["slow_tool"].calls == 3
+    assert sys.getprofile() is None
+    # 上一次采样结束后可以再次采样
+    asyncio.run(tool())
+    assert len(registry.profiles["slow_tool"]) == 2
+
+
+def test_external_profiler_is_not_replaced():
+    registry = MetricsRegistry(profiling=True)
+    tool = make_tool(registry)
+    outer = cProfile.Profile()
+    outer.enable()
+    try:
+        asyncio.run(tool())
+        hook = sys.getprofile()
+    finally:
+        outer.disable()
+    assert hook is not None and "slow_tool" not in registry.profiles
+
+
+def test_async_profile_notes_shared_event_loop():
+    registry = MetricsRegistry(profiling=True)
+    asyncio.run(make_tool(registry)())
+    instrument(lambda: "ok", "sync_tool", registry)()
+    assert registry.profiles["slow_tool"][-1].event_loop and "其他协程" in registry.tool_text("slow_tool")
+    assert not registry.profiles["sync_tool"][-1].event_loop and "其他协程" not in registry.tool_text("sync_tool")
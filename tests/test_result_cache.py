@@ -0,0 +1,139 @@
+# test_result_cache.py
+# 工具结果缓存：有效期、按条数/总大小的 LRU 淘汰、SQLite 重新载入后保持访问顺序、数据库不可用时只用内存；
+# dir_scan 的缓存键区分扩展名，重复命中沿用同一个分页结果
+import asyncio
+import json
+
+import pytest
+
+from MCPServer import dir_scan, result_cache, results
+from MCPServer.dirsearch_output import DirFinding
+from MCPServer.result_cache import ResultCache
+from MCPServer.results import ResultStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的 time.time"""
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    return now
+
+
+def size_of(value):
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = ResultCache(path="", ttl=60)
+    cache.put("k", "tool", "v")
+    clock[0] += 59
+    assert cache.get("k").value == "v"
+    clock[0] += 2
+    # 有效期从生成时计算，访问不会延长
+    assert cache.get("k") is None and "k" not in cache.entries
+    assert (cache.hits, cache.misses) == (1, 1) and cache.total_size == 0
+
+
+def test_lru_eviction_by_entry_count(clock):
+    cache = ResultCache(path="", max_entries=2)
+    cache.put("a", "tool", 1)
+    cache.put("b", "tool", 2)
+    cache.get("a")
+    cache.put("c", "tool", 3)
+    assert list(cache.entries) == ["a", "c"]
+
+
+def test_lru_eviction_by_total_size(clock):
+    value = "x" * 100
+    cache = ResultCache(path="", max_bytes=size_of(value) * 2 + 1)
+    cache.put("a", "tool", value)
+    cache.put("b", "tool", value)
+    cache.get("a")
+    cache.put("c", "tool", value)
+    assert list(cache.entries) == ["a", "c"] and cache.total_size == size_of(value) * 2
+    # 单个结果超过总大小上限时不缓存，也不挤掉已有结果
+    assert cache.put("huge", "tool", "y" * 1000) is None and list(cache.entries) == ["a", "c"]
+
+
+def test_reload_keeps_access_order(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = ResultCache(path=path, max_entries=3)
+    for key in "abc":
+        clock[0] += 1
+        cache.put(key, "tool", key.upper())
+    clock[0] += 1
+    assert cache.get("a").value == "A"
+    cache.close()
+
+    reloaded = ResultCache(path=path, max_entries=3)
+    assert reloaded.get("missing") is None
+    # 命中时写回的访问时间决定重启后的淘汰顺序：b 最久未用
+    assert list(reloaded.entries) == ["b", "c", "a"]
+    reloaded.put("d", "tool", "D")
+    assert list(reloaded.entries) == ["c", "a", "d"]
+    reloaded.close()
+
+    clock[0] += reloaded.ttl + 10
+    expired = ResultCache(path=path)
+    assert expired.get("a") is None and not expired.entries
+    expired.close()
+
+
+def test_unavailable_database_falls_back_to_memory(tmp_path, capsys):
+    cache = ResultCache(path=str(tmp_path / "missing" / "cache.db"))
+    assert cache.put("k", "tool", [1, 2]).value == [1, 2]
+    assert cache.get("k").value == [1, 2] and cache.conn is None
+    assert "只在内存中缓存" in capsys.readouterr().out
+
+
+class FakeMCP:
+    """只收集注册的工具函数"""
+
+    def __init__(self):
+        self.tools = {}
+
+    def tool(self):
+        def decorator(func):
+            self.tools[func.__name__] = func
+            return func
+        return decorator
+
+
+def test_dir_scan_cache_key_and_stored_result(tmp_path, monkeypatch):
+    wordlist = tmp_path / "dicc.txt"
+    wordlist.write_text("admin\n", encoding="utf-8")
+    store = ResultStore()
+    store.served = True
+    scans = []
+
+    async def fake_scan(target_url, on_finding, engine, concurrency, calibrate=True, resume=False):
+        scans.append(target_url)
+
+        class Result:
+            findings = [DirFinding(200, 10, f"path{idx}", f"{target_url}/path{idx}") for idx in range(2000)]
+            messages = []
+
+        return 0, Result, "耗时 1 秒"
+
+    monkeypatch.setattr(dir_scan, "DIRSEARCH_WORDLIST_PATH", str(wordlist))
+    monkeypatch.setattr(dir_scan, "RESULT_CACHE", ResultCache(path=""))
+    monkeypatch.setattr(dir_scan, "run_scan", fake_scan)
+    monkeypatch.setattr(dir_scan, "bounded_result",
+                        lambda *args: results.bounded_result(*args, store=store))
+    mcp = FakeMCP()
+    dir_scan.register_dir_scan_tool(mcp)
+
+    def call():
+        return asyncio.run(mcp.tools["dir_scan"](None, "http://example.com", engine=dir_scan.ENGINE_NATIVE))
+
+    first, second, third = call(), call(), call()
+    assert len(scans) == 1 and "缓存结果" in second and "缓存结果" in third
+    # 三次调用只保存了一份完整结果
+    assert len(store.results) == 1
+    (result_id,) = store.results
+    assert all(result_id in output for output in (first, second, third))
+
+    monkeypatch.setattr(dir_scan, "DIRSEARCH_EXTENSIONS", ("php",))
+    assert "缓存结果" not in call() and len(scans) == 2
+
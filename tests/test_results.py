@@ -0,0 +1,37 @@
+# test_results.py
+# 大结果分页：只有注册了读取入口（results 工具模块）时才保存结果，预览不重复摘要
+from MCPServer.results import (INLINE_RESULT_LIMIT, PREVIEW_LINES, SEPARATOR, ResultStore, bounded_result,
+                               read_result_page, store_file_result)
+
+SUMMARY = "目录扫描完成（目标：http://example.com）\n发现 2000 个路径"
+TEXT = SUMMARY + f"\n{SEPARATOR}\n" + "\n".join(f"200 1KB http://example.com/path{i}" for i in range(2000))
+
+
+def test_small_result_is_inline():
+    store = ResultStore()
+    store.served = True
+    assert bounded_result("dir_scan", "t", "短结果", "摘要", store) == "短结果"
+    assert not store.results
+
+
+def test_large_result_is_stored_when_served():
+    store = ResultStore()
+    store.served = True
+    output = bounded_result("dir_scan", "t", TEXT, SUMMARY, store)
+    assert len(output) < INLINE_RESULT_LIMIT and "results://" in output
+    # 摘要只出现一次，预览从正文第一行开始
+    assert output.count(SUMMARY) == 1 and output.count(SEPARATOR) == 1
+    preview = output.split(f"{SEPARATOR}\n", 1)[1].splitlines()
+    assert preview[0] == "200 1KB http://example.com/path0" and len(preview) == PREVIEW_LINES + 1
+    (result_id,) = store.results
+    assert "path1999" in read_result_page(result_id, len(TEXT) - 100, store)
+
+
+def test_large_result_is_truncated_when_not_served(tmp_path):
+    store = ResultStore()
+    output = bounded_result("dir_scan", "t", TEXT, SUMMARY, store)
+    assert "results://" not in output and "path0" in output and "path1999" not in output
+    assert not store.results
+    export = tmp_path / "export.log"
+    export.write_text("data", encoding="utf-8")
+    assert store_file_result("filter_burp_log", str(export), store) is None
@@ -0,0 +1,107 @@
+# test_scan_checkpoint.py
+# 目录扫描断点：只有 native 引擎使用断点库，库不可用时照常扫描；断点键区分扩展名和状态码过滤
+import asyncio
+from functools import partial
+
+import pytest
+
+from benchmarks.standin import DEFAULT_TREE, StandinServer
+from MCPServer import dir_batch, dir_scan
+from MCPServer.dir_brute import run_native_scan
+from MCPServer.dirsearch_output import DirsearchOutputParser
+from MCPServer.scan_checkpoint import CheckpointStore, checkpoint_key, open_checkpoint_store
+
+
+@pytest.fixture
+def wordlist_path(tmp_path, monkeypatch):
+    path = tmp_path / "dicc.txt"
+    path.write_text("\n".join(["admin", "admin/login", "backup.zip", "robots.txt", "missing"]), encoding="utf-8")
+    monkeypatch.setattr(dir_scan, "DIRSEARCH_WORDLIST_PATH", str(path))
+    return str(path)
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoints.db")
+    monkeypatch.setattr(dir_scan, "open_checkpoint_store", partial(open_checkpoint_store, path))
+    monkeypatch.setattr(dir_batch, "open_checkpoint_store", partial(open_checkpoint_store, path))
+    return path
+
+
+def test_unavailable_store_yields_none(tmp_path):
+    with open_checkpoint_store(str(tmp_path / "missing" / "checkpoints.db")) as store:
+        assert store is None
+
+
+def test_key_includes_scan_options(wordlist_path):
+    base = checkpoint_key("http://a/", wordlist_path, "native", "200", True, "php,html")
+    assert base == checkpoint_key("http://a", wordlist_path, "native", "200", True, "php,html")
+    assert base != checkpoint_key("http://a", wordlist_path, "native", "200", True, "php")
+    assert base != checkpoint_key("http://a", wordlist_path, "native", "200,403", True, "php,html")
+
+
+def test_dirsearch_engine_does_not_open_store(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("dirsearch 引擎不应打开断点库")
+
+    async def fake_dirsearch(target_url, on_finding, timeout, exclude=None):
+        return 0, DirsearchOutputParser(target_url)
+
+    monkeypatch.setattr(dir_scan, "open_checkpoint_store", fail)
+    monkeypatch.setattr(dir_scan, "run_dirsearch", fake_dirsearch)
+    returncode, _, _ = asyncio.run(dir_scan.run_scan("http://127.0.0.1:9", engine=dir_scan.ENGINE_DIRSEARCH,
+                                                     calibrate=False, resume=True))
+    assert returncode == 0
+
+
+def test_native_scan_without_store(wordlist_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(dir_scan, "open_checkpoint_store",
+                        partial(open_checkpoint_store, str(tmp_path / "missing" / "checkpoints.db")))
+    with StandinServer(DEFAULT_TREE) as server:
+        returncode, stats, _ = asyncio.run(dir_scan.run_scan(server.url, engine=dir_scan.ENGINE_NATIVE))
+    assert returncode == 0 and stats.findings
+
+
+def test_completed_native_scan_is_shared_with_batch(wordlist_path, store_path):
+    with StandinServer(DEFAULT_TREE) as server:
+        returncode, stats, _ = asyncio.run(dir_scan.run_scan(server.url, engine=dir_scan.ENGINE_NATIVE))
+        assert returncode == 0
+        sent = server.requests
+        report = asyncio.run(dir_batch.run_batch_scan([server.url], wordlist_path, resume=True))
+        # 相同的断点键：批量扫描直接沿用已完成的结果，不再发送请求
+        assert server.requests == sent
+    entry = report["targets"][0]
+    assert sorted(item["path"] for item in entry["findings"]) == sorted(finding.path for finding in stats.findings)
+
+
+def test_resumed_scan_reports_each_finding_once(wordlist_path, store_path):
+    class Interrupted(Exception):
+        pass
+
+    async def interrupt(count, finding):
+        # 第二个发现记录后中断：该条目仍在进行中，断点位置停在它之前
+        if count == 2:
+            raise Interrupted()
+
+    pushed = []
+
+    async def collect(count, finding):
+        pushed.append(finding.url)
+
+    with StandinServer(DEFAULT_TREE) as server:
+        full = asyncio.run(run_native_scan(server.url, wordlist_path, concurrency=1, calibrate=False))
+        with CheckpointStore(store_path) as store:
+            checkpoint = store.open(server.url, wordlist_path, "test", resume=True)
+            with pytest.raises(Interrupted):
+                asyncio.run(run_native_scan(server.url, wordlist_path, interrupt, concurrency=1, calibrate=False,
+                                            checkpoint=checkpoint))
+        with CheckpointStore(store_path) as store:
+            checkpoint = store.open(server.url, wordlist_path, "test", resume=True)
+            assert 0 < checkpoint.position and len(checkpoint.findings) == 2
+            stats = asyncio.run(run_native_scan(server.url, wordlist_path, collect, concurrency=1, calibrate=False,
+                                                checkpoint=checkpoint))
+    urls = [finding.url for finding in stats.findings]
+    assert len(urls) == len(set(urls))
+    assert sorted(urls) == sorted(finding.url for finding in full.findings)
+    # 断点中已有的发现不再推送
+    assert not set(pushed) & {finding.url for finding in checkpoint.findings[:2]}
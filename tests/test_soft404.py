@@ -0,0 +1,56 @@
+# test_soft404.py
+# 兜底页识别：指纹按 主机 + 基础路径 缓存，只有大小可比时（dirsearch）按取整误差和回显路径长度比对
+import asyncio
+
+import httpx
+import pytest
+
+from MCPServer import soft404
+from MCPServer.soft404 import ResponseFingerprint, Soft404Detector, calibrate_host, calibration_key
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(soft404, "_DETECTOR_CACHE", {})
+
+
+def fallback_app(request):
+    # 两个应用挂在同一主机下，兜底页各不相同
+    if request.url.path.startswith("/app1/"):
+        return httpx.Response(200, text="<html>app one catch-all " + "x" * 400 + "</html>")
+    return httpx.Response(404, text="not found")
+
+
+def calibrate(*urls):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(fallback_app)) as client:
+            return [await calibrate_host(client, url) for url in urls]
+    return asyncio.run(run())
+
+
+def test_cache_key_includes_base_path():
+    assert calibration_key("HTTP://Example.com:8080/app1/") == "http://example.com:8080/app1"
+    assert calibration_key("http://example.com/app1") == calibration_key("http://example.com/app1/")
+    assert calibration_key("http://example.com/app1/") != calibration_key("http://example.com/app2/")
+
+
+def test_base_paths_are_calibrated_separately():
+    app1, app1_again, app2 = calibrate("http://example.com/app1/", "http://example.com/app1",
+                                       "http://example.com/app2/")
+    assert app1 is app1_again
+    assert {fp.status for fp in app1.fingerprints} == {200}
+    assert {fp.status for fp in app2.fingerprints} == {404}
+
+
+def test_matches_size_tolerance():
+    detector = Soft404Detector([ResponseFingerprint(200, 1000, "d", 0)])
+    # 精确大小：只允许少量偏差
+    assert detector.matches_size(200, 1010)
+    assert not detector.matches_size(200, 1060)
+    assert not detector.matches_size(200, 940)
+    assert not detector.matches_size(404, 1000)
+    # 回显路径使大小增加
+    assert detector.matches_size(200, 1000 + 2 * len("admin/panel"), word="admin/panel")
+    assert not detector.matches_size(200, 1000 - 2 * len("admin/panel"), word="admin/panel")
+    # dirsearch 的 1KB 取整误差
+    assert detector.matches_size(200, 1024, tolerance=512)
@@ -0,0 +1,64 @@
+# test_traffic_export.py
+# 导出去重：默认导出自包含（不依赖正文库），log 格式只在文件内去重，正文库超出上限时按最近使用时间淘汰
+import os
+
+import pytest
+
+from benchmarks.synthetic_log import generate_burp_log
+from MCPServer.body_store import BodyStore, body_digest
+from MCPServer.burp_http import iter_exchanges
+from MCPServer.traffic_export import (FORMAT_JSONL, FORMAT_LOG, load_records, open_exchange_writer)
+
+
+@pytest.fixture
+def exchanges(tmp_path):
+    path = str(tmp_path / "burp.log")
+    generate_burp_log(path, 100 * 1024)
+    return [exchange for exchange in iter_exchanges(path) if exchange.response]
+
+
+def test_jsonl_default_is_self_contained(exchanges, tmp_path):
+    with open_exchange_writer(str(tmp_path / "out"), FORMAT_JSONL) as writer:
+        for exchange in exchanges:
+            writer.write_exchange(exchange)
+    assert writer.duplicate_bodies > 0
+    # 空正文库：所有正文都应能从导出文件本身补全
+    empty_store = BodyStore(str(tmp_path / "empty_store"))
+    bodies = [body for _, body in load_records(writer.path, empty_store)]
+    assert bodies == [exchange.response.body for exchange in exchanges]
+    assert not os.path.exists(empty_store.root)
+
+
+def test_log_dedup_stays_in_file(exchanges, tmp_path, monkeypatch):
+    monkeypatch.setattr(BodyStore, "put", lambda self, body: pytest.fail("log 导出不应写入正文库"))
+    with open_exchange_writer(str(tmp_path / "out"), FORMAT_LOG, dedup_bodies=True) as writer:
+        for exchange in exchanges:
+            writer.write_exchange(exchange)
+    assert writer.duplicate_bodies > 0
+    with open(writer.path, "rb") as f:
+        data = f.read()
+    # 占位条目与其他条目一样按文本方式写出统一的换行符，不混入 \r
+    assert b"\r" not in data
+    replaced = 0
+    for exchange in exchanges:
+        body = exchange.response.body
+        if f"sha256:{body_digest(body)}".encode() in data:
+            # 被占位替换的正文在同一文件中完整出现过
+            assert body.strip() in data
+            replaced += 1
+    assert replaced > 0
+
+
+def test_body_store_prunes_least_recently_used(tmp_path):
+    store = BodyStore(str(tmp_path / "store"), max_bytes=250)
+    digests = []
+    for i in range(3):
+        digests.append(store.put(bytes([65 + i]) * 100))
+        os.utime(store.path(digests[-1]), (1000 + i, 1000 + i))
+    # 读取最早写入的正文，使它成为最近使用
+    assert store.get(digests[0]) == b"A" * 100
+    assert store.prune() == 1
+    assert store.get(digests[1]) is None
+    assert store.get(digests[0]) == b"A" * 100
+    assert store.get(digests[2]) == b"C" * 100
+    assert BodyStore(str(tmp_path / "store"), max_bytes=0).prune() == 0
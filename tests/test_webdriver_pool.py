@@ -0,0 +1,190 @@
+# test_webdriver_pool.py
+# 浏览器会话池：用假的 WebDriver 验证租用/归还、健康检查、重置及次数上限回收
+import asyncio
+
+import pytest
+
+from MCPServer.webdriver_pool import WebDriverPool
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current = handle
+
+
+class FakeDriver:
+    """只实现会话池用到的 WebDriver 接口，记录调用"""
+
+    def __init__(self, ident):
+        self.ident = ident
+        self.window_handles = ["main"]
+        self.current = "main"
+        self.switch_to = FakeSwitchTo(self)
+        self.alive = True
+        self.fail_reset = False
+        self.quit_called = False
+        self.visited = []
+        self.cdp = []
+        self.logs_read = 0
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("浏览器已退出")
+        if script == "return 1":
+            return 1
+        if "location.origin" in script:
+            return "https://example.com"
+        return None
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp.append(cmd)
+        return {}
+
+    def close(self):
+        self.window_handles.remove(self.current)
+
+    def delete_all_cookies(self):
+        if self.fail_reset:
+            raise RuntimeError("重置失败")
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def get_log(self, kind):
+        assert kind == "performance"
+        self.logs_read += 1
+        return []
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeFactory:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        driver = FakeDriver(len(self.drivers))
+        self.drivers.append(driver)
+        return driver
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_pool(factory, **kwargs):
+    kwargs.setdefault("size", 1)
+    return WebDriverPool(None, factory=factory, **kwargs)
+
+
+def test_lease_reuses_reset_browser():
+    factory = FakeFactory()
+
+    async def scenario():
+        pool = make_pool(factory)
+        pool.start()
+        async with pool.lease() as session:
+            session.driver.window_handles.append("popup")
+            first = session.driver
+        async with pool.lease() as session:
+            assert session.driver is first and session.uses == 2
+        await pool.close()
+        return first
+
+    driver = run(scenario())
+    assert len(factory.drivers) == 1
+    assert driver.window_handles == ["main"] and driver.visited == ["about:blank", "about:blank"]
+    assert "Storage.clearDataForOrigin" in driver.cdp and "Network.clearBrowserCookies" in driver.cdp
+    # 默认不开启性能日志，重置时不读取
+    assert driver.logs_read == 0 and driver.quit_called
+
+
+def test_reset_drains_performance_log():
+    factory = FakeFactory()
+
+    async def scenario():
+        pool = make_pool(factory, performance_log=True)
+        async with pool.lease():
+            pass
+        await pool.close()
+
+    run(scenario())
+    assert factory.drivers[0].logs_read == 1
+
+
+def test_unhealthy_browser_is_replaced():
+    factory = FakeFactory()
+
+    async def scenario():
+        pool = make_pool(factory)
+        async with pool.lease() as session:
+            session.driver.alive = False
+        async with pool.lease() as session:
+            replacement = session.driver
+        await pool.close()
+        return pool, replacement
+
+    pool, replacement = run(scenario())
+    assert factory.drivers[0].quit_called and replacement is factory.drivers[1]
+    assert pool.recycled == 1 and any("健康检查" in message for message in pool.messages)
+
+
+def test_failed_reset_and_max_uses_recycle():
+    factory = FakeFactory()
+
+    async def scenario():
+        pool = make_pool(factory, max_uses=2)
+        async with pool.lease() as session:
+            session.driver.fail_reset = True
+        async with pool.lease():
+            pass
+        async with pool.lease():
+            pass
+        # 等待后台预热的替补启动完成
+        await asyncio.gather(*pool._tasks)
+        await pool.close()
+        return pool
+
+    pool = run(scenario())
+    # 第一个重置失败被回收；第二个使用两次达到上限被回收
+    assert pool.recycled == 2 and any("重置失败" in message for message in pool.messages)
+    assert factory.drivers[0].quit_called and factory.drivers[1].quit_called
+    assert all(driver.quit_called for driver in factory.drivers)
+
+
+def test_pool_limits_concurrent_leases():
+    factory = FakeFactory()
+
+    async def scenario():
+        pool = make_pool(factory, size=2)
+        pool.start()
+        active = peak = 0
+
+        async def use():
+            nonlocal active, peak
+            async with pool.lease():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(use() for _ in range(6)))
+        await pool.close()
+        return peak
+
+    assert run(scenario()) == 2
+    assert len(factory.drivers) == 2
+
+
+def test_closed_pool_rejects_leases():
+    async def scenario():
+        pool = make_pool(FakeFactory())
+        await pool.close()
+        await pool.acquire()
+
+    with pytest.raises(RuntimeError):
+        run(scenario())
@@ -1,7 +1,10 @@
-import json
-import re
+import os
 from datetime import datetime
 from config import BURP_LOG_PATH
+from MCPServer.burp_log import TRAFFIC_SEPARATOR, decode_entry, iter_raw_traffic_entries, is_blank_log
+from MCPServer.burp_http import parse_message
+from MCPServer.burp_json import extract_json_body
+from MCPServer.burp_parallel import map_log_ranges
 
 # ===================== 工具配置（可根据需求修改）=====================
 # 1. 原始 Burp 日志路径（输入文件）
@@ -9,7 +12,7 @@ RAW_BURP_LOG_PATH = BURP_LOG_PATH  # 原始日志文件（Burp 自动保存的
 # 2. 筛选后日志导出路径（输出文件，自动带时间戳，避免覆盖）
 EXPORT_DIR = "./"
 # 3. 筛选配置（可微调）
-MIN_JSON_LENGTH = 5  # 最小 JSON 片段长度，过滤无意义的短片段（如 {}、{"k":""}）
+MIN_JSON_LENGTH = 5  # 最小 JSON 返回体长度，过滤无意义的短片段（如 {}、[]）
 PRESERVE_TRAFFIC_CONTEXT = True  # 保持为 True，确保完整保留请求头+响应头+JSON 返回体
 # 4. 核心白名单：仅保留该 Content-Type 的流量
 WHITELIST_CONTENT_TYPE = "Content-Type: application/json"
@@ -17,97 +20,121 @@ WHITELIST_CONTENT_TYPE = "Content-Type: application/json"
 # 示例1：完整 URL → "https://dipp.sf-express.com/api"
 # 示例2：路径片段 → "/api"、"/user/info"
 TARGET_URL_KEYWORD = "eva2.csdn.net"  # 可根据需求修改为你的目标 URL/路径
+# 6. 并行筛选进程数（0 或 1 表示串行；大日志可设为 CPU 核数，结果与串行一致）
+PARALLEL_WORKERS = 0
 
 
 # ===================== 核心过滤逻辑（白名单模式 + URL 匹配 + 完整保留请求头）=====================
-def filter_burp_log_for_json(raw_log_content):
+def filter_rules():
+    """
+    预处理筛选规则，整个筛选过程只计算一次
+    :return: (小写 URL 关键字, 白名单 Content-Type 的 MIME 部分)
+    """
+    # 白名单 Content-Type 只取 MIME 部分，与解析出的响应头字段直接比较
+    whitelist_mime = WHITELIST_CONTENT_TYPE.split(":", 1)[-1].strip().lower()
+    return TARGET_URL_KEYWORD.lower(), whitelist_mime
+
+
+def match_json_entry(raw, keyword, whitelist_mime):
+    """
+    判断单个流量条目是否为 含目标 URL + 白名单 Content-Type + 有效 JSON 返回体 的流量
+    :param raw: 条目原始字节
+    :param keyword: 小写 URL 关键字
+    :param whitelist_mime: 白名单 MIME 类型
+    :return: 需要导出的条目文本，不符合条件时返回 None
+    """
+    # 跳过空条目
+    if not raw:
+        return None
+
+    # 关键：不提前 strip 整个 entry，保留原始条目（含格式、空格），确保请求头完整
+    entry_original = decode_entry(raw)
+
+    # 步骤 1：URL 匹配筛选——仅保留包含目标 URL 关键字的流量（大小写不敏感兼容）
+    if keyword not in entry_original.lower():
+        return None
+
+    # 步骤 2：核心白名单筛选——解析头部，仅保留声明了指定 Content-Type 的流量
+    message = parse_message(raw)
+    content_type = (message.content_type or "").lower()
+    if not content_type.startswith(whitelist_mime):
+        return None
+
+    # 步骤 3：只对头部之后的正文做一次线性扫描 + 一次解析，判断是否为合法 JSON
+    json_body = extract_json_body(message.body, min_length=MIN_JSON_LENGTH)
+    if json_body is None:
+        return None
+
+    # 步骤 4：保留有效条目（完整保留请求头+响应头+JSON，不修改原始格式）
+    if PRESERVE_TRAFFIC_CONTEXT:
+        # 关键：返回原始条目（entry_original），而非 stripped 后的条目，确保请求头完整无丢失
+        return entry_original
+    # 仅保留纯 JSON 内容（如需此模式，可将 PRESERVE_TRAFFIC_CONTEXT 改为 False）
+    return json_body.decode("utf-8", errors="ignore")
+
+
+def filter_burp_log_for_json(raw_entries):
     """
     核心函数：筛选原始 Burp 日志中 含目标 URL + 白名单 Content-Type + 有效 JSON 返回体 的流量条目
     关键：1. 仅保留包含目标 URL 的流量 2. 完整保留请求头、响应头及 JSON 返回体
-    :param raw_log_content: 原始 Burp 日志内容
-    :return: 筛选后的纯净日志内容
+    :param raw_entries: 原始字节条目的可迭代对象（通常来自 iter_raw_traffic_entries，惰性读取）
+    :return: 生成器，逐条产出筛选后的有效条目
     """
-    # Burp 日志默认分隔符（用于拆分单个流量条目）
-    traffic_separator = "======================================================"
-    # 拆分所有流量条目
-    traffic_entries = raw_log_content.split(traffic_separator)
-    # 存储筛选后的有效条目
-    valid_entries = []
-
-    # 正则匹配完整 JSON 块（支持跨行、含空格）
-    json_block_pattern = r'\{[\s\S]*?\}'
-    # 补充匹配数组格式 JSON（可选，若有 [] 格式的返回体）
-    json_array_pattern = r'\[[\s\S]*?\]'
-
-    print(f"🔍 开始解析日志，共检测到 {len(traffic_entries)} 条原始流量条目...")
+    # 统计变量（条目是惰性读取的，总数在遍历结束后才能确定）
+    entry_count = 0
+    valid_count = 0
+    keyword, whitelist_mime = filter_rules()
+
+    print(f"🔍 开始解析日志（流式读取）...")
     print(f"📋 白名单规则：仅保留 {WHITELIST_CONTENT_TYPE} 类型流量")
     print(f"🔗 URL 匹配规则：仅保留包含 '{TARGET_URL_KEYWORD}' 的流量（大小写不敏感）")
     print(f"📌 配置说明：完整保留请求头、响应头及 JSON 返回体")
 
-    for entry in traffic_entries:
-        # 关键：不提前 strip 整个 entry，仅用于判断空条目（避免丢失请求头的格式和空格）
-        entry_original = entry  # 保留原始条目（含格式、空格），确保请求头完整
-        entry_stripped = entry_original
-
-        # 跳过空条目
-        if not entry_stripped:
-            continue
-
-        # 步骤 1：新增 URL 匹配筛选——仅保留包含目标 URL 关键字的流量（大小写不敏感兼容）
-        if TARGET_URL_KEYWORD.lower() not in entry_original.lower():
-            continue
-
-        # 步骤 2：核心白名单筛选——仅保留包含指定 Content-Type 的流量（大小写不敏感兼容）
-        if WHITELIST_CONTENT_TYPE.lower() not in entry_original.lower():
-            continue
-
-        # 步骤 3：初步过滤——判断是否包含 JSON 特征字符
-        if '{"' not in entry_original and '}' not in entry_original and '[' not in entry_original and ']' not in entry_original:
-            continue
-
-        # 步骤 4：提取所有可能的 JSON 候选片段
-        json_candidates = re.findall(json_block_pattern, entry_original, re.DOTALL)
-        json_candidates += re.findall(json_array_pattern, entry_original, re.DOTALL)
-        valid_json_found = False
-
-        # 步骤 5：验证候选片段是否为合法 JSON
-        for candidate in json_candidates:
-            candidate_stripped = candidate.strip()
-            # 过滤过短的无效片段
-            if len(candidate_stripped) < MIN_JSON_LENGTH:
-                continue
-
-            # 尝试解析 JSON（处理常见格式问题：末尾多余逗号、分号、括号）
-            try:
-                # 简单修复不规范 JSON
-                fixed_candidate = candidate_stripped.rstrip(',').rstrip(';').rstrip(')').rstrip('}')
-                # 补全缺失的闭合符（简单场景）
-                if fixed_candidate.count('{') > fixed_candidate.count('}'):
-                    fixed_candidate += '}' * (fixed_candidate.count('{') - fixed_candidate.count('}'))
-                if fixed_candidate.count('[') > fixed_candidate.count(']'):
-                    fixed_candidate += ']' * (fixed_candidate.count('[') - fixed_candidate.count(']'))
-
-                # 验证合法性
-                json.loads(fixed_candidate)
-                valid_json_found = True
-                break
-            except json.JSONDecodeError:
-                continue
-
-        # 步骤 6：保留有效条目（完整保留请求头+响应头+JSON，不修改原始格式）
-        if valid_json_found:
-            if PRESERVE_TRAFFIC_CONTEXT:
-                # 关键：添加原始条目（entry_original），而非 stripped 后的条目，确保请求头完整无丢失
-                valid_entries.append(entry_original)
-            else:
-                # 仅保留纯 JSON 内容（如需此模式，可将 PRESERVE_TRAFFIC_CONTEXT 改为 False）
-                pure_json = "\n".join([c for c in json_candidates if len(c.strip()) >= MIN_JSON_LENGTH])
-                valid_entries.append(pure_json)
+    for raw in raw_entries:
+        entry_count += 1
+        output = match_json_entry(raw, keyword, whitelist_mime)
+        if output is not None:
+            yield output
+            valid_count += 1
 
-    # 步骤 7：重组筛选后的日志（还原分隔符，保持格式清晰，请求头完整）
-    filtered_log = traffic_separator.join(valid_entries)
-    print(f"✅ 日志筛选完成，共保留 {len(valid_entries)} 条符合 URL 匹配+白名单的有效 JSON 流量条目")
-    return filtered_log
+    print(f"🔍 共检测到 {entry_count} 条原始流量条目")
+    print(f"✅ 日志筛选完成，共保留 {valid_count} 条符合 URL 匹配+白名单的有效 JSON 流量条目")
+
+
+def _filter_entry_range(log_file, start, end):
+    """
+    子进程入口：筛选日志中 [start, end) 区间内的流量条目
+    :return: (区间内条目数, 命中的条目列表)
+    """
+    keyword, whitelist_mime = filter_rules()
+    # 只有最后一个区间需要产出文件末尾的片段，避免重复统计
+    include_tail = end >= os.path.getsize(log_file)
+    entry_count = 0
+    entries = []
+    for _, raw in iter_raw_traffic_entries(log_file, start, end, include_tail=include_tail):
+        entry_count += 1
+        output = match_json_entry(raw, keyword, whitelist_mime)
+        if output is not None:
+            entries.append(output)
+    return entry_count, entries
+
+
+def filter_burp_log_parallel(log_file, workers):
+    """
+    多进程并行筛选：按分隔符把日志切成字节区间，各子进程自行读取区间，结果按原始顺序合并，与串行结果一致
+    :param log_file: 原始日志文件路径
+    :param workers: 进程数
+    :return: 生成器，逐条产出筛选后的有效条目
+    """
+    print(f"🔍 开始解析日志（{workers} 进程并行）...")
+    entry_count = 0
+    valid_count = 0
+    for range_count, entries in map_log_ranges(log_file, _filter_entry_range, workers, exchange_aligned=False):
+        entry_count += range_count
+        valid_count += len(entries)
+        yield from entries
+    print(f"🔍 共检测到 {entry_count} 条原始流量条目")
+    print(f"✅ 日志筛选完成，共保留 {valid_count} 条符合 URL 匹配+白名单的有效 JSON 流量条目")
 
 
 # ===================== 文件读写与导出（无需修改）=====================
@@ -116,24 +143,26 @@ def run_json_log_filter():
     try:
         # 1. 读取原始 Burp 日志文件
         print(f"📂 正在读取原始日志文件：{RAW_BURP_LOG_PATH}")
-        with open(RAW_BURP_LOG_PATH, "r", encoding="utf-8", errors="ignore") as f:
-            raw_log_content = f.read()
-
-        if not raw_log_content.strip():
+        if is_blank_log(RAW_BURP_LOG_PATH):
             print("❌ 原始日志文件为空，无法进行筛选")
             return
 
-        # 2. 执行 JSON 流量筛选（URL 匹配 + 白名单模式 + 完整保留请求头）
-        filtered_log_content = filter_burp_log_for_json(raw_log_content)
-
-        # 3. 生成带时间戳的导出文件名
+        # 2. 生成带时间戳的导出文件名
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         # 文件名添加 url_match 标识，方便区分
         export_filename = f"{EXPORT_DIR}burp_url_match_{TARGET_URL_KEYWORD.replace('/', '_').replace(':', '')}_application_json_{timestamp}.log"
 
-        # 4. 导出筛选后的日志文件
+        # 3. 流式执行 JSON 流量筛选（URL 匹配 + 白名单模式 + 完整保留请求头），边筛选边导出
         with open(export_filename, "w", encoding="utf-8") as f:
-            f.write(filtered_log_content)
+            if PARALLEL_WORKERS > 1:
+                entries = filter_burp_log_parallel(RAW_BURP_LOG_PATH, PARALLEL_WORKERS)
+            else:
+                entries = filter_burp_log_for_json(raw for _, raw in iter_raw_traffic_entries(RAW_BURP_LOG_PATH))
+            for idx, entry in enumerate(entries):
+                # 重组筛选后的日志（还原分隔符，保持格式清晰，请求头完整）
+                if idx:
+                    f.write(TRAFFIC_SEPARATOR)
+                f.write(entry)
 
         print(f"📤 筛选后的日志已导出：{export_filename}")
         print(f"🎉 整个过滤流程完成，日志完整保留请求头、响应头及 JSON 返回体")